@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+"""
+Load test - simulates timesheet traffic against a running server
+
+Virtual users log in once and then loop over weighted scenarios with a
+random think time in between:
+
+* dashboard: profile + project list + weekly summary
+* submit: log today's hours on one to three assigned projects
+* login: a fresh token, as after a browser restart
+* report: month-end reports by an admin (monthly summary, project time
+  report, rendered team report)
+
+Submissions are weighted up during recurring end-of-day bursts
+(``--burst-every``/``--burst-length``/``--burst-factor``). At the end the
+script prints throughput, error rates and latency percentiles per request
+and per scenario; ``--json`` also writes them to a file.
+
+It only needs the standard library and accounts created by
+``manage.py create_test_data`` (test_user_N@test.com and
+test_admin@test.com, password testpass123). Example, sizing gunicorn:
+
+    cd backend/tracker
+    python manage.py create_test_data --users 200 --projects 40 --days 90
+    gunicorn tracker.wsgi:application --bind 0.0.0.0:8000 --workers 3 --timeout 120
+    python ../loadtest.py --concurrency 50 --duration 120 --users 200
+
+Rerun with other ``--workers`` values and compare throughput and p95.
+"""
+
+import argparse
+import http.client
+import json
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlsplit
+
+SCENARIOS = ('dashboard', 'submit', 'login', 'report')
+DEFAULT_MIX = 'dashboard=60,submit=25,login=10,report=5'
+PERCENTILES = (50, 90, 95, 99)
+
+
+def parse_mix(value):
+    """'dashboard=60,submit=25' -> {'dashboard': 60.0, 'submit': 25.0}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f"Unknown scenario '{name}'; expected one of: {', '.join(SCENARIOS)}")
+        mix[name] = float(weight)
+    return mix
+
+
+class Stats:
+    """Thread-safe latency and error recording, keyed by request or scenario name"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name, seconds, status):
+        with self._lock:
+            self.latencies[name].append(seconds)
+            self.statuses[name][status] += 1
+            if not isinstance(status, int) or status >= 400:
+                self.errors[name] += 1
+
+    def summary(self, elapsed):
+        rows = {}
+        for name, latencies in sorted(self.latencies.items()):
+            ordered = sorted(latencies)
+            rows[name] = {
+                'requests': len(ordered),
+                'errors': self.errors[name],
+                'error_rate': round(self.errors[name] / len(ordered), 4),
+                'throughput': round(len(ordered) / elapsed, 2),
+                'mean_ms': round(statistics.mean(ordered) * 1000, 1),
+                **{
+                    f"p{p}_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 1)
+                    for p in PERCENTILES
+                },
+                'max_ms': round(ordered[-1] * 1000, 1),
+                'statuses': {str(status): count for status, count in self.statuses[name].items()},
+            }
+        return rows
+
+
+class Client:
+    """One keep-alive connection per virtual user"""
+
+    def __init__(self, base_url, timeout, stats):
+        parts = urlsplit(base_url)
+        self.scheme, self.host = parts.scheme, parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.stats = stats
+        self.token = None
+        self._connection = None
+
+    def _connect(self):
+        connection_class = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        return connection_class(self.host, timeout=self.timeout)
+
+    def request(self, name, method, path, params=None, body=None):
+        """Returns (status, parsed JSON or None); errors are recorded, never raised"""
+        url = f"{self.prefix}{path}" + (f"?{urlencode(params)}" if params else '')
+        headers = {'Accept': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f"Token {self.token}"
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+
+        started = time.perf_counter()
+        status, content = 'error', b''
+        for attempt in range(2):
+            try:
+                if self._connection is None:
+                    self._connection = self._connect()
+                self._connection.request(method, url, body=payload, headers=headers)
+                response = self._connection.getresponse()
+                content = response.read()
+                status = response.status
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                # The server closed an idle keep-alive connection; reconnect once
+                self.close()
+                if attempt:
+                    status = 'disconnected'
+            except (OSError, http.client.HTTPException) as e:
+                self.close()
+                status = type(e).__name__
+                break
+        self.stats.record(name, time.perf_counter() - started, status)
+
+        if isinstance(status, int) and 'json' in (response.getheader('Content-Type') or ''):
+            try:
+                return status, json.loads(content)
+            except ValueError:
+                pass
+        return status, None
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+
+class VirtualUser(threading.Thread):
+    """Logs in, then runs weighted scenarios until the deadline"""
+
+    def __init__(self, index, options, stats, started_at, deadline):
+        super().__init__(daemon=True)
+        self.options = options
+        self.stats = stats
+        self.started_at = started_at
+        self.deadline = deadline
+        self.rng = random.Random(options.seed + index)
+        self.email = f"test_user_{index % options.users + 1}@test.com"
+        self.client = Client(options.base_url, options.timeout, stats)
+        self.admin = Client(options.base_url, options.timeout, stats)
+        self.projects = None
+
+    def run(self):
+        # Spread logins over the ramp-up period
+        time.sleep(self.rng.uniform(0, self.options.ramp_up))
+        self.login()
+        while time.monotonic() < self.deadline:
+            scenario = self.choose_scenario()
+            started = time.perf_counter()
+            ok = getattr(self, scenario)()
+            self.stats.record(f"scenario {scenario}", time.perf_counter() - started, 200 if ok else 'failed')
+            time.sleep(self.rng.expovariate(1 / self.options.think_time) if self.options.think_time else 0)
+        self.client.close()
+        self.admin.close()
+
+    def in_burst(self):
+        if not self.options.burst_every:
+            return False
+        return (time.monotonic() - self.started_at) % self.options.burst_every >= (
+            self.options.burst_every - self.options.burst_length
+        )
+
+    def choose_scenario(self):
+        weights = dict(self.options.mix)
+        if 'submit' in weights and self.in_burst():
+            weights['submit'] *= self.options.burst_factor
+        return self.rng.choices(list(weights), list(weights.values()))[0]
+
+    def login(self, client=None, email=None):
+        client = client or self.client
+        status, data = client.request(
+            'POST /login/', 'POST', '/login/',
+            body={'email': email or self.email, 'password': self.options.password}
+        )
+        if status == 200 and data:
+            client.token = data['token']
+            return True
+        return False
+
+    def dashboard(self):
+        results = [
+            self.client.request('GET /profile/', 'GET', '/profile/'),
+            self.client.request('GET /projects/', 'GET', '/projects/'),
+            self.client.request('GET /time/weekly/', 'GET', '/time/weekly/'),
+        ]
+        if results[1][0] == 200 and isinstance(results[1][1], list):
+            self.projects = [project['id'] for project in results[1][1] if project.get('is_active')]
+        return all(status == 200 for status, _ in results)
+
+    def submit(self):
+        if self.projects is None and not self.dashboard():
+            return False
+        if not self.projects:
+            return True
+        ok = True
+        for project in self.rng.sample(self.projects, min(len(self.projects), self.rng.randint(1, 3))):
+            status, _ = self.client.request('POST /hours/', 'POST', '/hours/', body={
+                'project': project,
+                'date': date.today().isoformat(),
+                'hours': self.rng.choice([1, 1.5, 2, 2.5, 3, 4]),
+                'note': 'Load test',
+            })
+            ok = ok and status in (200, 201)
+        return ok
+
+    def report(self):
+        if self.admin.token is None and not self.login(self.admin, self.options.admin_email):
+            return False
+        month_end = date.today().replace(day=1) - timedelta(days=1)
+        month = {'start_date': month_end.replace(day=1).isoformat(), 'end_date': month_end.isoformat()}
+        status, projects = self.admin.request('GET /projects/ (admin)', 'GET', '/projects/')
+        ok = status == 200
+        status, _ = self.admin.request('GET /time/monthly/', 'GET', '/time/monthly/', {'month': f"{month_end:%Y-%m}"})
+        ok = ok and status == 200
+        if isinstance(projects, list) and projects:
+            project = self.rng.choice(projects)['id']
+            status, _ = self.admin.request(
+                'GET /projects/<id>/time-report/', 'GET', f'/projects/{project}/time-report/', month
+            )
+            ok = ok and status == 200
+        status, _ = self.admin.request(
+            'GET /reports/render/', 'GET', '/reports/render/',
+            {'type': 'team', 'format': self.options.report_format, **month}
+        )
+        return ok and status == 200
+
+
+def print_table(title, rows, out):
+    out.write(f"\n{title}\n")
+    out.write(f"{'name':<34} {'count':>7} {'err %':>6} {'req/s':>7} "
+              + ' '.join(f"{f'p{p} ms':>8}" for p in PERCENTILES) + f" {'max ms':>8}\n")
+    for name, row in rows.items():
+        out.write(
+            f"{name:<34} {row['requests']:>7} {row['error_rate'] * 100:>6.1f} {row['throughput']:>7.1f} "
+            + ' '.join(f"{row[f'p{p}_ms']:>8.1f}" for p in PERCENTILES) + f" {row['max_ms']:>8.1f}\n"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulate realistic timesheet traffic against a running server')
+    parser.add_argument('--base-url', default='http://localhost:8000/api', help='API root (default: %(default)s)')
+    parser.add_argument('--concurrency', type=int, default=20, help='Virtual users (default: %(default)s)')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds to run (default: %(default)s)')
+    parser.add_argument('--ramp-up', type=float, default=5, help='Seconds over which users start (default: %(default)s)')
+    parser.add_argument('--users', type=int, default=50,
+                        help='Distinct accounts test_user_1..N to log in as (default: %(default)s)')
+    parser.add_argument('--password', default='testpass123', help='Password of the test accounts')
+    parser.add_argument('--admin-email', default='test_admin@test.com', help='Admin account for reports')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f'Scenario weights (default: {DEFAULT_MIX})')
+    parser.add_argument('--think-time', type=float, default=1.0,
+                        help='Mean seconds between scenarios per user, 0 for none (default: %(default)s)')
+    parser.add_argument('--burst-every', type=float, default=60,
+                        help='Seconds between end-of-day submission bursts, 0 to disable (default: %(default)s)')
+    parser.add_argument('--burst-length', type=float, default=15, help='Burst length in seconds (default: %(default)s)')
+    parser.add_argument('--burst-factor', type=float, default=5,
+                        help='Submission weight multiplier during bursts (default: %(default)s)')
+    parser.add_argument('--report-format', choices=['pdf', 'html'], default='pdf',
+                        help='Rendered report format (default: %(default)s)')
+    parser.add_argument('--timeout', type=float, default=30, help='Request timeout in seconds (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed (default: %(default)s)')
+    parser.add_argument('--json', dest='json_path', help='Also write results to this JSON file')
+    options = parser.parse_args(argv)
+
+    stats = Stats()
+    started_at = time.monotonic()
+    deadline = started_at + options.duration
+    print(f"🚀 {options.concurrency} virtual users against {options.base_url} for {options.duration:.0f}s")
+    users = [VirtualUser(i, options, stats, started_at, deadline) for i in range(options.concurrency)]
+    for user in users:
+        user.start()
+    for user in users:
+        # Let in-flight requests finish, but don't wait forever
+        user.join(timeout=max(0, deadline - time.monotonic()) + options.timeout * 2)
+    elapsed = time.monotonic() - started_at
+
+    summary = stats.summary(elapsed)
+    requests = {name: row for name, row in summary.items() if not name.startswith('scenario ')}
+    scenarios = {name: row for name, row in summary.items() if name.startswith('scenario ')}
+    total = sum(row['requests'] for row in requests.values())
+    errors = sum(row['errors'] for row in requests.values())
+
+    print_table('Requests', requests, sys.stdout)
+    print_table('Scenarios', scenarios, sys.stdout)
+    print(f"\nTotal: {total} requests in {elapsed:.1f}s = {total / elapsed:.1f} req/s, "
+          f"{errors} errors ({errors / max(total, 1) * 100:.2f}%)")
+
+    if options.json_path:
+        with open(options.json_path, 'w', encoding='utf-8') as json_file:
+            json.dump({
+                'config': {key: value for key, value in vars(options).items() if key != 'password'},
+                'elapsed': round(elapsed, 2),
+                'total_requests': total,
+                'total_errors': errors,
+                'throughput': round(total / elapsed, 2),
+                'requests': requests,
+                'scenarios': scenarios,
+            }, json_file, indent=2)
+        print(f"✅ Results written to {options.json_path}")
+    return 1 if total == 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
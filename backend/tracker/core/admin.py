@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Project, HourEntry, ProjectAssignment
+from .models import User, Project, HourEntry, ProjectAssignment, HourArchive
 
 class UserAdmin(BaseUserAdmin):
     # Fields to display in the user list
@@ -46,8 +46,13 @@ class ProjectAssignmentAdmin(admin.ModelAdmin):
     search_fields = ('project__name', 'user__username', 'assigned_by__username')
     ordering = ('-assigned_date',)
 
+class HourArchiveAdmin(admin.ModelAdmin):
+    list_display = ('period_start', 'period_end', 'entry_count', 'total_hours', 'file_path', 'archived_at')
+    ordering = ('-period_end',)
+
 # Register models with their admin classes
 admin.site.register(User, UserAdmin)
 admin.site.register(Project, ProjectAdmin)
 admin.site.register(HourEntry, HourEntryAdmin)
 admin.site.register(ProjectAssignment, ProjectAssignmentAdmin)
+admin.site.register(HourArchive, HourArchiveAdmin)
@@ -0,0 +1,220 @@
+"""
+Columnar analytics export (Parquet)
+
+``manage.py export_analytics`` and ``/api/analytics/export/`` write hour
+entries joined with their user and project dimensions as Parquet files
+partitioned by month (``hour_entries/month=YYYY-MM/part-0.parquet``), which
+pandas, Spark, DuckDB and warehouse loaders read as one Hive-partitioned
+dataset.
+
+Rows are read month by month with ``values_list().iterator()`` (a
+server-side cursor on PostgreSQL) and written as Arrow record batches of
+EXPORT_CHUNK_SIZE rows, so memory stays bounded by one batch.
+
+A manifest next to the data records a fingerprint per month (row count, hour
+total, highest id and latest updated_at, all from one grouped query).
+Incremental runs rewrite only months whose fingerprint changed and remove
+months that no longer have entries. Months before the archive boundary are
+kept: ``archive_hours`` moved their entries to cold storage, and their last
+export stays the analytics history for them. Changes to user or project
+names alone do not alter a fingerprint; use a full export after renames.
+
+pyarrow is imported lazily so the rest of the app works without it.
+"""
+
+import json
+import os
+import shutil
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from django.db.models import Count, Max, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .archive import get_archive_boundary
+from .models import HourEntry
+from .partitioning import add_months
+
+EXPORT_CHUNK_SIZE = 10000
+DATASET = 'hour_entries'
+MANIFEST_FILE = '_manifest.json'
+MANIFEST_VERSION = 1
+
+# (column name, values_list field, arrow type name)
+COLUMNS = [
+    ('entry_id', 'id', 'int64'),
+    ('date', 'date', 'date32'),
+    ('hours', 'hours', 'hours'),
+    ('note', 'note', 'string'),
+    ('updated_at', 'updated_at', 'timestamp'),
+    ('user_id', 'user_id', 'int64'),
+    ('username', 'user__username', 'string'),
+    ('user_email', 'user__email', 'string'),
+    ('user_first_name', 'user__first_name', 'string'),
+    ('user_last_name', 'user__last_name', 'string'),
+    ('user_is_admin', 'user__is_admin', 'bool'),
+    ('project_id', 'project_id', 'int64'),
+    ('project_name', 'project__name', 'string'),
+    ('project_client', 'project__client', 'string'),
+    ('project_start_date', 'project__start_date', 'date32'),
+    ('project_end_date', 'project__end_date', 'date32'),
+]
+
+
+class AnalyticsExportUnavailable(Exception):
+    """pyarrow is not installed"""
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise AnalyticsExportUnavailable('Analytics export requires pyarrow (pip install pyarrow)')
+    return pyarrow
+
+
+def arrow_schema():
+    pa = _pyarrow()
+    types = {
+        'int64': pa.int64(),
+        'date32': pa.date32(),
+        'string': pa.string(),
+        'bool': pa.bool_(),
+        'timestamp': pa.timestamp('us', tz='UTC'),
+        'hours': pa.decimal128(5, 2),
+    }
+    return pa.schema([pa.field(name, types[kind]) for name, _, kind in COLUMNS])
+
+
+def month_key(month: date) -> str:
+    return f"{month:%Y-%m}"
+
+
+def month_path(output_dir: str, key: str) -> str:
+    return os.path.join(output_dir, DATASET, f"month={key}", 'part-0.parquet')
+
+
+def month_fingerprints() -> Dict[str, Dict[str, Any]]:
+    """Per-month fingerprint of the hour entry table in one grouped query"""
+    rows = HourEntry.objects.order_by().annotate(month=TruncMonth('date')).values('month').annotate(
+        count=Count('id'), total_hours=Sum('hours'), max_id=Max('id'), latest=Max('updated_at')
+    )
+    return {
+        month_key(row['month']): {
+            'count': row['count'],
+            'total_hours': str(row['total_hours']),
+            'max_id': row['max_id'],
+            'latest': row['latest'].isoformat() if row['latest'] else None,
+        }
+        for row in rows
+    }
+
+
+def load_manifest(output_dir: str) -> Dict[str, Any]:
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {'version': MANIFEST_VERSION, 'months': {}}
+    with open(path, encoding='utf-8') as manifest_file:
+        manifest = json.load(manifest_file)
+    if manifest.get('version') != MANIFEST_VERSION:
+        # Unknown layout: start over with a full export
+        return {'version': MANIFEST_VERSION, 'months': {}}
+    return manifest
+
+
+def save_manifest(output_dir: str, manifest: Dict[str, Any]):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def write_month(month: date, path: str) -> int:
+    """Write one month of entries to ``path`` batch by batch; returns the row count"""
+    pa = _pyarrow()
+    schema = arrow_schema()
+    fields = [field for _, field, _ in COLUMNS]
+    entries = HourEntry.objects.filter(date__gte=month, date__lt=add_months(month, 1)).order_by('date', 'id')
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    rows_written = 0
+    with pa.parquet.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+        batch: List[tuple] = []
+        for row in entries.values_list(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            batch.append(row)
+            if len(batch) >= EXPORT_CHUNK_SIZE:
+                writer.write_batch(pa.record_batch(list(zip(*batch)), schema=schema))
+                rows_written += len(batch)
+                batch = []
+        if batch:
+            writer.write_batch(pa.record_batch(list(zip(*batch)), schema=schema))
+            rows_written += len(batch)
+    # Readers never see a half-written month
+    os.replace(tmp_path, path)
+    return rows_written
+
+
+def export_analytics(output_dir: str, full: bool = False) -> Dict[str, Any]:
+    """
+    Export hour entries as month-partitioned Parquet under ``output_dir``
+
+    Returns {'exported': [months], 'removed': [months], 'unchanged': n, 'rows': n}.
+    """
+    _pyarrow()
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    previous = {} if full else manifest['months']
+    # Fingerprints are taken before reading rows, so changes made during the
+    # export make the month differ again on the next run
+    current = month_fingerprints()
+
+    exported, rows = [], 0
+    for key in sorted(current):
+        fingerprint = current[key]
+        known = previous.get(key)
+        path = month_path(output_dir, key)
+        if known and known.get('fingerprint') == fingerprint and os.path.exists(path):
+            continue
+        month = datetime.strptime(key, '%Y-%m').date()
+        written = write_month(month, path)
+        manifest['months'][key] = {
+            'fingerprint': fingerprint,
+            'rows': written,
+            'file': os.path.relpath(path, output_dir),
+            'exported_at': timezone.now().isoformat(),
+        }
+        exported.append(key)
+        rows += written
+        # Keep progress if a later month fails
+        save_manifest(output_dir, manifest)
+
+    # Archived months have no hot rows left, but their export is still the only copy
+    boundary = get_archive_boundary()
+    removed = sorted(
+        key for key in set(manifest['months']) - set(current)
+        if boundary is None or datetime.strptime(key, '%Y-%m').date() >= boundary
+    )
+    for key in removed:
+        shutil.rmtree(os.path.dirname(month_path(output_dir, key)), ignore_errors=True)
+        del manifest['months'][key]
+
+    manifest['generated_at'] = timezone.now().isoformat()
+    save_manifest(output_dir, manifest)
+    return {
+        'exported': exported,
+        'removed': removed,
+        'unchanged': len(current) - len(exported),
+        'rows': rows,
+    }
+
+
+def exported_month_file(output_dir: str, key: str) -> Optional[str]:
+    """Path of an exported month listed in the manifest, or None"""
+    entry = load_manifest(output_dir)['months'].get(key)
+    if not entry:
+        return None
+    path = month_path(output_dir, key)
+    return path if os.path.exists(path) else None
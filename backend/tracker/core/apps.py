@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from django.conf import settings
+        from django.db.backends.signals import connection_created
+        if getattr(settings, 'SLOW_QUERY_MS', 0):
+            from .slow_queries import install
+            connection_created.connect(install, dispatch_uid='core.slow_queries')
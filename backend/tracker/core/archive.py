@@ -0,0 +1,156 @@
+"""
+Cold-storage archival of old hour entries
+
+``manage.py archive_hours --before=YYYY-MM-DD`` moves whole months of
+HourEntry rows out of the hot table. Raw rows (with notes) are written to a
+gzip-compressed JSON lines file per month and their per-day totals are kept
+in ArchivedHourTotal. Summary and report endpoints read through to the
+archived totals when a requested range starts before the archive boundary.
+"""
+
+import gzip
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+
+from .models import ArchivedHourTotal, HourArchive, HourEntry
+
+ARCHIVE_CHUNK_SIZE = 2000
+
+
+def _as_date(value) -> Optional[date]:
+    if value is None or isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def get_archive_boundary() -> Optional[date]:
+    """Exclusive end of the archived history, or None if nothing is archived"""
+    return HourArchive.objects.aggregate(boundary=Max('period_end'))['boundary']
+
+
+def archived_totals(start_date=None, end_date=None):
+    """
+    ArchivedHourTotal queryset for the archived part of [start_date, end_date]
+
+    Returns None when the range lies entirely after the archive boundary, so
+    callers skip the extra query for current data.
+    """
+    start_date, end_date = _as_date(start_date), _as_date(end_date)
+    boundary = get_archive_boundary()
+    if boundary is None or (start_date is not None and start_date >= boundary):
+        return None
+
+    queryset = ArchivedHourTotal.objects.all()
+    if start_date:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+    return queryset
+
+
+def combined_total(querysets: Iterable) -> Decimal:
+    """Sum of hours across hot and archived querysets"""
+    return sum(
+        (queryset.aggregate(total=Sum('hours'))['total'] or Decimal('0') for queryset in querysets),
+        Decimal('0')
+    )
+
+
+def combined_daily_totals(querysets: Iterable) -> Dict[date, Decimal]:
+    """Hours per date across hot and archived querysets, one grouped query each"""
+    totals: Dict[date, Decimal] = {}
+    for queryset in querysets:
+        for row in queryset.order_by().values('date').annotate(total=Sum('hours')):
+            totals[row['date']] = totals.get(row['date'], Decimal('0')) + row['total']
+    return totals
+
+
+def combined_breakdown(querysets: Iterable, fields: List[str]) -> List[Dict]:
+    """
+    ``values(*fields).annotate(total_hours=Sum('hours'))`` merged across
+    querysets and ordered by total_hours descending
+    """
+    merged: Dict[tuple, Dict] = {}
+    for queryset in querysets:
+        for row in queryset.order_by().values(*fields).annotate(total_hours=Sum('hours')):
+            key = tuple(row[field] for field in fields)
+            if key in merged:
+                merged[key]['total_hours'] += row['total_hours']
+            else:
+                merged[key] = row
+    return sorted(merged.values(), key=lambda row: row['total_hours'], reverse=True)
+
+
+def archive_file_path(month: date) -> str:
+    return os.path.join(settings.HOUR_ARCHIVE_DIR, f"hours_{month:%Y%m}.jsonl.gz")
+
+
+def archive_period(period_start: date, period_end: date) -> HourArchive:
+    """
+    Move hour entries in [period_start, period_end) to cold storage
+
+    The compressed file is written first and the database changes happen in
+    one transaction afterwards, so an interrupted run leaves the hot table
+    intact and can simply be repeated.
+    """
+    entries = HourEntry.objects.filter(date__gte=period_start, date__lt=period_end).order_by()
+
+    path = archive_file_path(period_start)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Append a suffix if the month was archived before (late entries)
+    if os.path.exists(path) and HourArchive.objects.filter(file_path=path).exists():
+        path = path.replace('.jsonl.gz', f"_{datetime.now():%Y%m%d%H%M%S}.jsonl.gz")
+    max_id = 0
+    with gzip.open(path, 'wt', encoding='utf-8') as archive_file:
+        for entry in entries.values('id', 'user_id', 'project_id', 'date', 'hours', 'note').iterator(
+            chunk_size=ARCHIVE_CHUNK_SIZE
+        ):
+            max_id = max(max_id, entry['id'])
+            entry['date'] = entry['date'].isoformat()
+            entry['hours'] = str(entry['hours'])
+            archive_file.write(json.dumps(entry) + '\n')
+
+    # Entries created after the file was written are left in the hot table
+    entries = entries.filter(id__lte=max_id)
+
+    with transaction.atomic():
+        new_totals = list(entries.values('user_id', 'project_id', 'date').annotate(
+            total=Sum('hours'), count=Count('id')
+        ))
+        existing = {
+            (total.user_id, total.project_id, total.date): total
+            for total in ArchivedHourTotal.objects.filter(date__gte=period_start, date__lt=period_end)
+        }
+        to_create, to_update = [], []
+        for row in new_totals:
+            total = existing.get((row['user_id'], row['project_id'], row['date']))
+            if total is None:
+                to_create.append(ArchivedHourTotal(
+                    user_id=row['user_id'], project_id=row['project_id'], date=row['date'],
+                    hours=row['total'], entry_count=row['count']
+                ))
+            else:
+                total.hours += row['total']
+                total.entry_count += row['count']
+                to_update.append(total)
+        ArchivedHourTotal.objects.bulk_create(to_create, batch_size=ARCHIVE_CHUNK_SIZE)
+        ArchivedHourTotal.objects.bulk_update(to_update, ['hours', 'entry_count'], batch_size=ARCHIVE_CHUNK_SIZE)
+
+        entry_count = sum(row['count'] for row in new_totals)
+        total_hours = sum((row['total'] for row in new_totals), Decimal('0'))
+        entries.delete()
+
+        return HourArchive.objects.create(
+            period_start=period_start,
+            period_end=period_end,
+            file_path=path,
+            entry_count=entry_count,
+            total_hours=total_hours
+        )
@@ -1,49 +1,57 @@
 from django.contrib.auth.backends import ModelBackend
 from django.contrib.auth import get_user_model
 from django.db.models import Q
+from django.db.models.functions import Lower
 
 class EmailBackend(ModelBackend):
+    """
+    Authenticate with either an email address or a username.
+
+    Candidates are fetched with a single query on ``lower(email)`` or
+    ``username``, both backed by unique indexes, and exactly one password
+    hash is computed per attempt. Misses hash a dummy password so a failed
+    login costs the same as a successful one.
+    """
+
     def authenticate(self, request, username=None, password=None, **kwargs):
         UserModel = get_user_model()
-        try:
-            # Try to authenticate with either email or username
-            # The 'username' parameter can contain either email or actual username
-            user = None
-            
-            # First, try to find user by email
-            if '@' in username:  # Likely an email
-                users = UserModel.objects.filter(email=username, is_active=True)
-                for user_obj in users:
-                    if user_obj.check_password(password):
-                        user = user_obj
-                        break
-            
-            # If no user found by email, try by username
-            if not user:
-                try:
-                    user_obj = UserModel.objects.get(username=username, is_active=True)
-                    if user_obj.check_password(password):
-                        user = user_obj
-                except UserModel.DoesNotExist:
-                    pass
-            
-            # If still no user found and the input doesn't contain @, try it as email too
-            # (in case someone has an email without @ due to data issues)
-            if not user and '@' not in username:
-                users = UserModel.objects.filter(email=username, is_active=True)
-                for user_obj in users:
-                    if user_obj.check_password(password):
-                        user = user_obj
-                        break
-            
-            return user
-            
-        except Exception as e:
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+
+        # The 'username' parameter can contain either email or actual username.
+        # Filtering on Lower('email') matches the functional unique index.
+        candidates = list(
+            UserModel.objects.alias(email_lower=Lower('email')).filter(
+                Q(email_lower=username.lower()) | Q(username=username),
+                is_active=True
+            )[:2]
+        )
+
+        # An email match wins for inputs that look like an email, otherwise
+        # prefer the exact username match (the same precedence as before)
+        email_matches = [user for user in candidates if user.email.lower() == username.lower()]
+        username_matches = [user for user in candidates if user.username == username]
+        if '@' in username:
+            ordered = email_matches + username_matches
+        else:
+            ordered = username_matches + email_matches
+
+        if not ordered:
+            # Run the default password hasher once to reduce the timing
+            # difference between an existing and a nonexistent user
+            UserModel().set_password(password)
             return None
-        
+
+        user = ordered[0]
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
+
     def get_user(self, user_id):
         UserModel = get_user_model()
         try:
             return UserModel.objects.get(pk=user_id)
         except UserModel.DoesNotExist:
-            return None 
\ No newline at end of file
+            return None
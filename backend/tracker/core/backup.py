@@ -0,0 +1,421 @@
+"""
+Streaming, incremental database backups
+
+``manage.py backup`` writes every core table as gzip-compressed JSON lines
+into a content-addressed store::
+
+    BACKUP_DIR/
+        manifests/backup_YYYYMMDD_HHMMSS.json
+        chunks/ab/ab12…ef.jsonl.gz
+
+Each line is a JSON array of the model's concrete field values (attnames,
+listed once per table in the manifest), read in primary key order with
+``values_list().iterator()``. Rows are split into chunks of a fixed number of
+rows and every chunk is stored under the SHA-256 of its uncompressed lines,
+so a chunk that already exists in the store is never written again. Row
+counts and checksums are computed while writing; each table is read once and
+never held in memory. Full copies of a table also record per-bucket
+checksums (see core.checksums), so ``verify_data`` can compare a database
+with the backup without reading any chunks.
+
+Incremental backups (``--incremental``) chain to the latest manifest. Tables
+with an ``updated_at`` column only store rows changed since the parent's
+watermark (``updated_at`` minus WATERMARK_OVERLAP, or a primary key above the
+parent's highest) plus the ranges of primary keys that still exist, which is
+how deletions are recorded. Other tables are small and re-read in full, but
+their unchanged chunks deduplicate against the store. Restoring replays the
+chain: the newest copy of each row wins and rows outside the newest live
+ranges are dropped.
+
+Tables are dumped in parallel threads. On PostgreSQL the threads share an
+exported snapshot, so the backup is consistent as of one moment; on other
+databases each table is read in its own transaction (use ``--workers=1`` for
+a single transaction). Chunks are written before the manifest, so an
+interrupted run leaves at most unreferenced chunks behind.
+"""
+
+import bisect
+import gzip
+import hashlib
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+from django.apps import apps
+from django.db import connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .checksums import BucketHasher, bucket_function, row_digest
+from .models import ArchivedHourTotal, HourArchive, HourEntry, Project, ProjectAssignment, User
+
+BACKUP_FORMAT_VERSION = 2
+BACKUP_CHUNK_SIZE = 50000
+BACKUP_FETCH_SIZE = 2000
+CHUNKS_DIR = 'chunks'
+MANIFESTS_DIR = 'manifests'
+
+# Tables with this column are backed up incrementally
+WATERMARK_FIELD = 'updated_at'
+# Rows committed late with an earlier updated_at are still picked up
+WATERMARK_OVERLAP = timedelta(minutes=10)
+
+# Dependency order: restores load tables top to bottom
+BACKUP_MODELS = [
+    ('users', User),
+    ('projects', Project),
+    ('project_assignments', ProjectAssignment),
+    ('hour_entries', HourEntry),
+    ('archived_hour_totals', ArchivedHourTotal),
+    ('hour_archives', HourArchive),
+]
+
+
+class BackupError(Exception):
+    """Missing or corrupted backup data"""
+
+
+def model_fields(model) -> List[str]:
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def has_watermark(model) -> bool:
+    return WATERMARK_FIELD in model_fields(model)
+
+
+def _json_default(value):
+    # Full precision, unlike DjangoJSONEncoder which truncates microseconds
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def encode_row(row) -> bytes:
+    return (json.dumps(row, default=_json_default, ensure_ascii=False, separators=(',', ':')) + '\n').encode()
+
+
+def chunk_path(root: str, sha256: str) -> str:
+    return os.path.join(root, CHUNKS_DIR, sha256[:2], f"{sha256}.jsonl.gz")
+
+
+class ChunkWriter:
+    """One gzip chunk, moved to its content address in the store when closed"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.rows = 0
+        self.first_pk = None
+        self.last_pk = None
+        self.sha256 = hashlib.sha256()
+        os.makedirs(os.path.join(root, CHUNKS_DIR), exist_ok=True)
+        self._tmp_path = os.path.join(root, CHUNKS_DIR, f"tmp-{uuid.uuid4().hex}.partial")
+        self._raw = open(self._tmp_path, 'wb')
+        # Fixed mtime: identical rows always produce identical files
+        self._gzip = gzip.GzipFile(filename='', mode='wb', fileobj=self._raw, mtime=0)
+
+    def write(self, line: bytes, pk):
+        self._gzip.write(line)
+        self.sha256.update(line)
+        if self.first_pk is None:
+            self.first_pk = pk
+        self.last_pk = pk
+        self.rows += 1
+
+    def close(self):
+        """Returns (manifest entry, whether a new file was stored)"""
+        self._gzip.close()
+        self._raw.close()
+        digest = self.sha256.hexdigest()
+        path = chunk_path(self.root, digest)
+        stored = not os.path.exists(path)
+        if stored:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self._tmp_path, path)
+        else:
+            os.remove(self._tmp_path)
+        return {
+            'sha256': digest,
+            'rows': self.rows,
+            'first_pk': self.first_pk,
+            'last_pk': self.last_pk,
+            'bytes': os.path.getsize(path),
+        }, stored
+
+
+def pk_ranges(model, using: str = 'default') -> List[List[int]]:
+    """Primary keys present in the table as sorted [first, last] runs"""
+    ranges: List[List[int]] = []
+    pks = model._base_manager.using(using).order_by('pk').values_list('pk', flat=True)
+    for pk in pks.iterator(chunk_size=BACKUP_FETCH_SIZE * 10):
+        if ranges and ranges[-1][1] == pk - 1:
+            ranges[-1][1] = pk
+        else:
+            ranges.append([pk, pk])
+    return ranges
+
+
+def in_ranges(ranges: List[List[int]], starts: List[int], pk: int) -> bool:
+    index = bisect.bisect_right(starts, pk) - 1
+    return index >= 0 and ranges[index][1] >= pk
+
+
+def dump_table(root: str, name: str, model, chunk_size: int = BACKUP_CHUNK_SIZE,
+               using: str = 'default', since: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Stream one table into the chunk store; returns its manifest entry
+
+    ``since`` is the parent's watermark; when given, only rows changed after
+    it are stored, together with the live primary key ranges.
+    """
+    fields = model_fields(model)
+    pk_index = fields.index(model._meta.pk.attname)
+    watermark_index = fields.index(WATERMARK_FIELD) if has_watermark(model) else None
+
+    rows = model._base_manager.using(using).order_by('pk').values_list(*fields)
+    if since is not None:
+        changed = Q(pk__gt=since['max_pk'])
+        if since['updated_at']:
+            changed |= Q(**{f"{WATERMARK_FIELD}__gt": parse_datetime(since['updated_at']) - WATERMARK_OVERLAP})
+        rows = rows.filter(changed)
+
+    table_hash = hashlib.sha256()
+    # Full copies also record bucket checksums for verify_data
+    buckets = BucketHasher() if since is None else None
+    bucket_of = bucket_function(model, fields)
+    concrete_fields = model._meta.concrete_fields
+    chunks, writer, stored_count = [], None, 0
+    max_pk = since['max_pk'] if since else None
+    max_updated = parse_datetime(since['updated_at']) if since and since['updated_at'] else None
+    for row in rows.iterator(chunk_size=BACKUP_FETCH_SIZE):
+        if writer is None or writer.rows >= chunk_size:
+            if writer is not None:
+                chunk, stored = writer.close()
+                chunks.append(chunk)
+                stored_count += stored
+            writer = ChunkWriter(root)
+        line = encode_row(row)
+        writer.write(line, row[pk_index])
+        table_hash.update(line)
+        if buckets is not None:
+            buckets.update(bucket_of(row), row_digest(concrete_fields, row))
+        max_pk = row[pk_index] if max_pk is None else max(max_pk, row[pk_index])
+        if watermark_index is not None and row[watermark_index] is not None:
+            max_updated = row[watermark_index] if max_updated is None else max(max_updated, row[watermark_index])
+    if writer is not None:
+        chunk, stored = writer.close()
+        chunks.append(chunk)
+        stored_count += stored
+
+    entry = {
+        'model': model._meta.label,
+        'fields': fields,
+        'mode': 'full' if since is None else 'changes',
+        'rows': sum(chunk['rows'] for chunk in chunks),
+        'sha256': table_hash.hexdigest(),
+        'chunks': chunks,
+        'chunks_stored': stored_count,
+    }
+    if buckets is not None:
+        entry['buckets'] = buckets.result()
+    if watermark_index is not None:
+        entry['watermark'] = {
+            'max_pk': max_pk or 0,
+            'updated_at': max_updated.isoformat() if max_updated else None,
+        }
+    if since is not None:
+        entry['live_pks'] = pk_ranges(model, using)
+        entry['live_rows'] = sum(last - first + 1 for first, last in entry['live_pks'])
+    return entry
+
+
+def table_checksum(model, using: str = 'default'):
+    """(rows, sha256) of a table, encoded exactly as a full backup encodes it"""
+    table_hash = hashlib.sha256()
+    rows = 0
+    queryset = model._base_manager.using(using).order_by('pk').values_list(*model_fields(model))
+    for row in queryset.iterator(chunk_size=BACKUP_FETCH_SIZE):
+        table_hash.update(encode_row(row))
+        rows += 1
+    return rows, table_hash.hexdigest()
+
+
+def _dump_in_thread(root, name, model, chunk_size, using, since, snapshot):
+    connection = connections[using]
+    try:
+        with transaction.atomic(using=using):
+            if snapshot:
+                with connection.cursor() as cursor:
+                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                    cursor.execute("SET TRANSACTION SNAPSHOT %s", [snapshot])
+            return dump_table(root, name, model, chunk_size, using, since)
+    finally:
+        # Threads get their own connections; don't leak them
+        connection.close()
+
+
+def _dump_tables(root, chunk_size, workers, using, watermarks, snapshot=None) -> Dict[str, Dict[str, Any]]:
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            name: pool.submit(_dump_in_thread, root, name, model, chunk_size, using, watermarks.get(name), snapshot)
+            for name, model in BACKUP_MODELS
+        }
+        return {name: future.result() for name, future in futures.items()}
+
+
+def manifest_path(root: str, name: str) -> str:
+    return os.path.join(root, MANIFESTS_DIR, f"{name}.json")
+
+
+def list_manifests(root: str) -> List[str]:
+    """Backup names in the store, oldest first"""
+    directory = os.path.join(root, MANIFESTS_DIR)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(filename[:-len('.json')] for filename in os.listdir(directory) if filename.endswith('.json'))
+
+
+def load_manifest(root: str, name: str) -> Dict[str, Any]:
+    try:
+        with open(manifest_path(root, name), encoding='utf-8') as manifest_file:
+            return json.load(manifest_file)
+    except FileNotFoundError:
+        raise BackupError(f"Backup {name} not found in {root}")
+
+
+def write_manifest(root: str, manifest: Dict[str, Any]):
+    path = manifest_path(root, manifest['name'])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.tmp", 'w', encoding='utf-8') as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    os.replace(f"{path}.tmp", path)
+
+
+def resolve_chain(root: str, name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Manifests from the full backup up to ``name`` (default: latest), oldest first"""
+    if name is None:
+        names = list_manifests(root)
+        if not names:
+            raise BackupError(f"No backups in {root}")
+        name = names[-1]
+    chain = [load_manifest(root, name)]
+    while chain[0].get('parent'):
+        chain.insert(0, load_manifest(root, chain[0]['parent']))
+    return chain
+
+
+def create_backup(root: str, name: Optional[str] = None, incremental: bool = False, workers: int = 4,
+                  chunk_size: int = BACKUP_CHUNK_SIZE, using: str = 'default') -> Dict[str, Any]:
+    """
+    Back up every table in BACKUP_MODELS into the store at ``root``
+
+    With ``incremental`` the backup chains to the latest manifest in the
+    store (a full backup is taken if there is none). Returns the manifest.
+    """
+    name = name or f"backup_{datetime.now():%Y%m%d_%H%M%S}"
+    if os.path.exists(manifest_path(root, name)):
+        raise FileExistsError(f"Backup {name} already exists in {root}")
+    existing = list_manifests(root)
+    parent = load_manifest(root, existing[-1]) if incremental and existing else None
+
+    watermarks = {}
+    if parent:
+        for table_name, model in BACKUP_MODELS:
+            table = parent['tables'].get(table_name)
+            # A schema change since the parent means a fresh full copy
+            if table and table.get('watermark') and table['fields'] == model_fields(model):
+                watermarks[table_name] = table['watermark']
+
+    connection = connections[using]
+    started_at = timezone.now()
+    # Other connections cannot see an open transaction's rows (e.g. in tests),
+    # so dump on this connection instead
+    parallel = workers > 1 and not connection.in_atomic_block
+    if not parallel:
+        with transaction.atomic(using=using):
+            tables = {
+                table_name: dump_table(root, table_name, model, chunk_size, using, watermarks.get(table_name))
+                for table_name, model in BACKUP_MODELS
+            }
+    elif connection.vendor == 'postgresql':
+        # Hold a snapshot open and let every worker read from it
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cursor.execute("SELECT pg_export_snapshot()")
+            snapshot = cursor.fetchone()[0]
+            tables = _dump_tables(root, chunk_size, workers, using, watermarks, snapshot)
+    else:
+        tables = _dump_tables(root, chunk_size, workers, using, watermarks)
+
+    manifest = {
+        'format': BACKUP_FORMAT_VERSION,
+        'name': name,
+        'type': 'incremental' if parent else 'full',
+        'parent': parent['name'] if parent else None,
+        'created_at': started_at.isoformat(),
+        'database': connection.vendor,
+        'chunk_size': chunk_size,
+        'tables': tables,
+    }
+    write_manifest(root, manifest)
+    return manifest
+
+
+def read_chunk(root: str, chunk: Dict[str, Any]) -> List[list]:
+    """Rows of one chunk, after checking its row count and checksum"""
+    path = chunk_path(root, chunk['sha256'])
+    try:
+        with gzip.open(path, 'rb') as chunk_file:
+            content = chunk_file.read()
+    except FileNotFoundError:
+        raise BackupError(f"Missing chunk {chunk['sha256']}")
+    if hashlib.sha256(content).hexdigest() != chunk['sha256']:
+        raise BackupError(f"Checksum mismatch in chunk {chunk['sha256']}")
+    rows = [json.loads(line) for line in content.splitlines()]
+    if len(rows) != chunk['rows']:
+        raise BackupError(f"Row count mismatch in chunk {chunk['sha256']}")
+    return rows
+
+
+def iter_table_chunks(root: str, chain: List[Dict[str, Any]], table_name: str) -> Iterator[tuple]:
+    """
+    Replay ``table_name`` across a backup chain
+
+    Yields (chunk, [row dicts]) newest backup first. Each primary key is
+    yielded once, from the newest backup that holds it, and only if it is
+    still live in the newest backup.
+    """
+    latest = chain[-1]['tables'].get(table_name)
+    if latest is None:
+        return
+    live = latest.get('live_pks')
+    live_starts = [first for first, _ in live] if live else None
+    seen = set()
+
+    for manifest in reversed(chain):
+        table = manifest['tables'].get(table_name)
+        if table is None:
+            break
+        pk_name = apps.get_model(table['model'])._meta.pk.attname
+        pk_index = table['fields'].index(pk_name)
+        # Only rows from incremental backups can shadow older copies
+        track = table['mode'] == 'changes'
+        for chunk in table['chunks']:
+            rows = []
+            for values in read_chunk(root, chunk):
+                pk = values[pk_index]
+                if pk in seen or (live is not None and not in_ranges(live, live_starts, pk)):
+                    continue
+                if track:
+                    seen.add(pk)
+                rows.append(dict(zip(table['fields'], values)))
+            yield chunk, rows
+        if table['mode'] == 'full':
+            break
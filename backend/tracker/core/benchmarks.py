@@ -0,0 +1,331 @@
+"""
+Endpoint benchmarks
+
+``manage.py benchmark`` seeds a throwaway test database with a synthetic
+dataset (create_test_data with a fixed seed and end date, so every run sees
+the same rows), then calls every route in core/urls.py as an admin and as a
+regular user through the test client. For each endpoint and role it records:
+
+* p50/p95 latency over a number of iterations (after one warm-up request)
+* SQL queries, rows fetched from the database and total database time
+* response status and size
+
+The cache is cleared before every request, so results reflect the uncached
+path. Results are written as JSON; comparing them with a stored baseline
+flags endpoints whose query count went up or whose rows, size or latency
+grew past a threshold.
+"""
+
+import io
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.utils import CursorDebugWrapper
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .middleware import QueryTimer
+from .models import HourEntry, Project, User
+
+DATASETS = {
+    'small': {'users': 10, 'projects': 8, 'days': 60},
+    'medium': {'users': 100, 'projects': 40, 'days': 365},
+    'large': {'users': 400, 'projects': 120, 'days': 730},
+}
+# Fixed so that datasets, and with them query counts and rows, are reproducible
+DATASET_END = date(2025, 6, 30)
+DATASET_SEED = 42
+ITERATIONS = 10
+# Query budgets are checked on two sizes that differ in every dimension, so a
+# count that depends on the number of rows shows up as a difference
+BUDGET_DATASETS = {
+    'budget_small': {'users': 3, 'projects': 3, 'days': 14},
+    'budget_large': {'users': 12, 'projects': 9, 'days': 45},
+}
+ROLES = ('admin', 'user')
+BENCHMARK_PASSWORD = 'testpass123'
+
+# A metric regresses when it grows by more than this fraction AND this amount
+THRESHOLDS = {
+    'queries': (0.0, 0),
+    'rows': (0.2, 10),
+    'bytes': (0.2, 1024),
+    'p50_ms': (0.5, 5.0),
+}
+LATENCY_METRICS = ('p50_ms',)
+
+
+class BenchmarkContext:
+    """The seeded objects that endpoint requests refer to"""
+
+    def __init__(self, end_date: date = DATASET_END):
+        self.end_date = end_date
+        self.month_start = end_date.replace(day=1)
+        self.week_start = end_date - timedelta(days=end_date.weekday())
+        self.admin = User.objects.filter(is_admin=True).order_by('id').first()
+        # The regular user with the most entries, and their busiest project
+        self.user = User.objects.filter(is_admin=False).annotate(
+            entries=Count('hourentry')
+        ).order_by('-entries', 'id').first()
+        busiest = HourEntry.objects.filter(user=self.user).values('project').annotate(
+            entries=Count('id')
+        ).order_by('-entries', 'project').first()
+        self.project = Project.objects.get(pk=busiest['project'])
+        self.entry = HourEntry.objects.filter(user=self.user).order_by('-date', 'id').first()
+        self.unassigned = User.objects.filter(is_admin=False).exclude(
+            project_assignments__project=self.project
+        ).order_by('id').first() or self.admin
+        self._counter = 0
+
+    def new_account(self, role: str) -> Dict[str, str]:
+        """Signup data for an account that does not exist yet"""
+        self._counter += 1
+        username = f"bench_{role}_{self._counter}"
+        return {
+            'username': username, 'email': f"{username}@test.com", 'first_name': 'Bench', 'last_name': role.title(),
+            'password': BENCHMARK_PASSWORD, 'password_confirm': BENCHMARK_PASSWORD,
+        }
+
+    def month_range(self) -> Dict[str, str]:
+        return {'start_date': self.month_start.isoformat(), 'end_date': self.end_date.isoformat()}
+
+    def account(self, role: str) -> User:
+        return self.admin if role == 'admin' else self.user
+
+
+class Endpoint(NamedTuple):
+    """One request per route; mutating requests are idempotent or create fresh rows"""
+    name: str
+    method: str = 'get'
+    kwargs: Optional[Callable[[BenchmarkContext], Dict]] = None
+    data: Optional[Callable[[BenchmarkContext, str], Dict]] = None
+
+
+ENDPOINTS = [
+    Endpoint('signup', 'post', data=lambda c, role: c.new_account(role)),
+    Endpoint('login', 'post', data=lambda c, role: {'email': c.account(role).email, 'password': BENCHMARK_PASSWORD}),
+    Endpoint('user-profile'),
+    Endpoint('update-profile', 'put', data=lambda c, role: {'first_name': c.account(role).first_name}),
+    Endpoint('user-list'),
+    Endpoint('user-detail', kwargs=lambda c: {'pk': c.user.pk}),
+    Endpoint('project-list'),
+    Endpoint('project-detail', kwargs=lambda c: {'pk': c.project.pk}),
+    Endpoint('hour-entry-list', data=lambda c, role: c.month_range()),
+    Endpoint('hour-entry-export', data=lambda c, role: c.month_range()),
+    Endpoint('hour-entry-detail', kwargs=lambda c: {'pk': c.entry.pk}),
+    Endpoint('project-assign-users', 'post', kwargs=lambda c: {'project_id': c.project.pk},
+             data=lambda c, role: {'user_ids': [c.user.pk]}),
+    Endpoint('project-unassign-users', 'post', kwargs=lambda c: {'project_id': c.project.pk},
+             data=lambda c, role: {'user_ids': [c.unassigned.pk]}),
+    Endpoint('project-assignments', kwargs=lambda c: {'project_id': c.project.pk}),
+    Endpoint('user-projects', kwargs=lambda c: {'user_id': c.user.pk}),
+    Endpoint('bulk-assignment', 'post', data=lambda c, role: {
+        'user_ids': [c.user.pk], 'project_ids': [c.project.pk],
+    }),
+    Endpoint('assignment-stats'),
+    Endpoint('daily-summary', data=lambda c, role: {'date': c.end_date.isoformat()}),
+    Endpoint('weekly-summary', data=lambda c, role: {'week': c.week_start.isoformat()}),
+    Endpoint('monthly-summary', data=lambda c, role: {'month': f"{c.end_date:%Y-%m}"}),
+    Endpoint('project-time-report', kwargs=lambda c: {'project_id': c.project.pk},
+             data=lambda c, role: c.month_range()),
+    Endpoint('report-render', data=lambda c, role: {
+        'type': 'project', 'project': c.project.pk, 'format': 'html', **c.month_range(),
+    }),
+    Endpoint('analytics-export'),
+    Endpoint('metrics'),
+    Endpoint('profile-download', kwargs=lambda c: {'name': 'missing.prof'}),
+    Endpoint('health'),
+    Endpoint('ready'),
+]
+
+
+@contextmanager
+def capture_database_work():
+    """
+    Count queries, database time and rows fetched on the default connection
+
+    Rows are counted by wrapping the debug cursor's fetch methods, which the
+    ORM uses for every result set. Database time comes from an execute
+    wrapper with perf_counter; the debug cursor rounds each query's time to
+    whole milliseconds.
+    """
+    stats = {'rows': 0}
+
+    class RowCountingCursor(CursorDebugWrapper):
+        def fetchone(self):
+            row = self.cursor.fetchone()
+            stats['rows'] += row is not None
+            return row
+
+        def fetchmany(self, *args):
+            rows = self.cursor.fetchmany(*args)
+            stats['rows'] += len(rows)
+            return rows
+
+        def fetchall(self):
+            rows = self.cursor.fetchall()
+            stats['rows'] += len(rows)
+            return rows
+
+    connection = connections[DEFAULT_DB_ALIAS]
+    connection.make_debug_cursor = lambda cursor: RowCountingCursor(cursor, connection)
+    timer = QueryTimer()
+    try:
+        with CaptureQueriesContext(connection) as queries, connection.execute_wrapper(timer):
+            yield stats
+        stats['queries'] = len(queries.captured_queries)
+        stats['db_ms'] = timer.duration * 1000
+    finally:
+        del connection.make_debug_cursor
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def measure_endpoint(client: APIClient, endpoint: Endpoint, context: BenchmarkContext, role: str,
+                     iterations: int = ITERATIONS) -> Dict[str, Any]:
+    url = reverse(endpoint.name, kwargs=endpoint.kwargs(context) if endpoint.kwargs else None)
+    request = getattr(client, endpoint.method)
+    latencies, samples = [], []
+    # The first request warms up imports and connection state and is not recorded
+    for iteration in range(iterations + 1):
+        data = endpoint.data(context, role) if endpoint.data else None
+        cache.clear()
+        with capture_database_work() as work:
+            started = time.perf_counter()
+            response = request(url, data, format='json') if endpoint.method != 'get' else request(url, data)
+            # Streaming responses run their queries while being consumed
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            elapsed = (time.perf_counter() - started) * 1000
+        if iteration:
+            latencies.append(elapsed)
+            samples.append({**work, 'bytes': len(body), 'status': response.status_code})
+    return {
+        'route': endpoint.name,
+        'method': endpoint.method.upper(),
+        'role': role,
+        'status': samples[-1]['status'],
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(_percentile(latencies, 0.95), 2),
+        'queries': max(sample['queries'] for sample in samples),
+        'rows': max(sample['rows'] for sample in samples),
+        'db_ms': round(statistics.median(sample['db_ms'] for sample in samples), 2),
+        'bytes': max(sample['bytes'] for sample in samples),
+    }
+
+
+def seed_dataset(name: str, datasets: Dict[str, Dict] = DATASETS):
+    """Replace the database contents with the named synthetic dataset"""
+    spec = datasets[name]
+    call_command('flush', interactive=False, verbosity=0)
+    call_command(
+        'create_test_data', '--users', str(spec['users']), '--projects', str(spec['projects']),
+        '--days', str(spec['days']), '--seed', str(DATASET_SEED), '--end-date', DATASET_END.isoformat(),
+        stdout=io.StringIO()
+    )
+
+
+def run_endpoints(iterations: int = ITERATIONS, endpoints: Optional[List[Endpoint]] = None,
+                  progress: Optional[Callable[[Dict], None]] = None) -> Dict[str, Any]:
+    """Benchmark every endpoint for every role against the current database contents"""
+    # Dataset size before signups add accounts
+    size = {
+        'users': User.objects.count(),
+        'projects': Project.objects.count(),
+        'hour_entries': HourEntry.objects.count(),
+    }
+    context = BenchmarkContext()
+    results = {}
+    for role in ROLES:
+        client = APIClient()
+        token, _ = Token.objects.get_or_create(user=context.account(role))
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        for endpoint in endpoints or ENDPOINTS:
+            result = measure_endpoint(client, endpoint, context, role, iterations)
+            results[f"{endpoint.name}:{role}"] = result
+            if progress:
+                progress(result)
+    return {'size': size, 'endpoints': results}
+
+
+def compare_results(results: Dict[str, Any], baseline: Dict[str, Any], latency: bool = True) -> List[Dict]:
+    """
+    Regressions of ``results`` against ``baseline`` (both as written by the
+    benchmark command), one dict per endpoint, role and metric
+    """
+    regressions = []
+    for dataset, current in results['datasets'].items():
+        previous = baseline.get('datasets', {}).get(dataset)
+        if previous is None:
+            continue
+        for key, result in current['endpoints'].items():
+            before = previous['endpoints'].get(key)
+            if before is None:
+                continue
+            for metric, (fraction, amount) in THRESHOLDS.items():
+                if metric in LATENCY_METRICS and not latency:
+                    continue
+                growth = result[metric] - before[metric]
+                if growth > amount and growth > before[metric] * fraction:
+                    regressions.append({
+                        'dataset': dataset, 'endpoint': key, 'metric': metric,
+                        'baseline': before[metric], 'current': result[metric],
+                    })
+    return regressions
+
+
+def query_budgets() -> Dict[str, Optional[int]]:
+    """The ``query_budget`` declared on each route's view class, by URL name"""
+    from .urls import urlpatterns
+    return {pattern.name: getattr(pattern.callback.view_class, 'query_budget', None) for pattern in urlpatterns}
+
+
+def check_query_budgets(results: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Query counts of every endpoint and role across datasets (``results`` maps
+    dataset names to run_endpoints() output) against the view's budget
+
+    A row fails when its view declares no budget, when a count exceeds the
+    budget, or when the count differs between datasets, i.e. grows with the
+    data. Rows are sorted by endpoint and role.
+    """
+    budgets = query_budgets()
+    datasets = list(results)
+    rows = []
+    for key in sorted(results[datasets[0]]['endpoints']):
+        route = key.split(':')[0]
+        counts = [results[dataset]['endpoints'][key]['queries'] for dataset in datasets]
+        budget = budgets.get(route)
+        if budget is None:
+            problem = 'no budget'
+        elif max(counts) > budget:
+            problem = 'over budget'
+        elif len(set(counts)) > 1:
+            problem = 'grows with data'
+        else:
+            problem = ''
+        rows.append({'endpoint': key, 'counts': counts, 'budget': budget, 'problem': problem})
+    return rows
+
+
+def format_budget_table(rows: List[Dict[str, Any]], datasets: List[str]) -> str:
+    """check_query_budgets() rows as a plain text table"""
+    lines = [f"{'endpoint':<34} " + ' '.join(f'{dataset:>12}' for dataset in datasets) + f" {'budget':>6}"]
+    for row in rows:
+        budget = '-' if row['budget'] is None else row['budget']
+        lines.append(
+            f"{row['endpoint']:<34} " + ' '.join(f'{count:>12}' for count in row['counts'])
+            + f" {budget:>6}" + (f"  ❌ {row['problem']}" if row['problem'] else '')
+        )
+    return '\n'.join(lines)
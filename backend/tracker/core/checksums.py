@@ -0,0 +1,210 @@
+"""
+Bucketed table checksums
+
+Every table is split into buckets: tables with a month column (hour entries,
+archived totals, archives) by month, the others by primary key ranges of
+BUCKET_PK_SPAN. A bucket's checksum is the SHA-256 of the MD5s of its rows
+in primary key order, where a row is its concrete field values in a
+canonical text form that does not depend on the database:
+
+* integers and text as is, booleans as 1/0, NULL as \\N
+* dates as YYYY-MM-DD, decimals with the field's decimal places
+* datetimes as microseconds since the Unix epoch (UTC)
+
+joined by the ASCII unit separator. PostgreSQL computes all buckets of a
+table in one GROUP BY with an ordered ``string_agg``; other databases stream
+the rows in chunks and hash them in Python. Both produce identical
+checksums, and so do backups (see core.backup), so any two of them can be
+compared bucket by bucket and only differing buckets need a closer look.
+"""
+
+import hashlib
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, Optional, Sequence
+
+from django.db import connections
+from django.db.models import Q
+
+from .partitioning import add_months
+
+BUCKET_PK_SPAN = 100000
+CHECKSUM_FETCH_SIZE = 5000
+NULL = '\\N'
+SEPARATOR = '\x1f'
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+# Tables bucketed by month of this column; the rest by primary key range
+MONTH_BUCKET_FIELDS = {
+    'core.HourEntry': 'date',
+    'core.ArchivedHourTotal': 'date',
+    'core.HourArchive': 'period_start',
+}
+
+INTEGER_TYPES = {
+    'AutoField', 'BigAutoField', 'SmallAutoField', 'IntegerField', 'BigIntegerField', 'SmallIntegerField',
+    'PositiveIntegerField', 'PositiveBigIntegerField', 'PositiveSmallIntegerField',
+}
+
+
+def _field_type(field) -> str:
+    # Foreign keys are compared as their target column
+    return (field.target_field if field.is_relation else field).get_internal_type()
+
+
+def canonical_value(field, value) -> str:
+    """Database-independent text of one field value"""
+    if value is None:
+        return NULL
+    field_type = _field_type(field)
+    if field_type in INTEGER_TYPES:
+        return str(int(value))
+    if field_type == 'BooleanField':
+        return '1' if value else '0'
+    if field_type == 'DateTimeField':
+        value = field.to_python(value)
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=dt_timezone.utc)
+        return str((value - EPOCH) // timedelta(microseconds=1))
+    if field_type == 'DateField':
+        return field.to_python(value).isoformat()
+    if field_type == 'DecimalField':
+        return f"{Decimal(value):.{field.decimal_places}f}"
+    return str(value)
+
+
+def row_digest(fields, values: Iterable) -> str:
+    """MD5 of one row; ``values`` are in the order of ``fields``"""
+    text = SEPARATOR.join(canonical_value(field, value) for field, value in zip(fields, values))
+    return hashlib.md5(text.encode()).hexdigest()
+
+
+def month_field(model):
+    name = MONTH_BUCKET_FIELDS.get(model._meta.label)
+    return model._meta.get_field(name) if name else None
+
+
+def bucket_function(model, attnames) -> Callable[[Sequence], str]:
+    """Function giving the bucket of a row whose values are in the order of ``attnames``"""
+    field = month_field(model)
+    if field is not None:
+        index = attnames.index(field.attname)
+
+        def month_bucket(values):
+            value = values[index]
+            return f"{field.to_python(value):%Y-%m}" if value is not None else NULL
+        return month_bucket
+
+    index = attnames.index(model._meta.pk.attname)
+    return lambda values: f"id:{int(values[index]) // BUCKET_PK_SPAN * BUCKET_PK_SPAN}"
+
+
+def bucket_filter(model, bucket: str) -> Q:
+    field = month_field(model)
+    if field is None:
+        start = int(bucket.split(':', 1)[1])
+        return Q(pk__gte=start, pk__lt=start + BUCKET_PK_SPAN)
+    if bucket == NULL:
+        return Q(**{f"{field.name}__isnull": True})
+    month = date(int(bucket[:4]), int(bucket[5:7]), 1)
+    return Q(**{f"{field.name}__gte": month, f"{field.name}__lt": add_months(month, 1)})
+
+
+def bucket_sort_key(bucket: str):
+    prefix, _, number = bucket.partition(':')
+    return (prefix, int(number)) if number.isdigit() else (bucket, 0)
+
+
+class BucketHasher:
+    """Accumulates row digests, which must arrive in primary key order within each bucket"""
+
+    def __init__(self):
+        self._hashes = {}
+        self._rows = {}
+
+    def update(self, bucket: str, digest: str):
+        if bucket not in self._hashes:
+            self._hashes[bucket] = hashlib.sha256()
+            self._rows[bucket] = 0
+        self._hashes[bucket].update(digest.encode())
+        self._rows[bucket] += 1
+
+    def result(self) -> Dict[str, Dict]:
+        return {
+            bucket: {'rows': self._rows[bucket], 'sha256': self._hashes[bucket].hexdigest()}
+            for bucket in sorted(self._hashes, key=bucket_sort_key)
+        }
+
+
+def _sql_value(connection, field) -> str:
+    column = connection.ops.quote_name(field.column)
+    field_type = _field_type(field)
+    if field_type == 'BooleanField':
+        expression = f"({column})::int::text"
+    elif field_type == 'DateTimeField':
+        # extract(epoch) loses microseconds in a double; split it instead
+        expression = (
+            f"(extract(epoch from date_trunc('second', {column}))::bigint * 1000000"
+            f" + extract(microseconds from {column})::bigint % 1000000)::text"
+        )
+    elif field_type == 'DateField':
+        expression = f"to_char({column}, 'YYYY-MM-DD')"
+    elif field_type == 'DecimalField':
+        expression = f"round({column}, {field.decimal_places})::text"
+    else:
+        expression = f"({column})::text"
+    return f"coalesce({expression}, '{NULL}')"
+
+
+def _postgres_checksums(model, using: str) -> Dict[str, Dict]:
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    row = f"concat_ws(chr(31), {', '.join(_sql_value(connection, f) for f in model._meta.concrete_fields)})"
+    field = month_field(model)
+    if field is not None:
+        bucket = f"coalesce(to_char({qn(field.column)}, 'YYYY-MM'), '{NULL}')"
+    else:
+        pk = qn(model._meta.pk.column)
+        bucket = f"'id:' || ({pk} / {BUCKET_PK_SPAN} * {BUCKET_PK_SPAN})::text"
+    sql = (
+        f"SELECT {bucket}, count(*),"
+        f" encode(sha256(convert_to(string_agg(md5({row}), '' ORDER BY {qn(model._meta.pk.column)}), 'UTF8')), 'hex')"
+        f" FROM {qn(model._meta.db_table)} GROUP BY 1"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+        buckets = {key: {'rows': rows, 'sha256': sha256} for key, rows, sha256 in cursor.fetchall()}
+    return {key: buckets[key] for key in sorted(buckets, key=bucket_sort_key)}
+
+
+def _python_checksums(model, using: str) -> Dict[str, Dict]:
+    fields = model._meta.concrete_fields
+    attnames = [field.attname for field in fields]
+    bucket_of = bucket_function(model, attnames)
+    hasher = BucketHasher()
+    queryset = model._base_manager.using(using).order_by('pk').values_list(*attnames)
+    for values in queryset.iterator(chunk_size=CHECKSUM_FETCH_SIZE):
+        hasher.update(bucket_of(values), row_digest(fields, values))
+    return hasher.result()
+
+
+def bucket_checksums(model, using: str = 'default') -> Dict[str, Dict]:
+    """{bucket: {'rows', 'sha256'}} for every non-empty bucket of the table"""
+    if connections[using].vendor == 'postgresql':
+        return _postgres_checksums(model, using)
+    return _python_checksums(model, using)
+
+
+def row_digests(model, using: str = 'default', bucket: Optional[str] = None) -> Dict[int, str]:
+    """{pk: row digest} for one bucket (or the whole table), to find which rows differ"""
+    fields = model._meta.concrete_fields
+    queryset = model._base_manager.using(using).order_by('pk')
+    if bucket is not None:
+        queryset = queryset.filter(bucket_filter(model, bucket))
+    pk_index = fields.index(model._meta.pk)
+    return {
+        values[pk_index]: row_digest(fields, values)
+        for values in queryset.values_list(*[field.attname for field in fields]).iterator(
+            chunk_size=CHECKSUM_FETCH_SIZE
+        )
+    }
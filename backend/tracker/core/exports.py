@@ -0,0 +1,52 @@
+"""
+Hour entry exports
+
+Rows are read with ``values_list().iterator(chunk_size=...)`` (a server-side
+cursor on PostgreSQL) and handed straight to the streaming XLSX writer, so
+neither the queryset nor the workbook is ever materialised in memory.
+Exports cover the hot table; archived months are available as the raw
+files written by ``archive_hours``.
+"""
+
+from typing import Iterator, Tuple
+
+from .xlsx import stream_workbook
+
+EXPORT_FORMATS = ('xlsx',)
+EXPORT_SHEETS = ('single', 'project')
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_COLUMNS = ['Date', 'User', 'Email', 'Project', 'Client', 'Hours', 'Notes']
+EXPORT_FIELDS = (
+    'date', 'user__first_name', 'user__last_name', 'user__username', 'user__email',
+    'project__name', 'project__client', 'hours', 'note'
+)
+
+
+def entry_rows(queryset) -> Iterator[Tuple]:
+    """Export rows for ``queryset`` in date order, fetched in chunks"""
+    rows = queryset.order_by('date', 'id').values_list(*EXPORT_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for entry_date, first_name, last_name, username, email, project, client, hours, note in rows:
+        name = f"{first_name} {last_name}".strip() or username
+        yield (entry_date, name, email, project, client, hours, note)
+
+
+def hour_entry_sheets(queryset, sheets: str = 'single'):
+    """
+    (title, header, rows) triples for stream_workbook
+
+    ``sheets='project'`` writes one sheet per project, in project name order.
+    stream_workbook continues sheets past Excel's row limit on new sheets.
+    """
+    if sheets == 'project':
+        projects = queryset.order_by('project__name', 'project_id').values_list(
+            'project_id', 'project__name'
+        ).distinct()
+        for project_id, name in projects:
+            yield name, EXPORT_COLUMNS, entry_rows(queryset.filter(project_id=project_id))
+    else:
+        yield 'Hours', EXPORT_COLUMNS, entry_rows(queryset)
+
+
+def stream_hour_entries_xlsx(queryset, sheets: str = 'single') -> Iterator[bytes]:
+    return stream_workbook(hour_entry_sheets(queryset, sheets))
@@ -0,0 +1,80 @@
+"""
+Liveness and readiness checks
+
+/api/health/ answers as long as the process can serve requests and touches
+nothing else. /api/ready/ checks the dependencies a request needs:
+
+* database: a ``SELECT 1`` round trip, with its latency
+* cache: writing and reading back a probe key
+* migrations: none pending on the default database
+
+The readiness result is kept in the cache for READY_CACHE_TIMEOUT seconds, so
+frequent probes from several sources cost one round of checks per second.
+core.middleware.ProbeMiddleware serves both endpoints ahead of every other
+middleware (sessions, CSRF, authentication, timing, metrics).
+"""
+
+import time
+import uuid
+from typing import Any, Dict, Tuple
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.migrations.executor import MigrationExecutor
+
+READY_CACHE_KEY = 'probe:ready'
+READY_CACHE_TIMEOUT = 1
+CACHE_PROBE_KEY = 'probe:cache'
+
+
+def check_database(alias: str = DEFAULT_DB_ALIAS) -> Dict[str, Any]:
+    started = time.perf_counter()
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except Exception as e:
+        return {'ok': False, 'error': str(e)}
+    return {'ok': True, 'latency_ms': round((time.perf_counter() - started) * 1000, 2)}
+
+
+def check_cache() -> Dict[str, Any]:
+    token = uuid.uuid4().hex
+    try:
+        cache.set(CACHE_PROBE_KEY, token, timeout=10)
+        ok = cache.get(CACHE_PROBE_KEY) == token
+    except Exception as e:
+        return {'ok': False, 'error': str(e)}
+    return {'ok': ok} if ok else {'ok': False, 'error': 'Cache did not return the probe value'}
+
+
+def check_migrations(alias: str = DEFAULT_DB_ALIAS) -> Dict[str, Any]:
+    try:
+        executor = MigrationExecutor(connections[alias])
+        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    except Exception as e:
+        return {'ok': False, 'error': str(e)}
+    pending = [f"{migration.app_label}.{migration.name}" for migration, _ in plan]
+    return {'ok': not pending, 'pending': pending}
+
+
+def readiness() -> Tuple[bool, Dict[str, Any]]:
+    """(ready, checks), from the cache when checked within the last second"""
+    try:
+        cached = cache.get(READY_CACHE_KEY)
+    except Exception:
+        cached = None
+    if cached is not None:
+        return cached
+
+    checks = {
+        'database': check_database(),
+        'cache': check_cache(),
+        'migrations': check_migrations(),
+    }
+    result = (all(check['ok'] for check in checks.values()), checks)
+    try:
+        cache.set(READY_CACHE_KEY, result, timeout=READY_CACHE_TIMEOUT)
+    except Exception:
+        pass
+    return result
@@ -0,0 +1,63 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archive import archive_period, get_archive_boundary
+from core.models import HourEntry
+from core.partitioning import add_months, month_range
+
+
+class Command(BaseCommand):
+    help = (
+        'Move hour entries before a month boundary to compressed cold storage, '
+        'keeping their pre-aggregated totals for reports'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before', type=str, required=True,
+            help='Archive entries dated before this day (YYYY-MM-DD, must be the first of a month)'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Show what would be archived without changing anything'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            before = datetime.strptime(options['before'], '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError('--before must be a date in YYYY-MM-DD format')
+
+        # Only whole, closed months are archived
+        if before.day != 1:
+            raise CommandError('--before must be the first day of a month')
+        if before > date.today().replace(day=1):
+            raise CommandError('Cannot archive the current or future months')
+
+        first = HourEntry.objects.filter(date__lt=before).order_by('date').values_list('date', flat=True).first()
+        if first is None:
+            self.stdout.write('Nothing to archive.')
+            return
+
+        boundary = get_archive_boundary()
+        if boundary and boundary > before:
+            self.stdout.write(f"Archive boundary is already {boundary}; archiving late entries only.")
+
+        total_entries = 0
+        for month in month_range(first, add_months(before, -1)):
+            period_end = add_months(month, 1)
+            count = HourEntry.objects.filter(date__gte=month, date__lt=period_end).count()
+            if not count:
+                continue
+            if options['dry_run']:
+                self.stdout.write(f"Would archive {count} entries for {month:%Y-%m}")
+                continue
+            archive = archive_period(month, period_end)
+            total_entries += archive.entry_count
+            self.stdout.write(
+                f"✅ {month:%Y-%m}: {archive.entry_count} entries, {archive.total_hours} hours → {archive.file_path}"
+            )
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'🎉 Archived {total_entries} entries before {before}'))
@@ -0,0 +1,112 @@
+import json
+import logging
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from core.benchmarks import DATASETS, ITERATIONS, compare_results, run_endpoints, seed_dataset
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+# Benchmarks clear the cache before every request; never touch a shared one.
+# The throttle's database cache is kept: its table is in the throwaway test database.
+BENCHMARK_CACHES = {
+    **settings.CACHES,
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmark'},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every API route as admin and regular user on synthetic datasets in a throwaway test '
+        'database: p50/p95 latency, SQL queries, rows fetched and response bytes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--datasets', nargs='+', choices=list(DATASETS), default=['small'],
+            help='Dataset sizes to run (default: small)'
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=ITERATIONS,
+            help=f'Timed requests per endpoint and role (default: {ITERATIONS})'
+        )
+        parser.add_argument(
+            '--output', type=str, default=None,
+            help='Write results as JSON to this file (e.g. benchmarks/baseline.json to update the baseline)'
+        )
+        parser.add_argument(
+            '--compare', nargs='?', const=DEFAULT_BASELINE, default=None,
+            help='Fail on regressions against a baseline file (default: benchmarks/baseline.json)'
+        )
+        parser.add_argument(
+            '--ignore-latency', action='store_true',
+            help='Compare only queries, rows and bytes (for baselines recorded on other hardware)'
+        )
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError('--iterations must be positive')
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as baseline_file:
+                    baseline = json.load(baseline_file)
+            except FileNotFoundError:
+                raise CommandError(f"Baseline {options['compare']} not found")
+
+        results = {
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'datasets': {},
+        }
+        setup_test_environment()
+        # Regular users get 403/404 from admin routes; don't log every one
+        request_logger = logging.getLogger('django.request')
+        log_level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(CACHES=BENCHMARK_CACHES):
+                for name in options['datasets']:
+                    self.stdout.write(f"Seeding {name} dataset...")
+                    seed_dataset(name)
+                    self.stdout.write(
+                        f"{'endpoint':<34} {'status':>6} {'p50 ms':>8} {'p95 ms':>8} "
+                        f"{'queries':>7} {'rows':>7} {'bytes':>9}"
+                    )
+                    results['datasets'][name] = run_endpoints(options['iterations'], progress=self.write_result)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            request_logger.setLevel(log_level)
+
+        if options['output']:
+            os.makedirs(os.path.dirname(os.path.abspath(options['output'])), exist_ok=True)
+            with open(options['output'], 'w', encoding='utf-8') as output_file:
+                json.dump(results, output_file, indent=2)
+                output_file.write('\n')
+            self.stdout.write(f"✅ Results written to {options['output']}")
+
+        if baseline is not None:
+            regressions = compare_results(results, baseline, latency=not options['ignore_latency'])
+            for regression in regressions:
+                self.stdout.write(
+                    f"❌ {regression['dataset']} {regression['endpoint']}: {regression['metric']} "
+                    f"{regression['baseline']} → {regression['current']}"
+                )
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions against {options['compare']}")
+            self.stdout.write(f"✅ No regressions against {options['compare']}")
+
+        self.stdout.write(self.style.SUCCESS('🎉 Benchmark completed'))
+
+    def write_result(self, result):
+        self.stdout.write(
+            f"{result['route'] + ':' + result['role']:<34} {result['status']:>6} {result['p50_ms']:>8.1f} "
+            f"{result['p95_ms']:>8.1f} {result['queries']:>7} {result['rows']:>7} {result['bytes']:>9}"
+        )
@@ -1,123 +1,239 @@
-from django.core.management.base import BaseCommand
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
 from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
 from core.models import User, Project, HourEntry, ProjectAssignment
-from datetime import datetime, timedelta
-import random
+from core.restore import copy_values
+
+TEST_PASSWORD = 'testpass123'
+ADMIN_USERNAME = 'test_admin'
+USERNAME_PREFIX = 'test_user_'
+BATCH_SIZE = 5000
+ENTRY_FIELDS = ['user', 'project', 'date', 'hours', 'note', 'updated_at']
+
+FIRST_NAMES = ['John', 'Sarah', 'Maria', 'David', 'Aisha', 'Wei', 'Lucas', 'Emma', 'Omar', 'Priya', 'Tom', 'Yuki']
+LAST_NAMES = ['Doe', 'Wilson', 'Garcia', 'Smith', 'Khan', 'Chen', 'Silva', 'Brown', 'Haddad', 'Patel', 'Berg', 'Sato']
+CLIENTS = ['TechCorp Inc.', 'StartupXYZ', 'DataFlow Solutions', 'Northwind', 'Globex', 'Initech', 'Umbrella Health']
+PROJECT_KINDS = ['E-commerce Website', 'Mobile App', 'Analytics Platform', 'Data Migration', 'API Integration', 'Support']
+NOTES = ['Development', 'Code review', 'Meetings', 'Bug fixes', 'Planning', 'Testing', 'Documentation']
+
+# Chance of logging hours on a day, relative to --density, Monday to Sunday
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 0.95, 0.8, 0.04, 0.02]
+
 
 class Command(BaseCommand):
-    help = 'Create test data for dashboard testing'
+    help = (
+        'Generate synthetic users, projects, assignments and hour entries with realistic distributions. '
+        'Scales to millions of entries (bulk inserts in batches).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=2, help='Number of users (default: 2)')
+        parser.add_argument('--projects', type=int, default=3, help='Number of projects (default: 3)')
+        parser.add_argument('--days', type=int, default=30, help='Days of history up to today (default: 30)')
+        parser.add_argument(
+            '--density', type=float, default=0.8,
+            help='Chance that a user logs hours on a weekday, 0-1 (default: 0.8)'
+        )
+        parser.add_argument(
+            '--projects-per-user', type=int, default=3,
+            help='Average number of projects each user is assigned to (default: 3)'
+        )
+        parser.add_argument(
+            '--end-date', type=date.fromisoformat, default=None,
+            help='Last day of history, YYYY-MM-DD (default: today)'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help=f'Rows per INSERT batch (default: {BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete previously generated test data first'
+        )
 
     def handle(self, *args, **options):
+        if min(options['users'], options['projects'], options['days'], options['batch_size']) < 1:
+            raise CommandError('--users, --projects, --days and --batch-size must be positive')
+        if not 0 <= options['density'] <= 1:
+            raise CommandError('--density must be between 0 and 1')
+
+        generated_users = User.objects.filter(username__startswith=USERNAME_PREFIX)
+        if options['clear']:
+            self.clear()
+        elif generated_users.exists() or User.objects.filter(username=ADMIN_USERNAME).exists():
+            raise CommandError('Test data already exists; use --clear to replace it')
+
         self.stdout.write(self.style.SUCCESS('🚀 Creating test data...'))
-        
-        # Create test users
-        test_users = [
-            {
-                'username': 'john_doe',
-                'email': 'john@test.com',
-                'first_name': 'John',
-                'last_name': 'Doe',
-                'password': 'testpass123',
-                'role': 'user'
-            },
-            {
-                'username': 'sarah_wilson', 
-                'email': 'sarah@test.com',
-                'first_name': 'Sarah',
-                'last_name': 'Wilson',
-                'password': 'testpass123',
-                'role': 'user'
-            }
-        ]
-        
-        created_users = []
-        for user_data in test_users:
-            user, created = User.objects.get_or_create(
-                email=user_data['email'],
-                defaults={
-                    'username': user_data['username'],
-                    'first_name': user_data['first_name'],
-                    'last_name': user_data['last_name'],
-                    'password': make_password(user_data['password']),
-                    'role': user_data['role'],
-                    'is_active': True
-                }
-            )
-            created_users.append(user)
-            self.stdout.write(f"✅ User: {user.email}")
-        
-        # Create test projects
-        test_projects = [
-            {
-                'name': 'E-commerce Website',
-                'client': 'TechCorp Inc.',
-                'start_date': '2024-01-15',
-                'end_date': '2024-12-31'
-            },
-            {
-                'name': 'Mobile App',
-                'client': 'StartupXYZ', 
-                'start_date': '2024-02-01',
-                'end_date': '2024-12-31'
-            },
-            {
-                'name': 'Analytics Platform',
-                'client': 'DataFlow Solutions',
-                'start_date': '2024-03-01', 
-                'end_date': '2024-12-31'
-            }
-        ]
-        
-        created_projects = []
-        for project_data in test_projects:
-            project, created = Project.objects.get_or_create(
-                name=project_data['name'],
-                defaults=project_data
-            )
-            created_projects.append(project)
-            self.stdout.write(f"✅ Project: {project.name}")
-        
-        # Assign users to projects
-        for user in created_users:
-            for project in created_projects:
-                assignment, created = ProjectAssignment.objects.get_or_create(
-                    user=user,
-                    project=project,
-                    defaults={'notes': f'Assigned to {project.name}'}
-                )
-        
-        # Create time entries for last 30 days
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=30)
-        
-        current_date = start_date
-        total_entries = 0
-        
-        while current_date <= end_date:
-            if current_date.weekday() < 5:  # Weekdays only
-                for user in created_users:
-                    if random.random() < 0.8:  # 80% chance of working
-                        project = random.choice(created_projects)
-                        hours = round(random.uniform(2.0, 8.0) * 4) / 4  # 0.25 increments
-                        
-                        entry, created = HourEntry.objects.get_or_create(
-                            user=user,
-                            project=project,
-                            date=current_date,
-                            defaults={
-                                'hours': hours,
-                                'note': f'Working on {project.name}'
-                            }
-                        )
-                        
-                        if created:
-                            total_entries += 1
-            
-            current_date += timedelta(days=1)
-        
-        self.stdout.write(self.style.SUCCESS(f'✅ Created {total_entries} time entries'))
-        self.stdout.write(self.style.SUCCESS('🎉 Test data created successfully!'))
+        started = time.monotonic()
+        rng = random.Random(options['seed'])
+        end_date = options['end_date'] or date.today()
+        start_date = end_date - timedelta(days=options['days'] - 1)
+
+        # Hash once; every generated account shares the password
+        password = make_password(TEST_PASSWORD)
+        admin = User.objects.create(
+            username=ADMIN_USERNAME, email=f"{ADMIN_USERNAME}@test.com", first_name='Test', last_name='Admin',
+            password=password, is_admin=True
+        )
+        user_ids = self.create_users(rng, options['users'], password, options['batch_size'])
+        self.stdout.write(f"✅ Users: {len(user_ids)} (+ admin {admin.email})")
+
+        projects = self.create_projects(rng, admin, options['projects'], start_date, end_date, options['batch_size'])
+        self.stdout.write(f"✅ Projects: {len(projects)}")
+
+        assignments = self.create_assignments(
+            rng, admin, user_ids, projects, options['projects_per_user'], options['batch_size']
+        )
+        self.stdout.write(f"✅ Assignments: {sum(len(user_projects) for user_projects in assignments.values())}")
+
+        total_entries = self.create_entries(
+            rng, assignments, start_date, end_date, options['density'], options['batch_size'], options['verbosity']
+        )
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Created {total_entries} time entries ({total_entries / max(elapsed, 0.001):,.0f} entries/s)'
+        ))
+        self.stdout.write(self.style.SUCCESS(f'🎉 Test data created successfully in {elapsed:.1f}s!'))
         self.stdout.write('')
         self.stdout.write('Test login credentials:')
-        self.stdout.write('john@test.com / testpass123')
-        self.stdout.write('sarah@test.com / testpass123')
+        self.stdout.write(f'{ADMIN_USERNAME}@test.com / {TEST_PASSWORD}')
+        self.stdout.write(f'{USERNAME_PREFIX}1@test.com … {USERNAME_PREFIX}{len(user_ids)}@test.com / {TEST_PASSWORD}')
+
+    def clear(self):
+        users = User.objects.filter(username__startswith=USERNAME_PREFIX) | User.objects.filter(username=ADMIN_USERNAME)
+        with transaction.atomic():
+            # Single DELETE statements instead of collecting millions of rows for the cascade
+            HourEntry.objects.filter(user__in=users).delete()
+            HourEntry.objects.filter(project__owner__in=users).delete()
+            ProjectAssignment.objects.filter(user__in=users).delete()
+            deleted, _ = users.delete()
+        self.stdout.write(f"🧹 Removed previously generated test data ({deleted} rows)")
+
+    def create_users(self, rng, count, password, batch_size):
+        User.objects.bulk_create([
+            User(
+                username=f"{USERNAME_PREFIX}{i}",
+                email=f"{USERNAME_PREFIX}{i}@test.com",
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                password=password,
+            )
+            for i in range(1, count + 1)
+        ], batch_size=batch_size)
+        return list(
+            User.objects.filter(username__startswith=USERNAME_PREFIX).order_by('id').values_list('id', flat=True)
+        )
+
+    def create_projects(self, rng, admin, count, start_date, end_date, batch_size):
+        """Mostly running projects, plus some that ended during the period and some without dates"""
+        span = (end_date - start_date).days
+        projects = []
+        for i in range(1, count + 1):
+            kind = rng.random()
+            if kind < 0.1:
+                dates = (None, None)
+            elif kind < 0.25:
+                project_end = start_date + timedelta(days=rng.randint(0, span))
+                dates = (start_date - timedelta(days=rng.randint(30, 365)), project_end)
+            else:
+                dates = (start_date - timedelta(days=rng.randint(0, 90)), end_date + timedelta(days=rng.randint(30, 365)))
+            projects.append(Project(
+                name=f"{rng.choice(PROJECT_KINDS)} {i}",
+                client=rng.choice(CLIENTS),
+                owner=admin,
+                start_date=dates[0],
+                end_date=dates[1],
+            ))
+        Project.objects.bulk_create(projects, batch_size=batch_size)
+        return list(Project.objects.filter(owner=admin).order_by('id').values_list('id', 'start_date', 'end_date'))
+
+    def create_assignments(self, rng, admin, user_ids, projects, per_user, batch_size):
+        """
+        Sparse assignments: each user gets a few projects, popular projects (Zipf-like
+        weights) more often. Returns {user_id: [(project_id, start, end), ...]}
+        """
+        weights = [1 / (rank + 1) for rank in range(len(projects))]
+        assignments = {}
+        rows = []
+        for user_id in user_ids:
+            wanted = min(len(projects), max(1, round(rng.gauss(per_user, per_user / 3))))
+            chosen = {}
+            while len(chosen) < wanted:
+                project = rng.choices(projects, weights)[0]
+                chosen[project[0]] = project
+            assignments[user_id] = list(chosen.values())
+            rows.extend(
+                ProjectAssignment(project_id=project_id, user_id=user_id, assigned_by=admin)
+                for project_id in chosen
+            )
+        ProjectAssignment.objects.bulk_create(rows, batch_size=batch_size)
+        return assignments
+
+    def create_entries(self, rng, assignments, start_date, end_date, density, batch_size, verbosity):
+        """Hour entries in quarter hours, split over one to three active projects per day"""
+        ops = connection.ops
+        # Values are adapted for the database once, not per row
+        hour_values = [ops.adapt_decimalfield_value(quarters * Decimal('0.25'), 5, 2) for quarters in range(49)]
+        updated_at = ops.adapt_datetimefield_value(timezone.now())
+        batch = []
+        total = 0
+        current = start_date
+        while current <= end_date:
+            chance = density * WEEKDAY_WEIGHTS[current.weekday()]
+            day = ops.adapt_datefield_value(current)
+            for user_id, projects in assignments.items():
+                if rng.random() >= chance:
+                    continue
+                # Like the API, which refuses time on projects without start and end dates
+                active = [
+                    project_id for project_id, start, end in projects
+                    if start is not None and end is not None and start <= current <= end
+                ]
+                if not active:
+                    continue
+                # A normal day is about 7.5 hours; weekends are short
+                mean = 7.5 if current.weekday() < 5 else 3
+                quarters = max(1, min(48, round(rng.gauss(mean, 1.25) * 4)))
+                parts = min(len(active), quarters, rng.choices((1, 2, 3), (6, 3, 1))[0])
+                cuts = sorted(rng.sample(range(1, quarters), parts - 1)) if parts > 1 else []
+                sizes = [b - a for a, b in zip([0] + cuts, cuts + [quarters])]
+                for project_id, size in zip(rng.sample(active, parts), sizes):
+                    note = rng.choice(NOTES) if rng.random() < 0.7 else ''
+                    batch.append((user_id, project_id, day, hour_values[size], note, updated_at))
+                if len(batch) >= batch_size:
+                    total += self.insert_entries(batch)
+                    batch = []
+                    if verbosity > 1:
+                        self.stdout.write(f"  {total} entries (up to {current})")
+            current += timedelta(days=1)
+        if batch:
+            total += self.insert_entries(batch)
+        return total
+
+    def insert_entries(self, rows):
+        """
+        Load one batch of entry tuples: COPY on PostgreSQL, a single executemany
+        elsewhere. bulk_create spends most of its time compiling SQL per value,
+        which dominates at millions of rows.
+        """
+        columns = [HourEntry._meta.get_field(name).column for name in ENTRY_FIELDS]
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                copy_values(connection, HourEntry._meta.db_table, columns, rows)
+            else:
+                qn = connection.ops.quote_name
+                with connection.cursor() as cursor:
+                    cursor.executemany(
+                        f"INSERT INTO {qn(HourEntry._meta.db_table)} ({', '.join(qn(column) for column in columns)}) "
+                        f"VALUES ({', '.join(['%s'] * len(columns))})",
+                        rows
+                    )
+        return len(rows)
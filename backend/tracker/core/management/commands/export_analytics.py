@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.analytics import AnalyticsExportUnavailable, export_analytics
+
+
+class Command(BaseCommand):
+    help = (
+        'Export hour entries with user and project dimensions as Parquet, partitioned by month. '
+        'By default only months that changed since the last run are rewritten.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', type=str, default=None,
+            help='Output directory (default: ANALYTICS_EXPORT_DIR)'
+        )
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Rewrite every month, e.g. after renaming users or projects'
+        )
+
+    def handle(self, *args, **options):
+        output_dir = options['output'] or settings.ANALYTICS_EXPORT_DIR
+        try:
+            result = export_analytics(output_dir, full=options['full'])
+        except AnalyticsExportUnavailable as e:
+            raise CommandError(str(e))
+
+        for key in result['exported']:
+            self.stdout.write(f"✅ Exported {key}")
+        for key in result['removed']:
+            self.stdout.write(f"🗑️  Removed {key} (no entries left)")
+        self.stdout.write(self.style.SUCCESS(
+            f"🎉 {len(result['exported'])} month(s), {result['rows']} rows exported to {output_dir}; "
+            f"{result['unchanged']} unchanged"
+        ))
@@ -0,0 +1,80 @@
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import partitioning
+
+
+class Command(BaseCommand):
+    help = (
+        'Manage monthly partitions of the hour entry table (PostgreSQL only). '
+        'Run "create" from cron to keep future months pre-created.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'action',
+            choices=['status', 'convert', 'create', 'detach'],
+            help='status: list partitions; convert: partition the existing table; '
+                 'create: pre-create future partitions; detach: remove old months from the table'
+        )
+        parser.add_argument(
+            '--months-ahead', type=int, default=3,
+            help='Number of future months to pre-create (convert/create, default: 3)'
+        )
+        parser.add_argument(
+            '--before', type=str,
+            help='Detach partitions for months that end on or before this date (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--drop', action='store_true',
+            help='Drop detached partitions instead of keeping them as standalone tables'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            partitioning.check_postgresql()
+        except NotImplementedError as e:
+            raise CommandError(str(e))
+
+        action = options['action']
+        if action != 'convert' and not partitioning.is_partitioned():
+            raise CommandError(
+                f'{partitioning.TABLE} is not partitioned yet. Run "hour_partitions convert" first.'
+            )
+
+        if action == 'status':
+            for name, bounds in partitioning.list_partitions():
+                self.stdout.write(f"{name}: {bounds}")
+
+        elif action == 'convert':
+            try:
+                result = partitioning.convert_to_partitioned(months_ahead=options['months_ahead'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Partitioned {partitioning.TABLE}: {result['rows']} rows in {result['partitions']} partitions"
+            ))
+
+        elif action == 'create':
+            this_month = partitioning.month_start(date.today())
+            months = partitioning.month_range(
+                this_month, partitioning.add_months(this_month, options['months_ahead'])
+            )
+            created = partitioning.create_partitions(months)
+            for name in created:
+                self.stdout.write(f"✅ Created {name}")
+            self.stdout.write(self.style.SUCCESS(f"{len(created)} partition(s) created"))
+
+        elif action == 'detach':
+            if not options['before']:
+                raise CommandError('--before=YYYY-MM-DD is required for detach')
+            try:
+                before = datetime.strptime(options['before'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--before must be a date in YYYY-MM-DD format')
+            detached = partitioning.detach_partitions(before, drop=options['drop'])
+            verb = 'Dropped' if options['drop'] else 'Detached'
+            for name in detached:
+                self.stdout.write(f"✅ {verb} {name}")
+            self.stdout.write(self.style.SUCCESS(f"{len(detached)} partition(s) {verb.lower()}"))
@@ -0,0 +1,75 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.slow_queries import parse_log_line, summarize
+
+SORT_KEYS = {
+    'total': 'total_ms',
+    'count': 'count',
+    'mean': 'mean_ms',
+    'max': 'max_ms',
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Summarize slow query log lines (SLOW_QUERY_MS) by normalized query fingerprint: '
+        'count, total/mean/max time, views, call sites and the captured EXPLAIN plan'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files', nargs='*', default=['-'],
+            help="Log files to read; '-' or nothing reads standard input (e.g. piped docker logs)"
+        )
+        parser.add_argument(
+            '--sort', choices=list(SORT_KEYS), default='total',
+            help='Order fingerprints by total time, count, mean or max time (default: total)'
+        )
+        parser.add_argument('--limit', type=int, default=10, help='Fingerprints to show (default: 10)')
+        parser.add_argument('--plans', action='store_true', help='Print the EXPLAIN plan of each fingerprint')
+        parser.add_argument('--view', type=str, default=None, help='Only queries run by this URL name')
+
+    def handle(self, *args, **options):
+        records = []
+        for path in options['files']:
+            if path == '-':
+                records.extend(self.read(sys.stdin, options['view']))
+                continue
+            try:
+                with open(path, encoding='utf-8', errors='replace') as lines:
+                    records.extend(self.read(lines, options['view']))
+            except OSError as e:
+                raise CommandError(f"Cannot read {path}: {e}")
+        if not records:
+            self.stdout.write('No slow queries found')
+            return
+
+        groups = sorted(summarize(records), key=lambda group: group[SORT_KEYS[options['sort']]], reverse=True)
+        total_ms = sum(group['total_ms'] for group in groups)
+        self.stdout.write(
+            f"{len(records)} slow queries, {len(groups)} fingerprints, {total_ms:,.0f} ms in total"
+        )
+        for rank, group in enumerate(groups[:options['limit']], 1):
+            self.stdout.write('')
+            self.stdout.write(self.style.SUCCESS(
+                f"#{rank} {group['fingerprint']}  count {group['count']}  total {group['total_ms']:,.0f} ms  "
+                f"mean {group['mean_ms']:,.1f} ms  max {group['max_ms']:,.1f} ms"
+            ))
+            self.stdout.write(f"   views: {self.top(group['views'])}")
+            self.stdout.write(f"   at:    {self.top(group['frames'])}")
+            self.stdout.write(f"   sql:   {group['sql']}")
+            self.stdout.write(f"   slowest params: {group['slowest'].get('params')}")
+            if options['plans']:
+                for line in group['plan'] or ['(no plan captured)']:
+                    self.stdout.write(f"   | {line}")
+
+    def read(self, lines, view):
+        for line in lines:
+            record = parse_log_line(line)
+            if record and (view is None or record.get('view') == view):
+                yield record
+
+    def top(self, counter, limit=3):
+        return ', '.join(f"{name} ({count})" for name, count in counter.most_common(limit))
@@ -0,0 +1,90 @@
+"""
+Prometheus metrics
+
+MetricsMiddleware records every request in two histograms labelled with the
+URL name (``view``), method and status: latency and the number of SQL queries.
+Cache lookups are counted per cache and result (``report`` artifacts from
+core.reports, hit or miss). GET /api/metrics/ returns everything in the
+Prometheus text format.
+
+Under gunicorn each worker process has its own metrics. Setting the
+PROMETHEUS_MULTIPROC_DIR environment variable to a directory shared by the
+workers (emptied before gunicorn starts) makes prometheus_client keep the
+values in memory-mapped files there, and the endpoint sums them over all
+workers, whichever worker serves the scrape.
+"""
+
+import os
+from typing import Optional
+
+try:
+    import prometheus_client
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144, 233)
+# Requests that did not match any URL pattern
+UNRESOLVED_VIEW = 'unresolved'
+
+
+class MetricsUnavailable(Exception):
+    """prometheus_client is not installed"""
+
+
+def _prometheus():
+    if prometheus_client is None:
+        raise MetricsUnavailable('Metrics require prometheus_client (pip install prometheus-client)')
+    return prometheus_client
+
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = prometheus_client.Histogram(
+        'tracker_http_request_duration_seconds', 'Time to produce a response, by URL name',
+        ['view', 'method', 'status'], buckets=LATENCY_BUCKETS
+    )
+    REQUEST_QUERIES = prometheus_client.Histogram(
+        'tracker_http_request_queries', 'SQL queries per request, by URL name',
+        ['view', 'method', 'status'], buckets=QUERY_BUCKETS
+    )
+    CACHE_REQUESTS = prometheus_client.Counter(
+        'tracker_cache_requests', 'Cache lookups by cache and result (hit or miss)',
+        ['cache', 'result']
+    )
+
+
+def available() -> bool:
+    return prometheus_client is not None
+
+
+def observe_request(view: Optional[str], method: str, status: int, duration: float, queries: int):
+    """Record one request; a no-op without prometheus_client"""
+    if prometheus_client is None:
+        return
+    labels = (view or UNRESOLVED_VIEW, method, str(status))
+    REQUEST_LATENCY.labels(*labels).observe(duration)
+    REQUEST_QUERIES.labels(*labels).observe(queries)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    """Count a lookup in the named cache; a no-op without prometheus_client"""
+    if prometheus_client is None:
+        return
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def render_metrics(multiprocess_dir: Optional[str] = None) -> bytes:
+    """
+    All metrics in the Prometheus text format, summed over the worker files in
+    ``multiprocess_dir`` (default: PROMETHEUS_MULTIPROC_DIR) when there is one
+    """
+    prometheus = _prometheus()
+    multiprocess_dir = multiprocess_dir or os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if multiprocess_dir:
+        registry = prometheus.CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=multiprocess_dir)
+    else:
+        registry = prometheus.REGISTRY
+    return prometheus.generate_latest(registry)
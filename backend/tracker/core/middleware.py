@@ -0,0 +1,225 @@
+"""
+Request timing and metrics middleware
+
+With REQUEST_TIMING enabled, every response carries a ``Server-Timing`` header
+(shown in the browser's network panel) that breaks the request down into:
+
+* ``db``: SQL queries run on the default database and their total duration
+* ``view``: time spent in the view, up to the point its response is rendered
+* ``serialize``: rendering the response body (JSON, report templates)
+* ``total``: everything from this middleware down, including other middleware
+
+Queries are timed with ``connection.execute_wrapper``, so this works with
+DEBUG=False and does not keep the queries themselves. REQUEST_TIMING_LOG also
+writes one JSON line per request, with the URL name, to the ``core.timing``
+logger. When REQUEST_TIMING is off the middleware removes itself at startup
+and costs nothing.
+
+Streaming responses (Excel exports) produce their body after the middleware
+returns, so their queries and serialization are not included.
+
+MetricsMiddleware feeds the Prometheus histograms in core.metrics, and
+SlowQueryMiddleware tells the slow query log (core.slow_queries) which view
+ran a query. ProbeMiddleware answers health and readiness probes before any
+of them, and ProfileMiddleware runs admin requests sent with ``X-Profile: 1``
+under cProfile (core.profiling).
+"""
+
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.urls import reverse
+
+from . import metrics, profiling
+from .slow_queries import current_view
+
+logger = logging.getLogger('core.timing')
+
+
+class QueryTimer:
+    """Database execute wrapper that counts queries and adds up their duration"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+class RequestTiming:
+    """Timestamps of one request, filled in by RequestTimingMiddleware's hooks"""
+
+    def __init__(self):
+        self.queries = QueryTimer()
+        self.started = time.perf_counter()
+        self.view_name = None
+        self.view_started = None
+        self.view_ended = None
+        self.render_started = None
+        self.render_ended = None
+
+    def rendered(self, response):
+        self.render_ended = time.perf_counter()
+
+    def durations(self, ended):
+        """Milliseconds per Server-Timing metric"""
+        view_ended = self.view_ended or ended
+        return {
+            'db': self.queries.duration * 1000,
+            'view': (view_ended - self.view_started) * 1000 if self.view_started else 0.0,
+            'serialize': (self.render_ended - self.render_started) * 1000 if self.render_ended else 0.0,
+            'total': (ended - self.started) * 1000,
+        }
+
+
+def server_timing_header(durations, queries):
+    """Server-Timing header value for the metrics returned by RequestTiming.durations()"""
+    parts = []
+    for name, duration in durations.items():
+        part = f"{name};dur={duration:.1f}"
+        if name == 'db':
+            part += f';desc="{queries} queries"'
+        parts.append(part)
+    return ', '.join(parts)
+
+
+class RequestTimingMiddleware:
+    """
+    Add Server-Timing headers (and optionally a log line) with SQL, view and
+    serialization time; listed near the top of MIDDLEWARE so ``total`` covers the rest
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_TIMING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.log = getattr(settings, 'REQUEST_TIMING_LOG', False)
+
+    def __call__(self, request):
+        timing = request.timing = RequestTiming()
+        with connection.execute_wrapper(timing.queries):
+            response = self.get_response(request)
+        ended = time.perf_counter()
+
+        durations = timing.durations(ended)
+        header = server_timing_header(durations, timing.queries.count)
+        if response.has_header('Server-Timing'):
+            header = f"{response['Server-Timing']}, {header}"
+        response['Server-Timing'] = header
+
+        if self.log:
+            logger.info(json.dumps({
+                'view': timing.view_name,
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': timing.queries.count,
+                **{f'{name}_ms': round(duration, 2) for name, duration in durations.items()},
+            }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timing.view_name = request.resolver_match.view_name
+        request.timing.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; this runs just before
+        request.timing.view_ended = request.timing.render_started = time.perf_counter()
+        response.add_post_render_callback(request.timing.rendered)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Record latency and SQL query count of every request by URL name for
+    /api/metrics/; removed at startup when METRICS_ENABLED is off or
+    prometheus_client is missing
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True) or not metrics.available():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = QueryTimer()
+        started = time.perf_counter()
+        with connection.execute_wrapper(queries):
+            response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        metrics.observe_request(
+            match.view_name if match else None, request.method, response.status_code,
+            time.perf_counter() - started, queries.count
+        )
+        return response
+
+
+class SlowQueryMiddleware:
+    """
+    Make the URL name of the current request available to slow query log
+    lines; removed at startup when SLOW_QUERY_MS is 0
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SLOW_QUERY_MS', 0):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = current_view.set(None)
+        try:
+            return self.get_response(request)
+        finally:
+            current_view.reset(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        current_view.set(request.resolver_match.view_name)
+
+
+class ProbeMiddleware:
+    """
+    Serve /api/health/ and /api/ready/ directly, skipping the rest of the
+    middleware (host validation, sessions, CSRF, timing, metrics); listed
+    first in MIDDLEWARE
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.probes = None
+
+    def __call__(self, request):
+        if self.probes is None:
+            from .views import HealthView, ReadyView
+            self.probes = {reverse('health'): HealthView.as_view(), reverse('ready'): ReadyView.as_view()}
+        probe = self.probes.get(request.path)
+        if probe is None:
+            return self.get_response(request)
+        return probe(request)
+
+
+class ProfileMiddleware:
+    """
+    Profile admin requests that ask for it with an ``X-Profile: 1`` header and
+    link the result in ``X-Profile-Url``; removed at startup when
+    REQUEST_PROFILING is off. Other requests only pay for the header check.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.META.get('HTTP_X_PROFILE', '0') in ('', '0') or not profiling.is_admin_request(request):
+            return self.get_response(request)
+        return profiling.profile_request(self.get_response, request)
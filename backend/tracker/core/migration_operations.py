@@ -0,0 +1,45 @@
+"""
+Custom migration operations for the core app
+"""
+
+from django.db import migrations
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """
+    Add an index without locking the table for writes on PostgreSQL
+
+    Uses CREATE INDEX CONCURRENTLY on PostgreSQL and a plain CREATE INDEX on
+    other backends (SQLite for local development and tests). Migrations using
+    this operation must set ``atomic = False``. If a concurrent build fails it
+    leaves an INVALID index behind; drop it and re-run the migration.
+    PostgreSQL cannot build indexes concurrently on partitioned tables (see
+    core.partitioning), so those get a regular build.
+    """
+
+    @staticmethod
+    def _concurrently(schema_editor, model):
+        from core.partitioning import is_partitioned
+        return (
+            schema_editor.connection.vendor == 'postgresql'
+            and not is_partitioned(schema_editor.connection, model._meta.db_table)
+        )
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            if self._concurrently(schema_editor, model):
+                schema_editor.add_index(model, self.index, concurrently=True)
+            else:
+                schema_editor.add_index(model, self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            if self._concurrently(schema_editor, model):
+                schema_editor.remove_index(model, self.index, concurrently=True)
+            else:
+                schema_editor.remove_index(model, self.index)
+
+    def describe(self):
+        return f"{super().describe()} (concurrently on PostgreSQL)"
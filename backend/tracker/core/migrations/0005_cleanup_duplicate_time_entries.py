@@ -13,6 +13,7 @@ def cleanup_duplicate_time_entries(apps, schema_editor):
     3. Delete the other duplicates
     """
     HourEntry = apps.get_model('core', 'HourEntry')
+    db_alias = schema_editor.connection.alias
     
     # Find all duplicates grouped by (user, project, date)
     from collections import defaultdict
@@ -20,7 +21,7 @@ def cleanup_duplicate_time_entries(apps, schema_editor):
     # Group entries by (user_id, project_id, date)
     grouped_entries = defaultdict(list)
     
-    for entry in HourEntry.objects.all():
+    for entry in HourEntry.objects.using(db_alias).all():
         key = (entry.user_id, entry.project_id, entry.date)
         grouped_entries[key].append(entry)
     
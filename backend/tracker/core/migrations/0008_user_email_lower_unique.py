@@ -0,0 +1,47 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:44
+
+import django.db.models.functions.text
+from django.core.management.base import CommandError
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_case_insensitive_duplicates(apps, schema_editor):
+    """
+    Stop before the constraint when emails differ only in case.
+    Which account to keep (and where its hours, assignments and tokens go)
+    is a decision for an admin, so the conflicts are listed instead of merged.
+    """
+    User = apps.get_model('core', 'User')
+    users = User.objects.using(schema_editor.connection.alias)
+    duplicates = users.annotate(email_lower=Lower('email')).values('email_lower').annotate(
+        accounts=Count('id')
+    ).filter(accounts__gt=1).values_list('email_lower', flat=True)
+    conflicts = []
+    for email in duplicates.order_by('email_lower'):
+        accounts = users.filter(email__iexact=email).order_by('id')
+        conflicts.append(f"  {email}: " + ', '.join(
+            f"id={user.id} username={user.username} email={user.email}" for user in accounts
+        ))
+    if conflicts:
+        raise CommandError(
+            "Emails must be unique ignoring case, but these accounts share one. Change or merge "
+            "them (e.g. in the Django admin or shell), then run migrate again:\n" + '\n'.join(conflicts)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0007_merge_20250807_0009'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_case_insensitive_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='user',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), name='core_user_email_lower_uniq'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:46
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_user_email_lower_unique'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='hourentry',
+            index=models.Index(fields=['user', 'date'], name='core_hour_user_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='hourentry',
+            index=models.Index(fields=['project', 'date'], name='core_hour_project_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='hourentry',
+            index=models.Index(fields=['date'], name='core_hour_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='projectassignment',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user', 'project'], name='core_assign_active_user_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='projectassignment',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['project', 'user'], name='core_assign_active_proj_idx'),
+        ),
+    ]
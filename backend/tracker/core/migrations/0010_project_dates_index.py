@@ -0,0 +1,21 @@
+# Generated by Django 5.2.4 on 2026-10-19 10:51
+
+from django.db import migrations, models
+
+from core.migration_operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_hot_filter_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='project',
+            index=models.Index(fields=['start_date', 'end_date'], name='core_project_dates_idx'),
+        ),
+    ]
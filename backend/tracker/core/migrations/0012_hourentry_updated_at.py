@@ -0,0 +1,20 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:02
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_hour_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='hourentry',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, help_text='Last change; part of report data versions'),
+            preserve_default=False,
+        ),
+    ]
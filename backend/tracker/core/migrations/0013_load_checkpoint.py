@@ -0,0 +1,27 @@
+# Generated by Django 5.2.4 on 2026-10-19 11:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_hourentry_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoadCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(help_text='e.g. restore:backup_20250101_000000', max_length=200)),
+                ('table', models.CharField(max_length=100)),
+                ('position', models.BigIntegerField(default=0, help_text='Chunks loaded (restore) or last primary key copied (transfer)')),
+                ('rows', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'unique_together': {('job', 'table')},
+            },
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.db.models.functions import Lower
 from datetime import date
 
 # Create your models here.
@@ -9,6 +10,62 @@ class User(AbstractUser):
     email = models.EmailField(unique=True, help_text="Email address - must be unique")
     is_admin = models.BooleanField(default=False)
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Case-insensitive uniqueness; also serves login lookups on lower(email)
+            models.UniqueConstraint(Lower('email'), name='core_user_email_lower_uniq'),
+        ]
+
+PROJECT_STATUSES = ('active', 'inactive', 'not_started', 'no_dates')
+
+
+class ProjectQuerySet(models.QuerySet):
+    """QuerySet that evaluates project status in SQL instead of per instance"""
+
+    @staticmethod
+    def status_q(status, today=None):
+        """
+        Q object matching projects with the given status on ``today``.
+        Plain comparisons on start_date/end_date so the dates index can be used.
+        """
+        today = today or date.today()
+        has_dates = models.Q(start_date__isnull=False, end_date__isnull=False)
+        if status == 'active':
+            return has_dates & models.Q(start_date__lte=today, end_date__gte=today)
+        if status == 'not_started':
+            return has_dates & models.Q(start_date__gt=today)
+        if status == 'inactive':
+            return has_dates & models.Q(end_date__lt=today)
+        if status == 'no_dates':
+            return models.Q(start_date__isnull=True) | models.Q(end_date__isnull=True)
+        raise ValueError(f"Unknown project status '{status}'")
+
+    def with_status(self, today=None):
+        """Annotate each project with ``annotated_status`` computed by the database"""
+        today = today or date.today()
+        return self.annotate(annotated_status=models.Case(
+            models.When(self.status_q('no_dates', today), then=models.Value('no_dates')),
+            models.When(start_date__gt=today, then=models.Value('not_started')),
+            models.When(end_date__lt=today, then=models.Value('inactive')),
+            default=models.Value('active'),
+            output_field=models.CharField(),
+        ))
+
+    def filter_status(self, status, today=None):
+        return self.filter(self.status_q(status, today))
+
+    def with_assigned_users(self):
+        """
+        Load owners and active assignments (with their users) up front, so
+        serializing a list of projects takes a fixed number of queries
+        """
+        return self.select_related('owner').prefetch_related(models.Prefetch(
+            'assignments',
+            queryset=ProjectAssignment.objects.filter(is_active=True).select_related('user'),
+            to_attr='active_assignments',
+        ))
+
+
 class Project(models.Model):
     name = models.CharField(max_length=100)
     client = models.CharField(max_length=100, default="Default Client", blank=True)
@@ -16,6 +73,14 @@ class Project(models.Model):
     start_date = models.DateField(null=True, blank=True, help_text="Project start date")
     end_date = models.DateField(null=True, blank=True, help_text="Project end date")
 
+    objects = ProjectQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # ?status= filters and active-on-date lookups
+            models.Index(fields=['start_date', 'end_date'], name='core_project_dates_idx'),
+        ]
+
     def clean(self):
         """Validate project dates"""
         if self.start_date and self.end_date and self.start_date > self.end_date:
@@ -28,16 +93,18 @@ class Project(models.Model):
         Returns True if current date is between start_date and end_date (inclusive).
         Returns False if dates are not set or project is outside date range.
         """
-        if not self.start_date or not self.end_date:
-            return False
-        today = date.today()
-        return self.start_date <= today <= self.end_date
+        return self.status == 'active'
 
     @property
     def status(self):
         """
         Get project status: 'not_started', 'active', or 'inactive'
+        Uses the value annotated by Project.objects.with_status() when present.
         """
+        annotated = getattr(self, 'annotated_status', None)
+        if annotated is not None:
+            return annotated
+
         if not self.start_date or not self.end_date:
             return 'no_dates'
         
@@ -70,10 +137,19 @@ class HourEntry(models.Model):
     date = models.DateField()
     hours = models.DecimalField(max_digits=5, decimal_places=2)
     note = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True, help_text="Last change; part of report data versions")
 
     class Meta:
         unique_together = ['user', 'project', 'date']  # Prevent duplicate time entries
         ordering = ['-date']
+        indexes = [
+            # Per-user date ranges (own timesheet, daily/weekly/monthly summaries)
+            models.Index(fields=['user', 'date'], name='core_hour_user_date_idx'),
+            # Project reports and ?project= filters with date ranges
+            models.Index(fields=['project', 'date'], name='core_hour_project_date_idx'),
+            # Admin date-range queries across all users
+            models.Index(fields=['date'], name='core_hour_date_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.project.name} - {self.date}"
@@ -93,6 +169,79 @@ class ProjectAssignment(models.Model):
     class Meta:
         unique_together = ['project', 'user']  # Prevent duplicate assignments
         ordering = ['-assigned_date']
+        indexes = [
+            # Active assignments only: project lists and access checks by user,
+            # assigned-user lookups by project
+            models.Index(fields=['user', 'project'], condition=models.Q(is_active=True),
+                         name='core_assign_active_user_idx'),
+            models.Index(fields=['project', 'user'], condition=models.Q(is_active=True),
+                         name='core_assign_active_proj_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.username} → {self.project.name}"
+
+
+class ArchivedHourTotal(models.Model):
+    """
+    Pre-aggregated hours for archived periods (see archive_hours command)
+
+    One row per (user, project, date) with the hours moved out of HourEntry.
+    Field names mirror HourEntry so summary queries run unchanged on both.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_hour_totals')
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='archived_hour_totals')
+    date = models.DateField()
+    hours = models.DecimalField(max_digits=7, decimal_places=2)
+    entry_count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        unique_together = ['user', 'project', 'date']
+        indexes = [
+            models.Index(fields=['date'], name='core_archived_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.project_id} - {self.date}: {self.hours}"
+
+
+class HourArchive(models.Model):
+    """
+    One archived period of hour entries
+
+    The raw entries (including notes) are stored in a gzip-compressed JSON
+    lines file; their totals live in ArchivedHourTotal. The latest
+    period_end is the archive boundary used by the summary endpoints.
+    """
+    period_start = models.DateField()
+    period_end = models.DateField(help_text="Exclusive end of the archived period")
+    file_path = models.CharField(max_length=500, blank=True)
+    entry_count = models.PositiveIntegerField(default=0)
+    total_hours = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-period_end']
+
+    def __str__(self):
+        return f"{self.period_start} → {self.period_end} ({self.entry_count} entries)"
+
+
+class LoadCheckpoint(models.Model):
+    """
+    Progress of a resumable bulk load (backup restore or database transfer)
+
+    Updated in the same transaction as the rows it covers, so an interrupted
+    load resumes exactly after the last committed batch.
+    """
+    job = models.CharField(max_length=200, help_text="e.g. restore:backup_20250101_000000")
+    table = models.CharField(max_length=100)
+    position = models.BigIntegerField(default=0, help_text="Chunks loaded (restore) or last primary key copied (transfer)")
+    rows = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['job', 'table']
+
+    def __str__(self):
+        return f"{self.job} {self.table} @ {self.position}"
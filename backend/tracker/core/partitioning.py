@@ -0,0 +1,191 @@
+"""
+Monthly range partitioning of the hour entry table (PostgreSQL only)
+
+Partitioning is optional. ``manage.py hour_partitions convert`` turns the
+existing ``core_hourentry`` table into a table partitioned by month on
+``date``; after that ``create`` pre-creates future partitions and ``detach``
+removes old months from the hot table.
+
+The unique (user, project, date) constraint keeps working because it
+includes the partition key. The primary key becomes (id, date) in the
+database since PostgreSQL requires the partition key in every unique
+constraint; ``id`` stays sequence-generated, so Django keeps treating it as
+the primary key.
+"""
+
+import re
+from datetime import date
+from typing import Dict, List, Tuple
+
+from django.db import connection as default_connection, transaction
+
+from .models import HourEntry
+
+TABLE = HourEntry._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+PARTITION_NAME_RE = re.compile(rf"^{TABLE}_p(\d{{4}})(\d{{2}})$")
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def add_months(value: date, months: int) -> date:
+    """First day of the month ``months`` after the month containing ``value``"""
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def month_range(start: date, end: date) -> List[date]:
+    """First days of every month from ``start`` up to and including ``end``"""
+    months = []
+    month = month_start(start)
+    while month <= end:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def check_postgresql(connection=default_connection):
+    if connection.vendor != 'postgresql':
+        raise NotImplementedError(f"Hour entry partitioning requires PostgreSQL, not {connection.vendor}")
+
+
+def is_partitioned(connection=default_connection, table: str = TABLE) -> bool:
+    """Whether ``table`` is a partitioned (parent) table"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [table])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def list_partitions(connection=default_connection) -> List[Tuple[str, str]]:
+    """(partition name, bound expression) for every attached partition"""
+    check_postgresql(connection)
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            ORDER BY child.relname
+        """, [TABLE])
+        return cursor.fetchall()
+
+
+def create_partitions(months: List[date], connection=default_connection) -> List[str]:
+    """Create the monthly partitions that do not exist yet; returns the new names"""
+    check_postgresql(connection)
+    qn = connection.ops.quote_name
+    existing = {name for name, _ in list_partitions(connection)}
+    created = []
+    with connection.cursor() as cursor:
+        for month in months:
+            name = partition_name(month)
+            if name in existing:
+                continue
+            # Creating a partition scans the default partition for rows that
+            # belong to the new range, so keep the default partition small
+            cursor.execute(
+                f"CREATE TABLE {qn(name)} PARTITION OF {qn(TABLE)} FOR VALUES FROM (%s) TO (%s)",
+                [month, add_months(month, 1)]
+            )
+            created.append(name)
+    return created
+
+
+def detach_partitions(before: date, drop: bool = False, connection=default_connection) -> List[str]:
+    """
+    Detach monthly partitions that end on or before ``before``
+
+    Detached partitions stay as standalone tables (named like the partition)
+    so they can be archived or dumped; pass ``drop=True`` to delete them.
+    """
+    check_postgresql(connection)
+    qn = connection.ops.quote_name
+    detached = []
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        for name, _ in list_partitions(connection):
+            if name == DEFAULT_PARTITION:
+                continue
+            match = PARTITION_NAME_RE.match(name)
+            if not match:
+                continue
+            month = date(int(match.group(1)), int(match.group(2)), 1)
+            if add_months(month, 1) > before:
+                continue
+            cursor.execute(f"ALTER TABLE {qn(TABLE)} DETACH PARTITION {qn(name)}")
+            if drop:
+                cursor.execute(f"DROP TABLE {qn(name)}")
+            detached.append(name)
+    return detached
+
+
+def convert_to_partitioned(months_ahead: int = 3, connection=default_connection) -> Dict[str, int]:
+    """
+    Rebuild ``core_hourentry`` as a table partitioned by month
+
+    Runs in one transaction holding an ACCESS EXCLUSIVE lock on the table for
+    the duration of the copy, so schedule it in a maintenance window.
+    Constraints and indexes are recreated under their original names.
+    """
+    check_postgresql(connection)
+    if is_partitioned(connection):
+        raise ValueError(f"{TABLE} is already partitioned")
+
+    qn = connection.ops.quote_name
+    legacy = f"{TABLE}_legacy"
+    sequence = f"{TABLE}_id_partitioned_seq"
+
+    with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {qn(TABLE)} IN ACCESS EXCLUSIVE MODE")
+
+        # Capture constraint and index definitions before the table goes away
+        cursor.execute("""
+            SELECT conname, contype, pg_get_constraintdef(oid)
+            FROM pg_constraint
+            WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u', 'f', 'c')
+        """, [TABLE])
+        constraints = cursor.fetchall()
+        constraint_names = {name for name, _, _ in constraints}
+        cursor.execute("SELECT indexname, indexdef FROM pg_indexes WHERE tablename = %s", [TABLE])
+        indexes = [(name, definition) for name, definition in cursor.fetchall() if name not in constraint_names]
+
+        cursor.execute("SELECT min(date), max(date), coalesce(max(id), 0), count(*) FROM " + qn(TABLE))
+        first_date, last_date, max_id, row_count = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {qn(TABLE)} RENAME TO {qn(legacy)}")
+        cursor.execute(
+            f"CREATE TABLE {qn(TABLE)} (LIKE {qn(legacy)} INCLUDING DEFAULTS) PARTITION BY RANGE ({qn('date')})"
+        )
+        # Identity columns do not carry over through LIKE; use a plain sequence
+        cursor.execute(f"CREATE SEQUENCE {qn(sequence)} OWNED BY {qn(TABLE)}.{qn('id')}")
+        cursor.execute("SELECT setval(%s, %s, false)", [sequence, max_id + 1])
+        cursor.execute(
+            f"ALTER TABLE {qn(TABLE)} ALTER COLUMN {qn('id')} SET DEFAULT nextval(%s::regclass)", [sequence]
+        )
+        cursor.execute(f"CREATE TABLE {qn(DEFAULT_PARTITION)} PARTITION OF {qn(TABLE)} DEFAULT")
+
+        today = date.today()
+        start = month_start(first_date) if first_date else month_start(today)
+        end = max(last_date or today, today)
+        partitions = create_partitions(month_range(start, add_months(end, months_ahead)), connection)
+
+        cursor.execute(f"INSERT INTO {qn(TABLE)} SELECT * FROM {qn(legacy)}")
+        cursor.execute(f"DROP TABLE {qn(legacy)}")
+
+        for name, kind, definition in constraints:
+            if kind == 'p':
+                definition = f"PRIMARY KEY ({qn('id')}, {qn('date')})"
+            cursor.execute(f"ALTER TABLE {qn(TABLE)} ADD CONSTRAINT {qn(name)} {definition}")
+        # Definitions were read before the rename, so they already target TABLE
+        for name, definition in indexes:
+            cursor.execute(definition)
+
+    return {'rows': row_count, 'partitions': len(partitions) + 1}
@@ -0,0 +1,117 @@
+"""
+On-demand request profiling
+
+With REQUEST_PROFILING enabled, an admin can send ``X-Profile: 1`` with any
+API request (authenticated with their token as usual) to have that single
+request run under cProfile. The profile is saved to PROFILE_DIR and the
+response carries an ``X-Profile-Url`` header pointing at
+/api/profiles/<name>/, which returns the raw ``.prof`` file (for pstats,
+snakeviz or flameprof) or, with ``?as=txt``, the top functions by
+cumulative time.
+
+Requests without the header pay one dictionary lookup. Only one request per
+process is profiled at a time; a concurrent X-Profile request is served
+normally with ``X-Profile-Error: busy``. Streaming responses produce their
+body after the profile ends, so that part is not included.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import threading
+import uuid
+from typing import Optional
+
+from django.conf import settings
+from django.urls import reverse
+from django.utils import timezone
+
+DEFAULT_PROFILE_KEEP = 50
+STATS_LIMIT = 60
+PROFILE_NAME = re.compile(r'^[\w.-]+\.prof$')
+
+_lock = threading.Lock()
+
+
+def profile_dir() -> str:
+    return getattr(settings, 'PROFILE_DIR', os.path.join(settings.BASE_DIR, 'profiles'))
+
+
+def is_admin_request(request) -> bool:
+    """Whether the request carries a valid token of an active admin"""
+    from rest_framework.authentication import TokenAuthentication
+    from rest_framework.exceptions import AuthenticationFailed
+    try:
+        authenticated = TokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return authenticated is not None and authenticated[0].is_admin
+
+
+def profile_request(get_response, request):
+    """Run the rest of the middleware chain and the view under cProfile"""
+    if not _lock.acquire(blocking=False):
+        response = get_response(request)
+        response['X-Profile-Error'] = 'busy'
+        return response
+    try:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiler (a debugger, coverage) owns the interpreter's hooks
+            response = get_response(request)
+            response['X-Profile-Error'] = 'profiler unavailable'
+            return response
+        try:
+            response = get_response(request)
+        finally:
+            profiler.disable()
+        match = getattr(request, 'resolver_match', None)
+        name = save_profile(profiler, match.view_name if match else 'unresolved')
+    finally:
+        _lock.release()
+    response['X-Profile-Url'] = reverse('profile-download', kwargs={'name': name})
+    return response
+
+
+def save_profile(profiler: cProfile.Profile, label: str) -> str:
+    """Write the profile to PROFILE_DIR, prune old ones and return the file name"""
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    label = re.sub(r'[^\w-]+', '-', label).strip('-') or 'request'
+    name = f"{timezone.now():%Y%m%d-%H%M%S}-{label}-{uuid.uuid4().hex[:8]}.prof"
+    profiler.dump_stats(os.path.join(directory, name))
+    prune(directory, getattr(settings, 'PROFILE_KEEP', DEFAULT_PROFILE_KEEP))
+    return name
+
+
+def prune(directory: str, keep: int):
+    """Delete all but the newest ``keep`` profiles"""
+    profiles = sorted(
+        (entry for entry in os.scandir(directory) if PROFILE_NAME.match(entry.name)),
+        key=lambda entry: entry.stat().st_mtime, reverse=True
+    )
+    for entry in profiles[keep:]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def profile_path(name: str) -> Optional[str]:
+    """Path of a saved profile, or None for unknown or malformed names"""
+    if not PROFILE_NAME.match(name):
+        return None
+    path = os.path.join(profile_dir(), name)
+    return path if os.path.isfile(path) else None
+
+
+def stats_text(path: str, limit: int = STATS_LIMIT) -> str:
+    """The top functions of a saved profile by cumulative time, as pstats prints them"""
+    output = io.StringIO()
+    stats = pstats.Stats(path, stream=output)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
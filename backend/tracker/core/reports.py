@@ -0,0 +1,322 @@
+"""
+Server-side time report rendering
+
+Reports are assembled with aggregate queries (per-section subtotals) plus a
+single ordered values() query for the entry rows, rendered to HTML with a
+Django template or to PDF with reportlab, and cached as finished bytes keyed
+by the report parameters and a data version. The data version (entry count,
+latest updated_at and hour total of the report's entries, plus archived
+totals) changes whenever an entry in the report changes, so cached artifacts
+never go stale; renames of users or projects show up once the cache expires.
+"""
+
+import hashlib
+import json
+from datetime import datetime
+from decimal import Decimal
+from io import BytesIO
+from typing import Any, Dict, List, Optional
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max, Q, Sum
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .archive import archived_totals, combined_breakdown
+from .metrics import record_cache_lookup
+from .models import HourEntry, Project, User
+
+REPORT_TYPES = ('project', 'user', 'team')
+REPORT_FORMATS = ('pdf', 'html')
+CONTENT_TYPES = {
+    'pdf': 'application/pdf',
+    'html': 'text/html; charset=utf-8',
+}
+CACHE_KEY = 'report:{}'
+
+USER_FIELDS = ['user__id', 'user__first_name', 'user__last_name', 'user__username']
+PROJECT_FIELDS = ['project__id', 'project__name', 'project__client']
+
+
+class ReportError(Exception):
+    """Invalid report request; the message is safe to show to the client"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ReportRenderingUnavailable(ReportError):
+    """The renderer for the requested format is not installed"""
+
+    def __init__(self, message):
+        super().__init__(message, status_code=501)
+
+
+def _parse_date(value: Optional[str], name: str):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ReportError(f"{name} must be a date in YYYY-MM-DD format")
+
+
+def _parse_id(value: Optional[str], name: str) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ReportError(f"{name} is required and must be an integer")
+
+
+def _user_name(row: Dict[str, Any]) -> str:
+    return f"{row['user__first_name']} {row['user__last_name']}".strip() or row['user__username']
+
+
+class ReportRequest:
+    """Validated report parameters and the querysets they select"""
+
+    def __init__(self, params, requesting_user):
+        self.type = params.get('type')
+        if self.type not in REPORT_TYPES:
+            raise ReportError(f"type must be one of: {', '.join(REPORT_TYPES)}")
+        self.format = params.get('format', 'pdf')
+        if self.format not in REPORT_FORMATS:
+            raise ReportError(f"format must be one of: {', '.join(REPORT_FORMATS)}")
+
+        self.start_date = _parse_date(params.get('start_date'), 'start_date')
+        self.end_date = _parse_date(params.get('end_date'), 'end_date')
+        if self.start_date and self.end_date and self.start_date > self.end_date:
+            raise ReportError("start_date cannot be after end_date")
+
+        user = requesting_user
+        self.project = None
+        self.subject = None
+
+        if self.type == 'project':
+            project_id = _parse_id(params.get('project'), 'project')
+            try:
+                self.project = Project.objects.get(id=project_id)
+            except Project.DoesNotExist:
+                raise ReportError('Project not found', status_code=404)
+            if not user.is_admin and not Project.objects.filter(
+                Q(owner=user) | Q(assignments__user=user, assignments__is_active=True),
+                id=project_id
+            ).exists():
+                raise ReportError('You do not have access to this project', status_code=403)
+        elif self.type == 'user':
+            subject_id = _parse_id(params.get('user', user.id), 'user')
+            if not user.is_admin and subject_id != user.id:
+                raise ReportError('Permission denied', status_code=403)
+            try:
+                self.subject = User.objects.get(id=subject_id)
+            except User.DoesNotExist:
+                raise ReportError('User not found', status_code=404)
+        elif not user.is_admin:
+            raise ReportError('Team reports are available to admins only', status_code=403)
+
+        # Regular users only ever see their own hours
+        self.user_filter = None if user.is_admin else user.id
+
+    def _filter(self, queryset):
+        if self.project is not None:
+            queryset = queryset.filter(project_id=self.project.id)
+        if self.subject is not None:
+            queryset = queryset.filter(user_id=self.subject.id)
+        if self.user_filter is not None:
+            queryset = queryset.filter(user_id=self.user_filter)
+        return queryset
+
+    def entries(self):
+        queryset = HourEntry.objects.all()
+        if self.start_date:
+            queryset = queryset.filter(date__gte=self.start_date)
+        if self.end_date:
+            queryset = queryset.filter(date__lte=self.end_date)
+        return self._filter(queryset)
+
+    def archived(self):
+        archived = archived_totals(self.start_date, self.end_date)
+        return None if archived is None else self._filter(archived)
+
+    def querysets(self):
+        # Cached so the archive boundary is looked up once per request
+        if not hasattr(self, '_querysets'):
+            archived = self.archived()
+            self._querysets = [self.entries()] if archived is None else [self.entries(), archived]
+        return self._querysets
+
+    def params_key(self) -> Dict[str, Any]:
+        return {
+            'type': self.type,
+            'format': self.format,
+            'project': self.project.id if self.project else None,
+            'user': self.subject.id if self.subject else None,
+            'viewer': self.user_filter,
+            'start_date': self.start_date.isoformat() if self.start_date else None,
+            'end_date': self.end_date.isoformat() if self.end_date else None,
+        }
+
+
+def data_version(report: ReportRequest) -> List[str]:
+    """Cheap fingerprint of the report's underlying rows (one aggregate per table)"""
+    version = []
+    for queryset in report.querysets():
+        fields = {'count': Count('id'), 'total': Sum('hours')}
+        if queryset.model is HourEntry:
+            fields['latest'] = Max('updated_at')
+        stats = queryset.order_by().aggregate(**fields)
+        version.append(json.dumps(stats, default=str, sort_keys=True))
+    return version
+
+
+def cache_key(report: ReportRequest) -> str:
+    payload = json.dumps({'params': report.params_key(), 'version': data_version(report)}, sort_keys=True)
+    return CACHE_KEY.format(hashlib.sha256(payload.encode()).hexdigest())
+
+
+def build_report_data(report: ReportRequest) -> Dict[str, Any]:
+    """Assemble report sections: one aggregate query for subtotals, one for rows"""
+    querysets = report.querysets()
+    sections = []
+
+    if report.type == 'team':
+        # Aggregates only: hours per user and project
+        by_user: Dict[int, Dict[str, Any]] = {}
+        for row in combined_breakdown(querysets, USER_FIELDS + ['project__id', 'project__name']):
+            section = by_user.setdefault(row['user__id'], {
+                'heading': _user_name(row),
+                'columns': ['Project', 'Hours'],
+                'rows': [],
+                'subtotal': Decimal('0'),
+            })
+            section['rows'].append([row['project__name'], f"{row['total_hours']:.2f}"])
+            section['subtotal'] += row['total_hours']
+        sections = sorted(by_user.values(), key=lambda section: section['heading'].lower())
+    else:
+        group_fields = USER_FIELDS if report.type == 'project' else PROJECT_FIELDS
+        group_key = group_fields[0].replace('__', '_')
+        for row in combined_breakdown(querysets, group_fields):
+            if report.type == 'project':
+                heading = _user_name(row)
+            else:
+                heading = row['project__name']
+                if row['project__client']:
+                    heading = f"{heading} ({row['project__client']})"
+            sections.append({
+                'id': row[group_fields[0]],
+                'heading': heading,
+                'columns': ['Date', 'Hours', 'Notes'],
+                'rows': [],
+                'subtotal': row['total_hours'],
+                'archived_hours': Decimal('0'),
+            })
+        by_id = {section['id']: section for section in sections}
+        for entry in report.entries().order_by(group_key, 'date').values(group_key, 'date', 'hours', 'note'):
+            section = by_id[entry[group_key]]
+            section['rows'].append([entry['date'].isoformat(), f"{entry['hours']:.2f}", entry['note']])
+            section['archived_hours'] -= entry['hours']
+        for section in sections:
+            # Whatever the subtotal has beyond the detailed rows came from the archive
+            section['archived_hours'] += section['subtotal']
+        sections.sort(key=lambda section: section['heading'].lower())
+
+    if report.type == 'project':
+        title = f"Time Report: {report.project.name}"
+        subtitle = f"Client: {report.project.client}" if report.project.client else ''
+    elif report.type == 'user':
+        name = f"{report.subject.first_name} {report.subject.last_name}".strip() or report.subject.username
+        title = f"Time Report: {name}"
+        subtitle = report.subject.email
+    else:
+        title = "Team Time Report"
+        subtitle = ''
+
+    if report.start_date or report.end_date:
+        period = f"{report.start_date or '…'} to {report.end_date or '…'}"
+    else:
+        period = 'All time'
+
+    return {
+        'title': title,
+        'subtitle': subtitle,
+        'period': period,
+        'sections': sections,
+        'total_hours': sum((section['subtotal'] for section in sections), Decimal('0')),
+        'generated_at': timezone.now(),
+    }
+
+
+def render_html(data: Dict[str, Any]) -> bytes:
+    return render_to_string('core/report.html', data).encode('utf-8')
+
+
+def render_pdf(data: Dict[str, Any]) -> bytes:
+    try:
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.lib.units import mm
+        from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+    except ImportError:
+        raise ReportRenderingUnavailable('PDF rendering requires reportlab; use format=html')
+
+    styles = getSampleStyleSheet()
+    buffer = BytesIO()
+    document = SimpleDocTemplate(buffer, pagesize=A4, title=data['title'],
+                                 leftMargin=15 * mm, rightMargin=15 * mm)
+    # Paragraph text is reportlab markup; names and notes must not be read as tags
+    story = [Paragraph(escape(data['title']), styles['Title'])]
+    if data['subtitle']:
+        story.append(Paragraph(escape(data['subtitle']), styles['Normal']))
+    story.append(Paragraph(f"Period: {escape(data['period'])}", styles['Normal']))
+    story.append(Spacer(1, 6 * mm))
+
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f3f4f6')),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#d1d5db')),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ])
+    for section in data['sections']:
+        story.append(Paragraph(escape(section['heading']), styles['Heading3']))
+        rows = [section['columns']]
+        rows += [
+            [Paragraph(escape(str(cell)), styles['BodyText']) if index == 2 else cell for index, cell in enumerate(row)]
+            for row in section['rows']
+        ]
+        if section.get('archived_hours'):
+            rows.append(['Archived', f"{section['archived_hours']:.2f}"] + [''] * (len(section['columns']) - 2))
+        rows.append(['Subtotal', f"{section['subtotal']:.2f}"] + [''] * (len(section['columns']) - 2))
+        widths = [30 * mm, 20 * mm, None] if len(section['columns']) == 3 else [None, 30 * mm]
+        table = Table(rows, colWidths=widths, repeatRows=1)
+        table.setStyle(table_style)
+        story += [table, Spacer(1, 4 * mm)]
+
+    story.append(Paragraph(f"<b>TOTAL HOURS: {data['total_hours']:.2f}</b>", styles['Heading2']))
+    document.build(story)
+    return buffer.getvalue()
+
+
+RENDERERS = {
+    'pdf': render_pdf,
+    'html': render_html,
+}
+
+
+def get_report_artifact(report: ReportRequest):
+    """
+    Return (key, content) for the report, rendering only on a cache miss
+
+    The key doubles as an ETag since it identifies params and data version.
+    """
+    key = cache_key(report)
+    content = cache.get(key)
+    record_cache_lookup('report', hit=content is not None)
+    if content is None:
+        content = RENDERERS[report.format](build_report_data(report))
+        cache.set(key, content, timeout=getattr(settings, 'REPORT_CACHE_TIMEOUT', 24 * 60 * 60))
+    return key, content
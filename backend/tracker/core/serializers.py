@@ -31,6 +31,15 @@ class UserSerializer(serializers.ModelSerializer):
         """Return full name for frontend compatibility"""
         return f"{obj.first_name} {obj.last_name}".strip()
 
+    def validate_email(self, value):
+        """Emails are unique case-insensitively (see core_user_email_lower_uniq)"""
+        existing = User.objects.filter(email__iexact=value)
+        if self.instance is not None:
+            existing = existing.exclude(pk=self.instance.pk)
+        if existing.exists():
+            raise serializers.ValidationError('A user with this email already exists.')
+        return value
+
     def validate(self, attrs):
         """Validate password confirmation and other fields"""
         # Only validate password confirmation for creation
@@ -108,13 +117,19 @@ class ProjectSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['owner', 'assigned_user_ids', 'assigned_users', 'owner_name', 'is_active', 'status']
     
+    def active_assignments_for(self, obj):
+        """Active assignments, prefetched by Project.objects.with_assigned_users() when available"""
+        if not hasattr(obj, 'active_assignments'):
+            obj.active_assignments = list(obj.assignments.filter(is_active=True).select_related('user'))
+        return obj.active_assignments
+    
     def get_assigned_user_ids(self, obj):
         """Return list of assigned user IDs for frontend compatibility"""
-        return list(obj.assignments.filter(is_active=True).values_list('user_id', flat=True))
+        return [assignment.user_id for assignment in self.active_assignments_for(obj)]
     
     def get_assigned_users(self, obj):
         """Return detailed assigned user information"""
-        assignments = obj.assignments.filter(is_active=True).select_related('user')
+        assignments = self.active_assignments_for(obj)
         return [
             {
                 'id': assignment.user.id,
@@ -203,6 +218,31 @@ class ProjectAssignmentRequestSerializer(serializers.Serializer):
         return value
 
 
+class BulkAssignmentRequestSerializer(serializers.Serializer):
+    """Serializer for users x projects bulk assignment requests"""
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        min_length=1,
+        help_text="List of user IDs (matrix rows)"
+    )
+    project_ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        min_length=1,
+        help_text="List of project IDs (matrix columns)"
+    )
+    mode = serializers.ChoiceField(
+        choices=['assign', 'unassign', 'replace'],
+        default='assign',
+        help_text="assign, unassign, or replace the active users of each project"
+    )
+    notes = serializers.CharField(
+        max_length=500,
+        required=False,
+        allow_blank=True,
+        help_text="Optional notes about the assignment"
+    )
+
+
 class HourEntrySerializer(serializers.ModelSerializer):
     hours = serializers.DecimalField(max_digits=5, decimal_places=2, coerce_to_string=False)
     
@@ -7,10 +7,23 @@ from typing import List, Dict, Any, Optional
 from django.db import transaction
 from django.core.exceptions import ValidationError, PermissionDenied
 from django.contrib.auth import get_user_model
+from rest_framework.authtoken.models import Token
 from .models import Project, ProjectAssignment, HourEntry
 
 User = get_user_model()
 
+BULK_ASSIGNMENT_MODES = ('assign', 'unassign', 'replace')
+BULK_BATCH_SIZE = 500
+
+
+def _user_summary(user) -> Dict[str, Any]:
+    """Compact user representation used in assignment results"""
+    return {
+        'user_id': user.id,
+        'username': user.username,
+        'name': f"{user.first_name} {user.last_name}".strip()
+    }
+
 
 class ProjectAssignmentService:
     """
@@ -41,76 +54,164 @@ class ProjectAssignmentService:
             PermissionDenied: If user is not admin
             ValidationError: If validation fails
         """
-        # Permission check
+        results = ProjectAssignmentService.bulk_assign(
+            user_ids=user_ids,
+            project_ids=[project_id],
+            assigned_by_user=assigned_by_user,
+            mode='assign',
+            notes=notes
+        )
+        return results['projects'][0]
+    
+    @staticmethod
+    def bulk_assign(
+        user_ids: List[int],
+        project_ids: List[int],
+        assigned_by_user: User,
+        mode: str = 'assign',
+        notes: str = ""
+    ) -> Dict[str, Any]:
+        """
+        Apply a users x projects assignment matrix in a single transaction
+        
+        Reads the existing assignments for the whole matrix once, then writes
+        new rows with bulk_create and (re)activations/deactivations with
+        bulk_update, so the query count does not grow with the matrix size.
+        
+        Args:
+            user_ids: List of user IDs (matrix rows)
+            project_ids: List of project IDs (matrix columns)
+            assigned_by_user: User making the change (must be admin)
+            mode: 'assign' adds the users to every project, 'unassign' removes
+                them, 'replace' makes them the only active users of each project
+            notes: Optional notes stored on new and reactivated assignments
+            
+        Returns:
+            Dict with the mode and one result per project, each in the same
+            format as assign_users_to_project / unassign_users_from_project
+            
+        Raises:
+            PermissionDenied: If user is not admin
+            ValidationError: If validation fails
+        """
         if not assigned_by_user.is_admin:
+            if mode == 'unassign':
+                raise PermissionDenied("Only admin users can unassign projects")
             raise PermissionDenied("Only admin users can assign projects")
         
-        try:
-            project = Project.objects.get(id=project_id)
-        except Project.DoesNotExist:
-            raise ValidationError(f"Project with ID {project_id} does not exist")
+        if mode not in BULK_ASSIGNMENT_MODES:
+            raise ValidationError(f"Invalid mode '{mode}'. Expected one of: {', '.join(BULK_ASSIGNMENT_MODES)}")
         
-        # Validate user IDs exist
-        users = User.objects.filter(id__in=user_ids)
-        if len(users) != len(user_ids):
-            invalid_ids = set(user_ids) - set(users.values_list('id', flat=True))
-            raise ValidationError(f"Invalid user IDs: {list(invalid_ids)}")
+        # Preserve request order while dropping duplicates
+        user_ids = list(dict.fromkeys(user_ids))
+        project_ids = list(dict.fromkeys(project_ids))
         
-        results = {
-            'project_id': project_id,
-            'project_name': project.name,
-            'assigned': [],
-            'already_assigned': [],
-            'errors': []
-        }
+        projects = {project.id: project for project in Project.objects.filter(id__in=project_ids).only('id', 'name')}
+        missing_projects = [pid for pid in project_ids if pid not in projects]
+        if len(missing_projects) == 1:
+            raise ValidationError(f"Project with ID {missing_projects[0]} does not exist")
+        if missing_projects:
+            raise ValidationError(f"Invalid project IDs: {missing_projects}")
+        
+        users = {user.id: user for user in User.objects.filter(id__in=user_ids)}
+        invalid_ids = [uid for uid in user_ids if uid not in users]
+        if invalid_ids:
+            raise ValidationError(f"Invalid user IDs: {invalid_ids}")
         
         with transaction.atomic():
-            for user in users:
-                try:
-                    assignment, created = ProjectAssignment.objects.get_or_create(
-                        project=project,
-                        user=user,
-                        defaults={
-                            'assigned_by': assigned_by_user,
-                            'notes': notes,
-                            'is_active': True
-                        }
-                    )
-                    
-                    if created:
-                        results['assigned'].append({
-                            'user_id': user.id,
-                            'username': user.username,
-                            'name': f"{user.first_name} {user.last_name}".strip()
-                        })
-                    else:
-                        # Reactivate if previously deactivated
-                        if not assignment.is_active:
+            # One read for the whole matrix. 'replace' also needs the other
+            # users currently assigned to these projects so it can remove them.
+            existing_qs = ProjectAssignment.objects.filter(project_id__in=project_ids)
+            if mode != 'replace':
+                existing_qs = existing_qs.filter(user_id__in=user_ids)
+            existing = {
+                (assignment.project_id, assignment.user_id): assignment
+                for assignment in existing_qs.select_related('user').select_for_update(of=('self',))
+            }
+            
+            to_create = []
+            to_activate = []
+            to_deactivate = []
+            project_results = []
+            
+            for project_id in project_ids:
+                project = projects[project_id]
+                result = {
+                    'project_id': project_id,
+                    'project_name': project.name,
+                }
+                
+                if mode in ('assign', 'replace'):
+                    result['assigned'] = []
+                    result['already_assigned'] = []
+                    for user_id in user_ids:
+                        user = users[user_id]
+                        assignment = existing.get((project_id, user_id))
+                        if assignment is None:
+                            to_create.append(ProjectAssignment(
+                                project_id=project_id,
+                                user_id=user_id,
+                                assigned_by=assigned_by_user,
+                                notes=notes,
+                                is_active=True
+                            ))
+                            result['assigned'].append(_user_summary(user))
+                        elif not assignment.is_active:
+                            # Reactivate if previously deactivated
                             assignment.is_active = True
                             assignment.assigned_by = assigned_by_user
                             assignment.notes = notes
-                            assignment.save()
-                            results['assigned'].append({
-                                'user_id': user.id,
-                                'username': user.username,
-                                'name': f"{user.first_name} {user.last_name}".strip(),
-                                'reactivated': True
-                            })
+                            to_activate.append(assignment)
+                            result['assigned'].append({**_user_summary(user), 'reactivated': True})
                         else:
-                            results['already_assigned'].append({
-                                'user_id': user.id,
-                                'username': user.username,
-                                'name': f"{user.first_name} {user.last_name}".strip()
-                            })
-                            
-                except Exception as e:
-                    results['errors'].append({
-                        'user_id': user.id,
-                        'username': user.username,
-                        'error': str(e)
-                    })
+                            result['already_assigned'].append(_user_summary(user))
+                
+                if mode in ('unassign', 'replace'):
+                    result['unassigned'] = []
+                    if mode == 'replace':
+                        keep = set(user_ids)
+                        removed = [
+                            assignment for (pid, uid), assignment in existing.items()
+                            if pid == project_id and uid not in keep and assignment.is_active
+                        ]
+                    else:
+                        result['not_assigned'] = []
+                        removed = []
+                        for user_id in user_ids:
+                            assignment = existing.get((project_id, user_id))
+                            if assignment is not None and assignment.is_active:
+                                removed.append(assignment)
+                            else:
+                                result['not_assigned'].append(_user_summary(users[user_id]))
+                    
+                    for assignment in removed:
+                        assignment.is_active = False
+                        to_deactivate.append(assignment)
+                        result['unassigned'].append(_user_summary(assignment.user))
+                
+                result['errors'] = []
+                project_results.append(result)
+            
+            if to_create:
+                ProjectAssignment.objects.bulk_create(to_create, batch_size=BULK_BATCH_SIZE)
+            if to_activate:
+                ProjectAssignment.objects.bulk_update(
+                    to_activate, ['is_active', 'assigned_by', 'notes'], batch_size=BULK_BATCH_SIZE
+                )
+            if to_deactivate:
+                ProjectAssignment.objects.filter(
+                    id__in=[assignment.id for assignment in to_deactivate]
+                ).update(is_active=False)
         
-        return results
+        return {
+            'mode': mode,
+            'projects': project_results,
+            'totals': {
+                'created': len(to_create),
+                'reactivated': len(to_activate),
+                'deactivated': len(to_deactivate)
+            }
+        }
     
     @staticmethod
     def unassign_users_from_project(
@@ -147,40 +248,25 @@ class ProjectAssignmentService:
         }
         
         with transaction.atomic():
-            assignments = ProjectAssignment.objects.filter(
+            assignments = list(ProjectAssignment.objects.filter(
                 project_id=project_id,
                 user_id__in=user_ids,
                 is_active=True
-            ).select_related('user')
+            ).select_related('user'))
             
-            for assignment in assignments:
-                try:
-                    assignment.is_active = False
-                    assignment.save()
-                    results['unassigned'].append({
-                        'user_id': assignment.user.id,
-                        'username': assignment.user.username,
-                        'name': f"{assignment.user.first_name} {assignment.user.last_name}".strip()
-                    })
-                except Exception as e:
-                    results['errors'].append({
-                        'user_id': assignment.user.id,
-                        'username': assignment.user.username,
-                        'error': str(e)
-                    })
+            # Deactivate the whole set in one UPDATE
+            ProjectAssignment.objects.filter(
+                id__in=[assignment.id for assignment in assignments]
+            ).update(is_active=False)
+            results['unassigned'] = [_user_summary(assignment.user) for assignment in assignments]
             
             # Find users that weren't assigned to begin with
-            assigned_user_ids = set(assignments.values_list('user_id', flat=True))
+            assigned_user_ids = {assignment.user_id for assignment in assignments}
             not_assigned_ids = set(user_ids) - assigned_user_ids
             
             if not_assigned_ids:
                 not_assigned_users = User.objects.filter(id__in=not_assigned_ids)
-                for user in not_assigned_users:
-                    results['not_assigned'].append({
-                        'user_id': user.id,
-                        'username': user.username,
-                        'name': f"{user.first_name} {user.last_name}".strip()
-                    })
+                results['not_assigned'] = [_user_summary(user) for user in not_assigned_users]
         
         return results
     
@@ -239,7 +325,7 @@ class ProjectAssignmentService:
         if not include_inactive:
             assignments = assignments.filter(is_active=True)
         
-        assignments = assignments.select_related('project', 'project__owner').order_by('-assigned_date')
+        assignments = assignments.select_related('project', 'project__owner', 'assigned_by').order_by('-assigned_date')
         
         return [{
             'project': {
@@ -298,4 +384,49 @@ class ProjectAssignmentService:
                 'projects': round((total_projects - unassigned_projects) / total_projects * 100, 1) if total_projects > 0 else 0,
                 'users': round((total_users - unassigned_users) / total_users * 100, 1) if total_users > 0 else 0
             }
-        } 
\ No newline at end of file
+        }
+
+
+class UserService:
+    """
+    Service class for user lifecycle operations
+    """
+    
+    @staticmethod
+    def deactivate_user(user: User, deactivated_by: User) -> Dict[str, Any]:
+        """
+        Soft delete a user and cascade the deactivation
+        
+        Deactivates the user, their active project assignments and revokes
+        their API token in one transaction. Every step is a set-based query,
+        so the cost is constant regardless of how many projects the user has.
+        
+        Args:
+            user: User to deactivate
+            deactivated_by: User making the change (must be admin)
+            
+        Returns:
+            Dict with counts of what was deactivated
+            
+        Raises:
+            PermissionDenied: If user is not admin
+        """
+        if not deactivated_by.is_admin:
+            raise PermissionDenied("Only admin users can deactivate users")
+        
+        with transaction.atomic():
+            User.objects.filter(id=user.id).update(is_active=False)
+            user.is_active = False
+            
+            assignments_deactivated = ProjectAssignment.objects.filter(
+                user_id=user.id,
+                is_active=True
+            ).update(is_active=False)
+            
+            tokens_revoked, _ = Token.objects.filter(user_id=user.id).delete()
+        
+        return {
+            'user_id': user.id,
+            'assignments_deactivated': assignments_deactivated,
+            'tokens_revoked': tokens_revoked
+        }
@@ -0,0 +1,253 @@
+"""
+Slow query log
+
+With SLOW_QUERY_MS set, every query on every database connection (requests,
+management commands) that takes at least that many milliseconds is logged to
+the ``core.slow_queries`` logger as one JSON line with:
+
+* ``sql`` and ``params`` (long values truncated), ``duration_ms`` and ``alias``
+* ``view``: URL name of the request that ran it (SlowQueryMiddleware)
+* ``frame``: the innermost project stack frame, e.g. ``core/services.py:380 in get_assignment_stats``
+* ``fingerprint``: hash of the SQL with literals and placeholders normalized
+* ``plan``: the EXPLAIN output (without ANALYZE, so nothing is executed again)
+
+Plans are captured on a background thread with its own connection so the
+request is not held up; the line is written once the plan is in. Each
+fingerprint is explained at most once per EXPLAIN_INTERVAL per process, later
+lines carry ``plan: null``.
+
+``manage.py summarize_slow_queries`` groups log lines by fingerprint.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('core.slow_queries')
+
+EXPLAIN_INTERVAL = 10 * 60
+MAX_PARAM_LENGTH = 200
+MAX_PARAMS = 20
+# Project modules that only pass queries through; never reported as the origin
+PASS_THROUGH_MODULES = ('slow_queries.py', 'middleware.py')
+# Only statements that EXPLAIN can describe without side effects
+EXPLAINABLE = ('SELECT', 'WITH')
+
+# URL name of the request being handled, set by SlowQueryMiddleware
+current_view: ContextVar[Optional[str]] = ContextVar('current_view', default=None)
+
+NORMALIZE = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),                     # string literals
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),                  # numbers
+    (re.compile(r'%s'), '?'),                                 # placeholders
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),     # IN lists and VALUES rows
+    (re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+'), '(...)'),  # multi-row VALUES
+    (re.compile(r'\s+'), ' '),
+]
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+_explained: Dict[str, float] = {}
+
+
+def normalize_sql(sql: str) -> str:
+    """SQL with literals, placeholders and IN lists replaced, so similar queries compare equal"""
+    for pattern, replacement in NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def fingerprint(sql: str) -> str:
+    return hashlib.md5(normalize_sql(sql).encode()).hexdigest()[:12]
+
+
+def _loggable(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    value = str(value)
+    return value if len(value) <= MAX_PARAM_LENGTH else value[:MAX_PARAM_LENGTH] + '…'
+
+
+def loggable_params(params, many: bool):
+    if params is None:
+        return None
+    if many:
+        # executemany: the number of rows is what matters
+        return {'rows': len(params) if hasattr(params, '__len__') else None}
+    if isinstance(params, dict):
+        return {key: _loggable(value) for key, value in params.items()}
+    params = list(params)
+    loggable = [_loggable(value) for value in params[:MAX_PARAMS]]
+    if len(params) > MAX_PARAMS:
+        loggable.append(f"… {len(params) - MAX_PARAMS} more")
+    return loggable
+
+
+def project_frame() -> Optional[str]:
+    """
+    Innermost stack frame in project code, skipping this module and the
+    middleware. None when the query was run from framework code only, such
+    as prefetches evaluated while DRF serializes a response.
+    """
+    base_dir = str(settings.BASE_DIR)
+    core_dir = os.path.dirname(os.path.abspath(__file__))
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if not filename.startswith(base_dir) or 'site-packages' in filename:
+            continue
+        if os.path.dirname(filename) == core_dir and os.path.basename(filename) in PASS_THROUGH_MODULES:
+            continue
+        return f"{os.path.relpath(filename, base_dir)}:{frame.lineno} in {frame.name}"
+    return None
+
+
+def explain_plan(connection, sql: str, params) -> List[str]:
+    """EXPLAIN output lines for a query, without running it"""
+    options = {'analyze': False} if connection.vendor == 'postgresql' else {}
+    with connection.cursor() as cursor:
+        cursor.execute(f"{connection.ops.explain_query_prefix(**options)} {sql}", params)
+        rows = cursor.fetchall()
+    return [str(row[-1]) if connection.vendor == 'sqlite' else str(row[0]) for row in rows]
+
+
+def _executor_instance() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='slow-query-explain')
+        return _executor
+
+
+def _explain_and_log(record: Dict[str, Any], sql: str, params):
+    connection = connections[record['alias']]
+    try:
+        record['plan'] = explain_plan(connection, sql, params)
+    except Exception as e:
+        record['plan'] = [f"EXPLAIN failed: {e}"]
+    finally:
+        # This thread's own connection; don't keep it open between slow queries
+        connection.close()
+    logger.warning(json.dumps(record))
+
+
+def _should_explain(record: Dict[str, Any], sql: str) -> bool:
+    if not getattr(settings, 'SLOW_QUERY_EXPLAIN', True) or record['many']:
+        return False
+    if not sql.lstrip().upper().startswith(EXPLAINABLE):
+        return False
+    now = time.monotonic()
+    with _executor_lock:
+        if now - _explained.get(record['fingerprint'], -EXPLAIN_INTERVAL) < EXPLAIN_INTERVAL:
+            return False
+        _explained[record['fingerprint']] = now
+    return True
+
+
+def log_slow_query(alias: str, sql: str, params, many: bool, duration_ms: float):
+    record = {
+        'duration_ms': round(duration_ms, 2),
+        'alias': alias,
+        'view': current_view.get(),
+        'frame': project_frame(),
+        'fingerprint': fingerprint(sql),
+        'sql': sql,
+        'params': loggable_params(params, many),
+        'many': many,
+        'plan': None,
+    }
+    if _should_explain(record, sql):
+        future = _executor_instance().submit(_explain_and_log, record, sql, params)
+        _pending.add(future)
+        future.add_done_callback(_pending.discard)
+    else:
+        logger.warning(json.dumps(record))
+
+
+def drain(timeout: Optional[float] = None):
+    """Wait for queued EXPLAINs to be logged"""
+    wait(list(_pending), timeout=timeout)
+
+
+class SlowQueryLogger:
+    """Database execute wrapper that logs queries slower than ``threshold_ms``"""
+
+    def __init__(self, threshold_ms: float):
+        self.threshold_ms = threshold_ms
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            # EXPLAINs run by the background thread are never logged themselves
+            if duration_ms >= self.threshold_ms and not sql.startswith('EXPLAIN'):
+                log_slow_query(context['connection'].alias, sql, params, many, duration_ms)
+
+
+def install(sender=None, connection=None, **kwargs):
+    """
+    connection_created receiver: add the slow query logger to a new connection
+
+    It goes first in execute_wrappers so that ``with connection.execute_wrapper()``
+    blocks, which pop the last wrapper, are unaffected.
+    """
+    threshold_ms = getattr(settings, 'SLOW_QUERY_MS', 0)
+    if threshold_ms and not any(isinstance(wrapper, SlowQueryLogger) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.insert(0, SlowQueryLogger(threshold_ms))
+
+
+def parse_log_line(line: str) -> Optional[Dict[str, Any]]:
+    """The slow query record in a log line, skipping any prefix added by the log handler"""
+    start = line.find('{')
+    if start < 0:
+        return None
+    try:
+        record = json.loads(line[start:])
+    except ValueError:
+        return None
+    if not isinstance(record, dict) or 'sql' not in record or 'duration_ms' not in record:
+        return None
+    return record
+
+
+def summarize(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Group slow query records by fingerprint of their SQL (recomputed, so
+    lines from older versions group the same way), one dict per group
+    """
+    groups = {}
+    for record in records:
+        key = fingerprint(record['sql'])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                'fingerprint': key, 'sql': normalize_sql(record['sql']), 'count': 0, 'total_ms': 0.0,
+                'max_ms': 0.0, 'views': Counter(), 'frames': Counter(), 'slowest': record, 'plan': None,
+            }
+        group['count'] += 1
+        group['total_ms'] += record['duration_ms']
+        group['views'][record.get('view') or '-'] += 1
+        group['frames'][record.get('frame') or '-'] += 1
+        if record['duration_ms'] >= group['max_ms']:
+            group['max_ms'] = record['duration_ms']
+            group['slowest'] = record
+        # Plans are captured once per interval, so keep the latest one seen
+        if record.get('plan'):
+            group['plan'] = record['plan']
+    for group in groups.values():
+        group['mean_ms'] = group['total_ms'] / group['count']
+    return list(groups.values())
@@ -1,3 +1,1863 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from importlib.util import find_spec
+from unittest import mock, skipUnless
+from xml.etree import ElementTree
 
-# Create your tests here.
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError, PermissionDenied
+from django.conf import settings
+from django.core.management import call_command, CommandError
+from django.db import IntegrityError, connection, connections, models, transaction
+from django.db.models import F, Q
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from .models import User, Project, HourEntry, ProjectAssignment, ArchivedHourTotal, HourArchive, LoadCheckpoint
+from .benchmarks import (
+    BUDGET_DATASETS, ENDPOINTS, check_query_budgets, compare_results, format_budget_table, query_budgets, run_endpoints
+)
+from .benchmarks import seed_dataset as seed_benchmark_dataset
+from .backup import (
+    BACKUP_MODELS, BackupError, chunk_path, create_backup, encode_row, iter_table_chunks, list_manifests, model_fields,
+    read_chunk, resolve_chain, table_checksum
+)
+from .checksums import bucket_checksums, row_digests
+from .partitioning import (
+    add_months, create_partitions, detach_partitions, is_partitioned, month_range, month_start, partition_name
+)
+from .restore import RestoreError, insert_rows, restore_backup
+from .services import ProjectAssignmentService, UserService
+from . import slow_queries
+from .transfer import SOURCE_ALIAS, TARGET_ALIAS
+from .verify import BackupSource, DatabaseSource, verify_data
+from .xlsx import FLUSH_BYTES, sheet_title, stream_workbook
+
+
+def make_user(username, is_admin=False, **extra):
+    """Create a user with a predictable email and password"""
+    return User.objects.create_user(
+        username=username,
+        email=f"{username}@test.com",
+        password='testpass123',
+        first_name=username.title(),
+        last_name='Test',
+        is_admin=is_admin,
+        **extra
+    )
+
+
+def make_project(name, owner, **extra):
+    """Create a project that is active for the whole test year"""
+    extra.setdefault('start_date', date(2024, 1, 1))
+    extra.setdefault('end_date', date(2030, 12, 31))
+    return Project.objects.create(name=name, owner=owner, **extra)
+
+
+class BulkAssignmentServiceTests(TestCase):
+    """Tests for ProjectAssignmentService.bulk_assign"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        cls.users = [make_user(f"user{i}") for i in range(5)]
+        cls.projects = [make_project(f"Project {i}", cls.admin) for i in range(4)]
+
+    def user_ids(self, users=None):
+        return [user.id for user in (users or self.users)]
+
+    def project_ids(self, projects=None):
+        return [project.id for project in (projects or self.projects)]
+
+    def test_assign_creates_full_matrix(self):
+        result = ProjectAssignmentService.bulk_assign(
+            self.user_ids(), self.project_ids(), self.admin, mode='assign', notes='Q1'
+        )
+        self.assertEqual(result['totals']['created'], 20)
+        self.assertEqual(ProjectAssignment.objects.filter(is_active=True).count(), 20)
+        first = result['projects'][0]
+        self.assertEqual(first['project_id'], self.projects[0].id)
+        self.assertEqual(first['project_name'], 'Project 0')
+        self.assertEqual([entry['user_id'] for entry in first['assigned']], self.user_ids())
+        self.assertEqual(first['already_assigned'], [])
+        self.assertEqual(first['errors'], [])
+
+    def test_assign_reactivates_and_reports_existing(self):
+        project = self.projects[0]
+        ProjectAssignment.objects.create(project=project, user=self.users[0], assigned_by=self.admin)
+        ProjectAssignment.objects.create(
+            project=project, user=self.users[1], assigned_by=self.admin, is_active=False
+        )
+        result = ProjectAssignmentService.bulk_assign(
+            self.user_ids(self.users[:3]), [project.id], self.admin
+        )
+        project_result = result['projects'][0]
+        self.assertEqual([entry['user_id'] for entry in project_result['already_assigned']], [self.users[0].id])
+        self.assertEqual(
+            [(entry['user_id'], entry.get('reactivated', False)) for entry in project_result['assigned']],
+            [(self.users[1].id, True), (self.users[2].id, False)]
+        )
+        self.assertTrue(ProjectAssignment.objects.get(project=project, user=self.users[1]).is_active)
+
+    def test_unassign_reports_not_assigned(self):
+        project = self.projects[0]
+        ProjectAssignment.objects.create(project=project, user=self.users[0], assigned_by=self.admin)
+        result = ProjectAssignmentService.bulk_assign(
+            self.user_ids(self.users[:2]), [project.id], self.admin, mode='unassign'
+        )
+        project_result = result['projects'][0]
+        self.assertEqual([entry['user_id'] for entry in project_result['unassigned']], [self.users[0].id])
+        self.assertEqual([entry['user_id'] for entry in project_result['not_assigned']], [self.users[1].id])
+        self.assertFalse(ProjectAssignment.objects.get(project=project, user=self.users[0]).is_active)
+
+    def test_replace_removes_users_outside_matrix(self):
+        ProjectAssignmentService.bulk_assign(self.user_ids(), self.project_ids(), self.admin)
+        result = ProjectAssignmentService.bulk_assign(
+            self.user_ids(self.users[:2]), self.project_ids(), self.admin, mode='replace'
+        )
+        self.assertEqual(result['totals']['deactivated'], 12)
+        active = set(ProjectAssignment.objects.filter(is_active=True).values_list('user_id', flat=True))
+        self.assertEqual(active, set(self.user_ids(self.users[:2])))
+
+    def test_query_count_does_not_grow_with_matrix(self):
+        with CaptureQueriesContext(connection) as small:
+            ProjectAssignmentService.bulk_assign(
+                self.user_ids(self.users[:1]), self.project_ids(self.projects[:1]), self.admin
+            )
+        ProjectAssignment.objects.all().delete()
+        with CaptureQueriesContext(connection) as large:
+            ProjectAssignmentService.bulk_assign(self.user_ids(), self.project_ids(), self.admin)
+        self.assertEqual(len(small), len(large))
+
+    def test_rejects_unknown_ids_and_non_admins(self):
+        with self.assertRaises(ValidationError):
+            ProjectAssignmentService.bulk_assign([999999], self.project_ids(), self.admin)
+        with self.assertRaises(ValidationError):
+            ProjectAssignmentService.bulk_assign(self.user_ids(), [999999], self.admin)
+        with self.assertRaises(PermissionDenied):
+            ProjectAssignmentService.bulk_assign(self.user_ids(), self.project_ids(), self.users[0])
+
+
+class BulkAssignmentViewTests(APITestCase):
+    """Tests for POST /api/assignments/bulk/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        cls.user = make_user('worker')
+        cls.project = make_project('Website', cls.admin)
+
+    def test_admin_can_bulk_assign(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(reverse('bulk-assignment'), {
+            'user_ids': [self.user.id],
+            'project_ids': [self.project.id],
+            'mode': 'assign'
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['success'])
+        self.assertEqual(response.data['data']['projects'][0]['assigned'][0]['user_id'], self.user.id)
+
+    def test_regular_user_is_forbidden(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.post(reverse('bulk-assignment'), {
+            'user_ids': [self.user.id],
+            'project_ids': [self.project.id]
+        }, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class UnassignAndDeactivateTests(TestCase):
+    """Tests for set-based unassignment and the user deactivation cascade"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        cls.users = [make_user(f"user{i}") for i in range(6)]
+        cls.projects = [make_project(f"Project {i}", cls.admin) for i in range(6)]
+
+    def assign(self, users, projects):
+        ProjectAssignmentService.bulk_assign(
+            [user.id for user in users], [project.id for project in projects], self.admin
+        )
+
+    def test_unassign_query_count_is_constant(self):
+        project = self.projects[0]
+        self.assign(self.users, [project])
+        with CaptureQueriesContext(connection) as one:
+            ProjectAssignmentService.unassign_users_from_project(project.id, [self.users[0].id], self.admin)
+        with CaptureQueriesContext(connection) as many:
+            result = ProjectAssignmentService.unassign_users_from_project(
+                project.id, [user.id for user in self.users[1:]], self.admin
+            )
+        self.assertEqual(len(one), len(many))
+        self.assertEqual(len(result['unassigned']), 5)
+        self.assertFalse(ProjectAssignment.objects.filter(project=project, is_active=True).exists())
+
+    def test_unassign_reports_users_without_assignment(self):
+        project = self.projects[0]
+        self.assign(self.users[:1], [project])
+        result = ProjectAssignmentService.unassign_users_from_project(
+            project.id, [self.users[0].id, self.users[1].id], self.admin
+        )
+        self.assertEqual([entry['user_id'] for entry in result['unassigned']], [self.users[0].id])
+        self.assertEqual([entry['user_id'] for entry in result['not_assigned']], [self.users[1].id])
+
+    def test_deactivate_cascades_with_constant_queries(self):
+        light, heavy = self.users[0], self.users[1]
+        self.assign([light], self.projects[:1])
+        self.assign([heavy], self.projects)
+        Token.objects.create(user=light)
+        Token.objects.create(user=heavy)
+
+        with CaptureQueriesContext(connection) as light_queries:
+            UserService.deactivate_user(light, deactivated_by=self.admin)
+        with CaptureQueriesContext(connection) as heavy_queries:
+            result = UserService.deactivate_user(heavy, deactivated_by=self.admin)
+
+        self.assertEqual(len(light_queries), len(heavy_queries))
+        self.assertEqual(result['assignments_deactivated'], len(self.projects))
+        self.assertEqual(result['tokens_revoked'], 1)
+        heavy.refresh_from_db()
+        self.assertFalse(heavy.is_active)
+        self.assertFalse(ProjectAssignment.objects.filter(user=heavy, is_active=True).exists())
+        self.assertFalse(Token.objects.filter(user=heavy).exists())
+
+
+class UserDetailViewTests(APITestCase):
+    """Tests for DELETE /api/users/<pk>/"""
+
+    def test_delete_deactivates_user_and_assignments(self):
+        admin = make_user('admin', is_admin=True)
+        user = make_user('worker')
+        project = make_project('Website', admin)
+        ProjectAssignment.objects.create(project=project, user=user, assigned_by=admin)
+        self.client.force_authenticate(admin)
+
+        response = self.client.delete(reverse('user-detail', args=[user.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['message'], 'User deactivated successfully')
+        self.assertFalse(User.objects.get(id=user.id).is_active)
+        self.assertFalse(ProjectAssignment.objects.get(user=user).is_active)
+
+
+class EmailBackendTests(TestCase):
+    """Tests for core.auth.EmailBackend"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('alice')
+
+    def setUp(self):
+        patcher = mock.patch.object(PBKDF2PasswordHasher, 'encode', autospec=True,
+                                    side_effect=PBKDF2PasswordHasher.encode)
+        self.encode = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def authenticate(self, username, password='testpass123'):
+        with CaptureQueriesContext(connection) as queries:
+            user = authenticate(None, username=username, password=password)
+        return user, len(queries)
+
+    def test_login_by_email_is_case_insensitive(self):
+        user, queries = self.authenticate('ALICE@test.com')
+        self.assertEqual(user, self.user)
+        self.assertEqual(queries, 1)
+        self.assertEqual(self.encode.call_count, 1)
+
+    def test_login_by_username(self):
+        user, queries = self.authenticate('alice')
+        self.assertEqual(user, self.user)
+        self.assertEqual(queries, 1)
+
+    def test_miss_runs_exactly_one_hash(self):
+        user, queries = self.authenticate('nobody@test.com')
+        self.assertIsNone(user)
+        self.assertEqual(queries, 1)
+        self.assertEqual(self.encode.call_count, 1)
+
+    def test_wrong_password_runs_exactly_one_hash(self):
+        user, _ = self.authenticate('alice@test.com', password='wrong')
+        self.assertIsNone(user)
+        self.assertEqual(self.encode.call_count, 1)
+
+    def test_inactive_user_cannot_log_in(self):
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        user, _ = self.authenticate('alice@test.com')
+        self.assertIsNone(user)
+
+    def test_email_uniqueness_is_case_insensitive(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.create_user(username='alice2', email='Alice@Test.com', password='x')
+
+
+@override_settings(LOGIN_THROTTLE={'ACCOUNT_FAILURES': 3, 'IP_FAILURES': 10, 'WINDOW': 600, 'CACHE': 'throttle'})
+class LoginThrottleTests(APITestCase):
+    """Tests for LoginFailureThrottle on POST /api/login/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user('alice')
+
+    def setUp(self):
+        caches['throttle'].clear()
+        self.addCleanup(caches['throttle'].clear)
+
+    def login(self, email='alice@test.com', password='wrong', ip='10.0.0.1', **extra):
+        return self.client.post(
+            reverse('login'), {'email': email, 'password': password}, format='json', REMOTE_ADDR=ip, **extra
+        )
+
+    def test_account_is_throttled_after_failures(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 400)
+        response = self.login(password='testpass123')
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_ip_is_throttled_across_accounts(self):
+        for i in range(10):
+            self.assertEqual(self.login(email=f"user{i}@test.com").status_code, 400)
+        self.assertEqual(self.login(email='someone-else@test.com').status_code, 429)
+        self.assertEqual(self.login(ip='10.0.0.2', password='testpass123').status_code, 200)
+
+    def test_success_resets_account_counter(self):
+        for _ in range(2):
+            self.login()
+        self.assertEqual(self.login(password='testpass123').status_code, 200)
+        for _ in range(2):
+            self.assertEqual(self.login().status_code, 400)
+
+    def test_throttled_attempts_do_no_user_lookup_or_hash_work(self):
+        for _ in range(3):
+            self.login()
+        with mock.patch.object(PBKDF2PasswordHasher, 'encode') as encode:
+            for _ in range(50):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.login()
+                self.assertEqual(response.status_code, 429)
+                # Only the counters' read from the shared cache table
+                self.assertEqual(len(queries), 1)
+                self.assertIn(settings.CACHES['throttle']['LOCATION'], queries[0]['sql'])
+            encode.assert_not_called()
+
+    def test_counters_are_shared_between_processes(self):
+        for _ in range(3):
+            self.login()
+        # Another worker has its own cache objects but reads the same table
+        from django.core.cache.backends.db import DatabaseCache
+        other_worker = DatabaseCache(settings.CACHES['throttle']['LOCATION'], {})
+        with mock.patch('core.throttling.caches', {'throttle': other_worker}):
+            self.assertEqual(self.login().status_code, 429)
+
+    def test_forwarded_for_header_is_not_trusted_without_proxies(self):
+        for i in range(10):
+            response = self.login(email=f"user{i}@test.com", HTTP_X_FORWARDED_FOR=f"203.0.113.{i}")
+            self.assertEqual(response.status_code, 400)
+        response = self.login(email='someone-else@test.com', HTTP_X_FORWARDED_FOR='198.51.100.1')
+        self.assertEqual(response.status_code, 429)
+
+
+HOT_TABLES = ('core_hourentry', 'core_projectassignment')
+
+# Plan lines that read a hot table without an index
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on "?(%s)"?' % '|'.join(HOT_TABLES)),
+    'sqlite': re.compile(r'^SCAN "?(%s)"?(?! USING)' % '|'.join(HOT_TABLES)),
+}
+
+
+def seed_dataset(admin, users=6, projects=8, days=120, start=date(2025, 1, 1)):
+    """Seed users, projects, assignments and hour entries with bulk inserts"""
+    members = [make_user(f"member{i}") for i in range(users)]
+    project_list = [make_project(f"Seed project {i}", admin) for i in range(projects)]
+    ProjectAssignment.objects.bulk_create([
+        ProjectAssignment(project=project, user=member, assigned_by=admin, is_active=(i + j) % 5 != 0)
+        for i, member in enumerate(members)
+        for j, project in enumerate(project_list)
+        if (i + j) % 2 == 0
+    ])
+    HourEntry.objects.bulk_create([
+        HourEntry(
+            user=member,
+            project=project_list[(i + day) % projects],
+            date=start + timedelta(days=day),
+            hours=Decimal('7.50')
+        )
+        for i, member in enumerate(members)
+        for day in range(days)
+        if (start + timedelta(days=day)).weekday() < 5
+    ])
+    return members, project_list
+
+
+class QueryPlanTests(APITestCase):
+    """
+    Run EXPLAIN on every query each endpoint issues against the hot tables and
+    fail on sequential scans. On PostgreSQL sequential scans are disabled while
+    explaining, so a Seq Scan in the plan means no usable index exists.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        cls.members, cls.projects = seed_dataset(cls.admin)
+        cls.member = cls.members[0]
+        cls.project = ProjectAssignment.objects.filter(user=cls.member, is_active=True).first().project
+
+    def capture_queries(self, url):
+        captured = []
+
+        def wrapper(execute, sql, params, many, context):
+            captured.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(wrapper):
+            response = self.client.get(url)
+        self.assertLess(response.status_code, 300, f"{url} returned {response.status_code}")
+        return [
+            (sql, params) for sql, params in captured
+            if sql.lstrip().upper().startswith('SELECT') and any(table in sql for table in HOT_TABLES)
+        ]
+
+    def explain(self, sql, params):
+        vendor = connection.vendor
+        with connection.cursor() as cursor:
+            if vendor == 'postgresql':
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            rows = cursor.fetchall()
+        return [str(row[-1]) if vendor == 'sqlite' else str(row[0]) for row in rows]
+
+    def assertNoSeqScans(self, user, url):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            self.skipTest(f"No plan checks for {connection.vendor}")
+        self.client.force_authenticate(user)
+        for sql, params in self.capture_queries(url):
+            plan = self.explain(sql, params)
+            scans = [line for line in plan if pattern.search(line.strip())]
+            self.assertFalse(scans, f"Sequential scan for {url}:\n{sql}\n" + "\n".join(plan))
+
+    def test_admin_endpoints(self):
+        member, project = self.member, self.project
+        for url in [
+            '/api/hours/?start_date=2025-02-01&end_date=2025-02-28',
+            f'/api/hours/?user={member.id}&start_date=2025-02-01&end_date=2025-02-28',
+            f'/api/hours/?project={project.id}&start_date=2025-02-01',
+            '/api/hours/?date=2025-02-03',
+            '/api/time/daily/?date=2025-02-03',
+            '/api/time/weekly/?week=2025-02-03',
+            '/api/time/monthly/?month=2025-02',
+            f'/api/time/monthly/?month=2025-02&user={member.id}',
+            f'/api/projects/{project.id}/time-report/?start_date=2025-02-01&end_date=2025-02-28',
+            f'/api/projects/{project.id}/assignments/',
+            f'/api/users/{member.id}/projects/',
+        ]:
+            with self.subTest(url=url):
+                self.assertNoSeqScans(self.admin, url)
+
+    def test_member_endpoints(self):
+        project = self.project
+        for url in [
+            '/api/projects/',
+            '/api/hours/?start_date=2025-02-01&end_date=2025-02-28',
+            f'/api/hours/?project={project.id}',
+            '/api/time/daily/?date=2025-02-03',
+            '/api/time/weekly/?week=2025-02-03',
+            '/api/time/monthly/?month=2025-02',
+            f'/api/projects/{project.id}/time-report/',
+            f'/api/users/{self.member.id}/projects/',
+        ]:
+            with self.subTest(url=url):
+                self.assertNoSeqScans(self.member, url)
+
+
+class PartitioningTests(TestCase):
+    """Tests for the partition helpers and hour_partitions command"""
+
+    def test_month_helpers(self):
+        self.assertEqual(add_months(date(2024, 11, 15), 2), date(2025, 1, 1))
+        self.assertEqual(add_months(date(2025, 1, 31), -1), date(2024, 12, 1))
+        self.assertEqual(
+            month_range(date(2024, 12, 10), date(2025, 2, 1)),
+            [date(2024, 12, 1), date(2025, 1, 1), date(2025, 2, 1)]
+        )
+        self.assertEqual(partition_name(date(2025, 3, 1)), 'core_hourentry_p202503')
+
+    def test_command_requires_postgresql(self):
+        if connection.vendor == 'postgresql':
+            self.skipTest('Only meaningful on non-PostgreSQL backends')
+        with self.assertRaisesMessage(CommandError, 'requires PostgreSQL'):
+            call_command('hour_partitions', 'status')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Partitioning requires PostgreSQL')
+class PostgreSQLPartitioningTests(TestCase):
+    """convert, create and detach on the real table (each test's DDL is rolled back)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        cls.project = make_project('Website', cls.admin)
+        cls.entries = [
+            HourEntry.objects.create(user=cls.admin, project=cls.project, date=day, hours=Decimal('2.00'))
+            for day in (date(2025, 1, 6), date(2025, 2, 3), date(2025, 3, 3))
+        ]
+
+    def setUp(self):
+        # Deferred foreign key checks leave trigger events pending in the test
+        # transaction, and PostgreSQL refuses ALTER TABLE while any are pending
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        self.addCleanup(self.defer_constraints)
+
+    def defer_constraints(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL DEFERRED')
+
+    def convert(self):
+        out = io.StringIO()
+        call_command('hour_partitions', 'convert', '--months-ahead', '1', stdout=out)
+        return out.getvalue()
+
+    def partition_of(self, entry_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT tableoid::regclass::text FROM {HourEntry._meta.db_table} WHERE id = %s", [entry_id])
+            return cursor.fetchone()[0]
+
+    def table_exists(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT to_regclass(%s)", [name])
+            return cursor.fetchone()[0] is not None
+
+    def test_convert_moves_rows_into_monthly_partitions(self):
+        self.assertIn('3 rows', self.convert())
+        self.assertTrue(is_partitioned())
+        for entry in self.entries:
+            self.assertEqual(self.partition_of(entry.id), partition_name(entry.date))
+        self.assertEqual(
+            list(HourEntry.objects.order_by('id').values_list('id', 'date', 'hours')),
+            [(entry.id, entry.date, entry.hours) for entry in self.entries]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT contype, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u')", [HourEntry._meta.db_table]
+            )
+            constraints = dict(cursor.fetchall())
+        self.assertEqual(constraints['p'], 'PRIMARY KEY (id, date)')
+        self.assertEqual(constraints['u'], 'UNIQUE (user_id, project_id, date)')
+        with self.assertRaisesMessage(CommandError, 'already partitioned'):
+            self.convert()
+
+    def test_orm_and_unique_together_after_convert(self):
+        self.convert()
+        entry = HourEntry.objects.create(user=self.admin, project=self.project, date=date(2025, 1, 7),
+                                         hours=Decimal('1.00'))
+        self.assertGreater(entry.id, max(existing.id for existing in self.entries))
+        self.assertEqual(self.partition_of(entry.id), partition_name(date(2025, 1, 1)))
+
+        duplicate = HourEntry(user=self.admin, project=self.project, date=date(2025, 1, 6), hours=Decimal('1.00'))
+        with self.assertRaises(ValidationError):
+            duplicate.validate_unique()
+        with transaction.atomic(), self.assertRaises(IntegrityError):
+            duplicate.save()
+
+        # Changing the date moves the row to the partition of its new month
+        entry.date = date(2025, 2, 10)
+        entry.hours = Decimal('3.00')
+        entry.save()
+        self.assertEqual(self.partition_of(entry.id), partition_name(date(2025, 2, 1)))
+        self.assertEqual(HourEntry.objects.get(pk=entry.pk).hours, Decimal('3.00'))
+        entry.delete()
+        self.assertFalse(HourEntry.objects.filter(pk=entry.pk).exists())
+        self.assertEqual(HourEntry.objects.count(), len(self.entries))
+
+    def test_create_then_detach_partitions(self):
+        self.convert()
+        future = add_months(month_start(date.today()), 6)
+        self.assertEqual(create_partitions([future]), [partition_name(future)])
+        self.assertEqual(create_partitions([future]), [])
+        entry = HourEntry.objects.create(user=self.admin, project=self.project, date=future, hours=Decimal('1.00'))
+        self.assertEqual(self.partition_of(entry.id), partition_name(future))
+
+        january, february = partition_name(date(2025, 1, 1)), partition_name(date(2025, 2, 1))
+        self.assertEqual(detach_partitions(date(2025, 2, 1)), [january])
+        self.assertFalse(HourEntry.objects.filter(pk=self.entries[0].pk).exists())
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT id FROM {january}")
+            self.assertEqual(cursor.fetchall(), [(self.entries[0].id,)])
+
+        self.assertEqual(detach_partitions(date(2025, 3, 1), drop=True), [february])
+        self.assertFalse(self.table_exists(february))
+        self.assertTrue(HourEntry.objects.filter(pk=self.entries[2].pk).exists())
+
+
+class ProjectStatusTests(APITestCase):
+    """Tests for DB-side project status and GET /api/projects/?status="""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        today = date.today()
+        cls.by_status = {
+            'active': make_project('Active', cls.admin, start_date=today - timedelta(days=5),
+                                   end_date=today + timedelta(days=5)),
+            'not_started': make_project('Future', cls.admin, start_date=today + timedelta(days=1),
+                                        end_date=today + timedelta(days=30)),
+            'inactive': make_project('Past', cls.admin, start_date=today - timedelta(days=30),
+                                     end_date=today - timedelta(days=1)),
+            'no_dates': make_project('Undated', cls.admin, start_date=None, end_date=None),
+        }
+
+    def test_annotation_matches_python_status(self):
+        for project in Project.objects.with_status():
+            fresh = Project.objects.get(pk=project.pk)
+            self.assertEqual(project.annotated_status, fresh.status)
+            self.assertEqual(project.is_active, fresh.is_active)
+
+    def test_status_filter(self):
+        self.client.force_authenticate(self.admin)
+        for status_name, project in self.by_status.items():
+            with self.subTest(status=status_name):
+                response = self.client.get('/api/projects/', {'status': status_name})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual([item['id'] for item in response.data], [project.id])
+                self.assertEqual(response.data[0]['status'], status_name)
+
+    def test_invalid_status_is_rejected(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/projects/', {'status': 'archived'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ArchiveHoursTests(APITestCase):
+    """Tests for the archive_hours command and summary read-through"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        cls.members, cls.projects = seed_dataset(cls.admin, users=3, projects=3, days=90)
+        cls.member = cls.members[0]
+
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        override = override_settings(HOUR_ARCHIVE_DIR=archive_dir.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def snapshot(self, user):
+        self.client.force_authenticate(user)
+        project = ProjectAssignment.objects.filter(user=self.member, is_active=True).first().project
+        responses = [
+            self.client.get('/api/time/daily/', {'date': '2025-01-06'}),
+            self.client.get('/api/time/weekly/', {'week': '2025-01-27'}),
+            self.client.get('/api/time/monthly/', {'month': '2025-01'}),
+            self.client.get('/api/time/monthly/', {'month': '2025-02'}),
+            self.client.get(f'/api/projects/{project.id}/time-report/',
+                            {'start_date': '2025-01-01', 'end_date': '2025-03-31'}),
+        ]
+        data = []
+        for response in responses:
+            self.assertEqual(response.status_code, 200, response.data)
+            payload = dict(response.data['data'])
+            payload.pop('recent_entries', None)
+            data.append(payload)
+        return data
+
+    def test_archive_moves_rows_and_reports_are_unchanged(self):
+        before_admin = self.snapshot(self.admin)
+        before_member = self.snapshot(self.member)
+        january = HourEntry.objects.filter(date__lt=date(2025, 2, 1)).count()
+
+        call_command('archive_hours', '--before=2025-02-01', stdout=open(os.devnull, 'w'))
+
+        self.assertFalse(HourEntry.objects.filter(date__lt=date(2025, 2, 1)).exists())
+        archive = HourArchive.objects.get()
+        self.assertEqual(archive.entry_count, january)
+        self.assertEqual(ArchivedHourTotal.objects.count(), january)
+        with gzip.open(archive.file_path, 'rt') as archive_file:
+            self.assertEqual(sum(1 for _ in archive_file), january)
+
+        self.assertEqual(self.snapshot(self.admin), before_admin)
+        self.assertEqual(self.snapshot(self.member), before_member)
+
+    def test_late_entries_are_merged_on_rearchive(self):
+        call_command('archive_hours', '--before=2025-02-01', stdout=open(os.devnull, 'w'))
+        total = ArchivedHourTotal.objects.filter(user=self.member).first()
+        HourEntry.objects.create(user=self.member, project=total.project, date=total.date, hours=Decimal('1.00'))
+
+        call_command('archive_hours', '--before=2025-02-01', stdout=open(os.devnull, 'w'))
+
+        merged = ArchivedHourTotal.objects.get(pk=total.pk)
+        self.assertEqual(merged.hours, total.hours + Decimal('1.00'))
+        self.assertEqual(merged.entry_count, 2)
+        self.assertEqual(HourArchive.objects.count(), 2)
+        self.assertEqual(len({archive.file_path for archive in HourArchive.objects.all()}), 2)
+
+    def test_rejects_open_periods(self):
+        with self.assertRaises(CommandError):
+            call_command('archive_hours', '--before=2025-02-15')
+        with self.assertRaises(CommandError):
+            call_command('archive_hours', f'--before={add_months(date.today(), 1)}')
+
+
+class ReportRenderTests(APITestCase):
+    """Tests for GET /api/reports/render/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        cls.members, cls.projects = seed_dataset(cls.admin, users=3, projects=3, days=30)
+        cls.member = cls.members[0]
+        cls.project = ProjectAssignment.objects.filter(user=cls.member, is_active=True).first().project
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def render(self, viewer, **params):
+        self.client.force_authenticate(viewer)
+        return self.client.get(reverse('report-render'), params)
+
+    def test_project_report_html_contains_entries_and_total(self):
+        response = self.render(self.admin, type='project', project=self.project.id, format='html',
+                               start_date='2025-01-01', end_date='2025-01-31')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/html; charset=utf-8')
+        total = HourEntry.objects.filter(
+            project=self.project, date__range=[date(2025, 1, 1), date(2025, 1, 31)]
+        ).aggregate(total=models.Sum('hours'))['total']
+        self.assertIn(f"TOTAL HOURS: {total:.2f}", response.content.decode())
+
+    @skipUnless(find_spec('reportlab'), 'reportlab is not installed')
+    def test_pdf_report(self):
+        response = self.render(self.admin, type='team', format='pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content.startswith(b'%PDF'))
+
+    @skipUnless(find_spec('reportlab'), 'reportlab is not installed')
+    def test_pdf_report_escapes_markup(self):
+        # Each of these is a reportlab markup error on its own
+        project = make_project('R&D <b>team', self.admin, client='Acme & <b>Co')
+        ProjectAssignment.objects.create(project=project, user=self.member, assigned_by=self.admin)
+        HourEntry.objects.create(user=self.member, project=project, date=date(2025, 1, 6),
+                                 hours=Decimal('1.00'), note='x <y')
+        for params in [dict(type='project', project=project.id), dict(type='user', user=self.member.id),
+                       dict(type='team')]:
+            response = self.render(self.admin, format='pdf', **params)
+            self.assertEqual(response.status_code, 200, params)
+            self.assertTrue(response.content.startswith(b'%PDF'))
+
+    def test_repeat_downloads_are_served_from_cache(self):
+        params = dict(type='user', user=self.member.id, format='html')
+        first = self.render(self.admin, **params)
+        with mock.patch('core.reports.build_report_data') as build:
+            second = self.render(self.admin, **params)
+            build.assert_not_called()
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first['ETag'], second['ETag'])
+
+        not_modified = self.client.get(reverse('report-render'), params, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_data_change_invalidates_artifact(self):
+        params = dict(type='user', user=self.member.id, format='html')
+        first = self.render(self.admin, **params)
+        entry = HourEntry.objects.filter(user=self.member).first()
+        entry.note = 'Updated note'
+        entry.save()
+        second = self.render(self.admin, **params)
+        self.assertNotEqual(first['ETag'], second['ETag'])
+        self.assertIn('Updated note', second.content.decode())
+
+    def test_permissions(self):
+        other = self.members[1]
+        self.assertEqual(self.render(self.member, type='team', format='html').status_code, 403)
+        self.assertEqual(self.render(self.member, type='user', user=other.id, format='html').status_code, 403)
+        self.assertEqual(self.render(self.member, type='user', format='html').status_code, 200)
+
+    def test_invalid_params(self):
+        self.assertEqual(self.render(self.admin, type='weekly').status_code, 400)
+        self.assertEqual(self.render(self.admin, type='team', format='docx').status_code, 400)
+        self.assertEqual(self.render(self.admin, type='project', format='html').status_code, 400)
+
+
+XLSX_NS = {'x': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+
+
+def read_xlsx(content):
+    """{sheet name: [row values]} for a workbook written by core.xlsx"""
+    with zipfile.ZipFile(io.BytesIO(content)) as archive:
+        workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+        names = [sheet.get('name') for sheet in workbook.iterfind('x:sheets/x:sheet', XLSX_NS)]
+        sheets = {}
+        for index, name in enumerate(names, start=1):
+            root = ElementTree.fromstring(archive.read(f'xl/worksheets/sheet{index}.xml'))
+            sheets[name] = [
+                [''.join(cell.itertext()) for cell in row.iterfind('x:c', XLSX_NS)]
+                for row in root.iterfind('x:sheetData/x:row', XLSX_NS)
+            ]
+        return sheets
+
+
+class HourEntryExportTests(APITestCase):
+    """Tests for GET /api/hours/export/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        cls.members, cls.projects = seed_dataset(cls.admin, users=2, projects=3, days=20)
+        cls.member = cls.members[0]
+
+    def export(self, viewer, **params):
+        self.client.force_authenticate(viewer)
+        response = self.client.get(reverse('hour-entry-export'), params)
+        if response.status_code == 200:
+            self.assertTrue(response.streaming)
+            response.content_bytes = b''.join(response.streaming_content)
+        return response
+
+    def test_admin_export_contains_every_entry(self):
+        response = self.export(self.admin, format='xlsx')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'],
+                         'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        rows = read_xlsx(response.content_bytes)['Hours']
+        self.assertEqual(rows[0], ['Date', 'User', 'Email', 'Project', 'Client', 'Hours', 'Notes'])
+        self.assertEqual(len(rows) - 1, HourEntry.objects.count())
+        # Dates are Excel serials: 45658 is 2025-01-01
+        self.assertEqual(rows[1][0], '45658')
+
+    def test_member_export_is_limited_to_own_entries_and_filters(self):
+        response = self.export(self.member, start_date='2025-01-01', end_date='2025-01-10')
+        rows = read_xlsx(response.content_bytes)['Hours'][1:]
+        expected = HourEntry.objects.filter(
+            user=self.member, date__range=[date(2025, 1, 1), date(2025, 1, 10)]
+        ).count()
+        self.assertEqual(len(rows), expected)
+        self.assertTrue(all(row[2] == self.member.email for row in rows))
+
+    def test_per_project_sheets(self):
+        response = self.export(self.admin, sheets='project')
+        sheets = read_xlsx(response.content_bytes)
+        self.assertEqual(list(sheets), sorted(project.name for project in self.projects))
+        for project in self.projects:
+            rows = sheets[project.name][1:]
+            self.assertEqual(len(rows), HourEntry.objects.filter(project=project).count())
+            self.assertTrue(all(row[3] == project.name for row in rows))
+
+    def test_workbook_is_streamed_in_bounded_chunks(self):
+        consumed = []
+
+        def rows():
+            for i in range(20000):
+                consumed.append(i)
+                yield (date(2025, 1, 1), f"user{i}", Decimal('7.50'), f"note {i * 7919}")
+
+        stream = stream_workbook([('Hours', ['Date', 'User', 'Hours', 'Notes'], rows())])
+        first = next(stream)
+        self.assertTrue(first)
+        self.assertEqual(consumed, [])
+        chunks = [first] + list(stream)
+        self.assertGreater(len(chunks), 5)
+        self.assertLess(max(len(chunk) for chunk in chunks), 2 * FLUSH_BYTES)
+        self.assertEqual(len(read_xlsx(b''.join(chunks))['Hours']), 20001)
+
+    def test_full_sheets_continue_on_new_sheets(self):
+        header = ['Date', 'Hours']
+        rows = [(date(2025, 1, day), Decimal(day)) for day in range(1, 11)]
+        with mock.patch('core.xlsx.MAX_SHEET_ROWS', 5):
+            sheets = read_xlsx(b''.join(stream_workbook([('Hours', header, iter(rows))])))
+            exact = read_xlsx(b''.join(stream_workbook([('Hours', header, rows[:8]), ('Empty', header, [])])))
+        self.assertEqual(list(sheets), ['Hours', 'Hours (2)', 'Hours (3)'])
+        self.assertEqual([len(sheet) for sheet in sheets.values()], [5, 5, 3])
+        self.assertTrue(all(sheet[0] == header for sheet in sheets.values()))
+        self.assertEqual([row[1] for sheet in sheets.values() for row in sheet[1:]],
+                         [str(day) for day in range(1, 11)])
+        self.assertEqual([len(sheet) for sheet in exact.values()], [5, 5, 1])
+        self.assertEqual(list(exact), ['Hours', 'Hours (2)', 'Empty'])
+
+    def test_invalid_params(self):
+        self.assertEqual(self.export(self.admin, format='csv').status_code, 400)
+        self.assertEqual(self.export(self.admin, sheets='user').status_code, 400)
+
+    def test_sheet_titles_are_sanitised_and_unique(self):
+        used = set()
+        self.assertEqual(sheet_title('Client: Q1/Q2', used), 'Client  Q1 Q2')
+        self.assertEqual(sheet_title('client  q1 q2', used), 'client  q1 q2 (2)')
+        self.assertEqual(len(sheet_title('x' * 40, used)), 31)
+
+
+@skipUnless(find_spec('pyarrow'), 'pyarrow is not installed')
+class AnalyticsExportTests(APITestCase):
+    """Tests for the export_analytics command and /api/analytics/export/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        cls.members, cls.projects = seed_dataset(cls.admin, users=2, projects=3, days=75)
+
+    def setUp(self):
+        export_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(export_dir.cleanup)
+        self.export_dir = export_dir.name
+        override = override_settings(ANALYTICS_EXPORT_DIR=self.export_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def read_dataset(self):
+        import pyarrow.parquet as pq
+        return pq.read_table(os.path.join(self.export_dir, 'hour_entries'))
+
+    def test_full_export_is_partitioned_by_month_with_dimensions(self):
+        call_command('export_analytics', stdout=open(os.devnull, 'w'))
+        table = self.read_dataset()
+        self.assertEqual(table.num_rows, HourEntry.objects.count())
+        self.assertEqual(sorted(os.listdir(os.path.join(self.export_dir, 'hour_entries'))),
+                         ['month=2025-01', 'month=2025-02', 'month=2025-03'])
+        row = table.to_pylist()[0]
+        entry = HourEntry.objects.select_related('user', 'project').get(id=row['entry_id'])
+        self.assertEqual(row['date'], entry.date)
+        self.assertEqual(row['username'], entry.user.username)
+        self.assertEqual(row['project_name'], entry.project.name)
+        self.assertEqual(row['hours'], entry.hours)
+
+    def test_incremental_export_rewrites_only_changed_months(self):
+        from .analytics import export_analytics
+        first = export_analytics(self.export_dir)
+        self.assertEqual(len(first['exported']), 3)
+
+        self.assertEqual(export_analytics(self.export_dir)['exported'], [])
+
+        entry = HourEntry.objects.filter(date__month=2).first()
+        entry.hours = Decimal('3.25')
+        entry.save()
+        HourEntry.objects.filter(date__month=3).delete()
+        result = export_analytics(self.export_dir)
+        self.assertEqual(result['exported'], ['2025-02'])
+        self.assertEqual(result['removed'], ['2025-03'])
+        self.assertEqual(self.read_dataset().num_rows, HourEntry.objects.count())
+
+    def test_archived_months_are_kept(self):
+        from .analytics import export_analytics, load_manifest
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        export_analytics(self.export_dir)
+        january = HourEntry.objects.filter(date__month=1).count()
+        with override_settings(HOUR_ARCHIVE_DIR=archive_dir.name):
+            call_command('archive_hours', '--before=2025-02-01', stdout=open(os.devnull, 'w'))
+        self.assertFalse(HourEntry.objects.filter(date__month=1).exists())
+
+        result = export_analytics(self.export_dir)
+        self.assertEqual(result['removed'], [])
+        self.assertEqual(self.read_dataset().num_rows, january + HourEntry.objects.count())
+        self.assertIn('2025-01', load_manifest(self.export_dir)['months'])
+
+    def test_endpoint_runs_export_and_serves_months(self):
+        self.client.force_authenticate(self.members[0])
+        self.assertEqual(self.client.post(reverse('analytics-export')).status_code, 403)
+
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(reverse('analytics-export'), {'full': True}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['rows'], HourEntry.objects.count())
+
+        manifest = self.client.get(reverse('analytics-export')).data['data']
+        self.assertEqual(sorted(manifest['months']), ['2025-01', '2025-02', '2025-03'])
+        download = self.client.get(reverse('analytics-export'), {'month': '2025-01'})
+        self.assertEqual(download.status_code, 200)
+        self.assertTrue(b''.join(download.streaming_content).startswith(b'PAR1'))
+        self.assertEqual(self.client.get(reverse('analytics-export'), {'month': '2024-12'}).status_code, 404)
+
+
+class BackupTests(TestCase):
+    """Tests for the backup command and incremental backup chains"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        seed_dataset(cls.admin, users=3, projects=3, days=30)
+        # Seeded rows look old, so later saves are past the watermark
+        HourEntry.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+    def setUp(self):
+        backup_root = tempfile.TemporaryDirectory()
+        self.addCleanup(backup_root.cleanup)
+        self.root = backup_root.name
+
+    def replay(self, table_name, name=None):
+        chain = resolve_chain(self.root, name)
+        return {
+            row['id']: row
+            for _, rows in iter_table_chunks(self.root, chain, table_name)
+            for row in rows
+        }
+
+    def database_rows(self, model):
+        fields = model_fields(model)
+        return {
+            values[0]: dict(zip(fields, json.loads(encode_row(values))))
+            for values in model.objects.order_by('id').values_list(*fields)
+        }
+
+    def test_backup_streams_every_table_in_chunks_without_counting(self):
+        with CaptureQueriesContext(connection) as queries:
+            manifest = create_backup(self.root, chunk_size=25)
+        self.assertFalse([q['sql'] for q in queries.captured_queries if 'COUNT(' in q['sql'].upper()])
+
+        entries = manifest['tables']['hour_entries']
+        self.assertEqual(entries['rows'], HourEntry.objects.count())
+        self.assertEqual(len(entries['chunks']), -(-entries['rows'] // 25))
+        self.assertEqual(self.replay('hour_entries'), self.database_rows(HourEntry))
+        self.assertEqual(self.replay('users'), self.database_rows(User))
+        self.assertEqual(resolve_chain(self.root), [manifest])
+
+    def test_unchanged_chunks_are_not_stored_again(self):
+        first = create_backup(self.root, name='backup_1', chunk_size=25)
+        second = create_backup(self.root, name='backup_2', chunk_size=25)
+        for name, table in first['tables'].items():
+            self.assertEqual(table['sha256'], second['tables'][name]['sha256'])
+            self.assertEqual(second['tables'][name]['chunks_stored'], 0)
+
+    @mock.patch('core.backup.WATERMARK_OVERLAP', timedelta(0))
+    def test_incremental_backup_stores_changes_and_replays_chain(self):
+        create_backup(self.root, name='backup_1', chunk_size=25)
+
+        edited = HourEntry.objects.order_by('id')[5]
+        edited.note = 'Edited after the full backup'
+        edited.save()
+        HourEntry.objects.order_by('id')[10].delete()
+        incremental = create_backup(self.root, name='backup_2', incremental=True, chunk_size=25)
+
+        entries = incremental['tables']['hour_entries']
+        self.assertEqual(incremental['parent'], 'backup_1')
+        self.assertEqual(entries['mode'], 'changes')
+        self.assertEqual(entries['rows'], 1)
+        self.assertEqual(entries['live_rows'], HourEntry.objects.count())
+
+        project = Project.objects.first()
+        HourEntry.objects.create(user=self.admin, project=project, date=date(2025, 6, 2), hours=Decimal('1.00'))
+        third = create_backup(self.root, name='backup_3', incremental=True, chunk_size=25)
+        self.assertEqual(third['tables']['hour_entries']['rows'], 1)
+
+        self.assertEqual(self.replay('hour_entries'), self.database_rows(HourEntry))
+        self.assertEqual(self.replay('hour_entries', 'backup_2')[edited.id]['note'], 'Edited after the full backup')
+        self.assertEqual(len(resolve_chain(self.root)), 3)
+
+    def test_corrupted_chunk_is_detected(self):
+        manifest = create_backup(self.root)
+        chunk = manifest['tables']['hour_entries']['chunks'][0]
+        with gzip.open(chunk_path(self.root, chunk['sha256']), 'wb') as chunk_file:
+            chunk_file.write(b'[]\n')
+        with self.assertRaises(BackupError):
+            read_chunk(self.root, chunk)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command('backup', '--output-dir', self.root, '--incremental', '--chunk-size', '50', stdout=out)
+        (name,) = list_manifests(self.root)
+        self.assertTrue(re.match(r'^backup_\d{8}_\d{6}$', name))
+        # Without a parent an incremental run takes a full backup
+        self.assertIn('Full backup', out.getvalue())
+
+
+class RestoreTests(TestCase):
+    """Tests for the restore command"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        seed_dataset(cls.admin, users=3, projects=3, days=30)
+        HourEntry.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+    def setUp(self):
+        backup_root = tempfile.TemporaryDirectory()
+        self.addCleanup(backup_root.cleanup)
+        self.root = backup_root.name
+
+    def snapshot(self):
+        return {
+            name: list(model.objects.order_by('pk').values_list(*model_fields(model)))
+            for name, model in BACKUP_MODELS
+        }
+
+    def wipe(self):
+        for _, model in reversed(BACKUP_MODELS):
+            model.objects.all().delete()
+
+    @mock.patch('core.backup.WATERMARK_OVERLAP', timedelta(0))
+    def test_restore_replays_full_backup_and_increments(self):
+        create_backup(self.root, name='backup_1', chunk_size=40)
+        entry = HourEntry.objects.order_by('id')[3]
+        entry.hours = Decimal('2.25')
+        entry.save()
+        HourEntry.objects.order_by('id')[7].delete()
+        create_backup(self.root, name='backup_2', incremental=True, chunk_size=40)
+        expected = self.snapshot()
+
+        self.wipe()
+        with CaptureQueriesContext(connection) as queries:
+            restored = restore_backup(self.root)
+        self.assertEqual(self.snapshot(), expected)
+        self.assertEqual(restored['hour_entries'], len(expected['hour_entries']))
+        self.assertFalse(LoadCheckpoint.objects.exists())
+        # Rows are loaded in batches, not one INSERT per row
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "core_hourentry"')]
+        self.assertLess(len(inserts), len(expected['hour_entries']) / 10)
+
+        # Sequences continue after the restored keys
+        new_entry = HourEntry.objects.create(
+            user=self.admin, project=Project.objects.first(), date=date(2025, 6, 2), hours=Decimal('1.00')
+        )
+        self.assertGreater(new_entry.id, max(row[0] for row in expected['hour_entries']))
+
+    def test_backup_from_before_updated_at_is_restored(self):
+        def fields_without_updated_at(model):
+            return [name for name in model_fields(model) if name != 'updated_at']
+
+        with mock.patch('core.backup.model_fields', fields_without_updated_at), \
+                mock.patch('core.backup.has_watermark', return_value=False):
+            manifest = create_backup(self.root, name='backup_1', chunk_size=40)
+        self.assertNotIn('updated_at', manifest['tables']['hour_entries']['fields'])
+        expected = list(HourEntry.objects.order_by('pk').values_list('id', 'date', 'hours', 'note'))
+        self.wipe()
+
+        before = timezone.now()
+        restore_backup(self.root)
+        self.assertEqual(list(HourEntry.objects.order_by('pk').values_list('id', 'date', 'hours', 'note')), expected)
+        self.assertFalse(HourEntry.objects.filter(updated_at__lt=before).exists())
+
+    def test_interrupted_restore_resumes_from_last_committed_chunk(self):
+        create_backup(self.root, name='backup_1', chunk_size=20)
+        expected = self.snapshot()
+        self.wipe()
+
+        original = insert_rows
+        calls = []
+
+        def failing_insert(model, rows, using='default', use_copy=True):
+            calls.append(model)
+            if model is HourEntry and calls.count(HourEntry) == 3:
+                raise RuntimeError('connection lost')
+            return original(model, rows, using, use_copy)
+
+        with mock.patch('core.restore.insert_rows', failing_insert):
+            with self.assertRaises(RuntimeError):
+                restore_backup(self.root)
+        checkpoint = LoadCheckpoint.objects.get(job='restore:backup_1', table='hour_entries')
+        self.assertEqual(checkpoint.position, 2)
+        self.assertEqual(HourEntry.objects.count(), 40)
+
+        restore_backup(self.root)
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_refuses_to_restore_over_existing_data(self):
+        create_backup(self.root, name='backup_1')
+        with self.assertRaises(RestoreError):
+            restore_backup(self.root)
+        expected = self.snapshot()
+        restore_backup(self.root, flush=True)
+        self.assertEqual(self.snapshot(), expected)
+
+    def test_command(self):
+        create_backup(self.root, name='backup_1')
+        self.wipe()
+        out = io.StringIO()
+        call_command('restore', 'backup_1', '--input-dir', self.root, stdout=out)
+        self.assertIn('hour_entries', out.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('restore', 'backup_9', '--input-dir', self.root, stdout=out)
+
+
+class TransferDatabaseTests(TestCase):
+    """Tests for the transfer_db command (default test database → temporary SQLite file)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        seed_dataset(cls.admin, users=3, projects=3, days=30)
+
+    def setUp(self):
+        target_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(target_dir.cleanup)
+        self.target_url = f"sqlite:///{os.path.join(target_dir.name, 'target.sqlite3')}"
+        self.source_url = f"sqlite:///{os.path.join(target_dir.name, 'source.sqlite3')}"
+        self.addCleanup(self.drop_target)
+        # The aliases are registered at runtime; allow connections to them
+        databases = mock.patch.object(type(self), 'databases', frozenset({'default', SOURCE_ALIAS, TARGET_ALIAS}))
+        databases.start()
+        self.addCleanup(databases.stop)
+
+    def drop_target(self):
+        for alias in (SOURCE_ALIAS, TARGET_ALIAS):
+            if alias in connections.settings:
+                connections[alias].close()
+                del connections[alias]
+                del connections.settings[alias]
+
+    def transfer(self, *args):
+        out = io.StringIO()
+        call_command('transfer_db', '--from', 'default', '--to', self.target_url, *args, stdout=out)
+        return out.getvalue()
+
+    def test_transfer_copies_and_verifies_every_table(self):
+        output = self.transfer('--migrate', '--batch-size', '25')
+        self.assertIn('Transfer completed', output)
+        self.assertNotIn('❌', output)
+        for name, model in BACKUP_MODELS:
+            self.assertEqual(table_checksum(model, TARGET_ALIAS), table_checksum(model, 'default'), name)
+        self.assertFalse(LoadCheckpoint.objects.using(TARGET_ALIAS).exists())
+
+    def test_interrupted_transfer_resumes(self):
+        original = insert_rows
+        calls = []
+
+        def failing_insert(model, rows, using='default', use_copy=True):
+            calls.append(model)
+            if model is HourEntry and calls.count(HourEntry) == 2:
+                raise RuntimeError('connection lost')
+            return original(model, rows, using, use_copy)
+
+        with mock.patch('core.transfer.insert_rows', failing_insert):
+            with self.assertRaises(RuntimeError):
+                self.transfer('--migrate', '--batch-size', '25')
+        self.assertEqual(HourEntry.objects.using(TARGET_ALIAS).count(), 25)
+
+        self.transfer('--batch-size', '25')
+        self.assertEqual(table_checksum(HourEntry, TARGET_ALIAS), table_checksum(HourEntry, 'default'))
+
+    def test_refuses_unmigrated_or_populated_target(self):
+        with self.assertRaises(CommandError):
+            self.transfer()
+        self.transfer('--migrate')
+        with self.assertRaises(CommandError):
+            self.transfer()
+        self.assertIn('Transfer completed', self.transfer('--flush'))
+
+    def test_source_from_older_version_is_migrated_on_request(self):
+        from django.db.migrations.executor import MigrationExecutor
+        from .transfer import register_database
+        register_database(self.source_url, SOURCE_ALIAS)
+        call_command('migrate', 'core', '0007', database=SOURCE_ALIAS, verbosity=0)
+        # Rows written through the models as they were at 0007 (no updated_at yet)
+        state = MigrationExecutor(connections[SOURCE_ALIAS]).loader.project_state(('core', '0007_merge_20250807_0009'))
+        old_user = state.apps.get_model('core', 'User').objects.using(SOURCE_ALIAS).create(
+            username='legacy', email='legacy@example.com'
+        )
+        old_project = state.apps.get_model('core', 'Project').objects.using(SOURCE_ALIAS).create(
+            name='Legacy', owner_id=old_user.pk
+        )
+        state.apps.get_model('core', 'HourEntry').objects.using(SOURCE_ALIAS).create(
+            user_id=old_user.pk, project_id=old_project.pk, date=date(2025, 1, 6), hours=Decimal('2.00')
+        )
+
+        args = ['transfer_db', '--from', self.source_url, '--to', self.target_url, '--migrate']
+        with self.assertRaisesMessage(CommandError, '--migrate-source'):
+            call_command(*args, stdout=io.StringIO())
+        out = io.StringIO()
+        call_command(*args, '--migrate-source', stdout=out)
+        self.assertIn('Transfer completed', out.getvalue())
+        entry = HourEntry.objects.using(TARGET_ALIAS).get()
+        self.assertEqual((entry.user.username, entry.project.name, entry.hours), ('legacy', 'Legacy', Decimal('2.00')))
+        self.assertIsNotNone(entry.updated_at)
+
+    def test_source_with_case_variant_emails_is_not_migrated(self):
+        from .transfer import pending_migrations, register_database
+        register_database(self.source_url, SOURCE_ALIAS)
+        call_command('migrate', 'core', '0007', database=SOURCE_ALIAS, verbosity=0)
+        # Emails were unique only as typed before 0008
+        for username, email in (('ann', 'Ann@example.com'), ('ann2', 'ann@example.com'), ('bob', 'bob@example.com')):
+            connections[SOURCE_ALIAS].cursor().execute(
+                "INSERT INTO core_user (password, is_superuser, username, first_name, last_name, email, "
+                "is_staff, is_active, date_joined, is_admin) VALUES ('', 0, %s, '', '', %s, 0, 1, %s, 0)",
+                [username, email, timezone.now()]
+            )
+
+        with self.assertRaises(CommandError) as raised:
+            call_command('migrate', 'core', database=SOURCE_ALIAS, verbosity=0)
+        message = str(raised.exception)
+        self.assertIn('username=ann email=Ann@example.com', message)
+        self.assertIn('username=ann2 email=ann@example.com', message)
+        self.assertNotIn('bob', message)
+        self.assertIn('core.0008_user_email_lower_unique', pending_migrations(SOURCE_ALIAS))
+
+    def test_verify_against_target(self):
+        self.transfer('--migrate')
+        out = io.StringIO()
+        call_command('verify_data', '--against', TARGET_ALIAS, stdout=out)
+        self.assertIn('All tables match', out.getvalue())
+
+        HourEntry.objects.using(TARGET_ALIAS).filter(pk=HourEntry.objects.first().pk).update(note='Changed')
+        with self.assertRaises(CommandError):
+            call_command('verify_data', '--against', TARGET_ALIAS, stdout=out)
+
+
+class VerifyDataTests(TestCase):
+    """Tests for bucket checksums and the verify_data command"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        cls.members, cls.projects = seed_dataset(cls.admin, users=3, projects=3, days=90)
+        HourEntry.objects.update(updated_at=timezone.now() - timedelta(days=1))
+
+    def setUp(self):
+        backup_root = tempfile.TemporaryDirectory()
+        self.addCleanup(backup_root.cleanup)
+        self.root = backup_root.name
+
+    def verify(self, name=None, **kwargs):
+        return verify_data(DatabaseSource(), BackupSource(self.root, name), **kwargs)
+
+    def test_buckets_by_month_and_primary_key_range(self):
+        buckets = bucket_checksums(HourEntry)
+        self.assertEqual(list(buckets), ['2025-01', '2025-02', '2025-03'])
+        self.assertEqual(sum(bucket['rows'] for bucket in buckets.values()), HourEntry.objects.count())
+        self.assertEqual(list(bucket_checksums(User)), ['id:0'])
+
+    def test_fresh_backup_matches_without_reading_chunks(self):
+        manifest = create_backup(self.root, chunk_size=25)
+        self.assertEqual(manifest['tables']['hour_entries']['buckets'], bucket_checksums(HourEntry))
+        with mock.patch('core.backup.read_chunk') as read:
+            results = self.verify()
+        read.assert_not_called()
+        self.assertTrue(all(result['ok'] for result in results.values()), results)
+
+    def test_only_differing_buckets_are_drilled(self):
+        create_backup(self.root, chunk_size=25)
+        february = HourEntry.objects.filter(date__month=2).order_by('id')
+        changed, deleted = february[0], february[1]
+        HourEntry.objects.filter(pk=changed.pk).update(hours=Decimal('6.00'))
+        deleted_pk = deleted.pk
+        deleted.delete()
+        extra = HourEntry.objects.create(
+            user=self.admin, project=self.projects[0], date=date(2025, 2, 1), hours=Decimal('1.00')
+        )
+
+        with mock.patch('core.verify.row_digests', wraps=row_digests) as drilled:
+            result = self.verify(tables=['hour_entries'])['hour_entries']
+        self.assertFalse(result['ok'])
+        self.assertEqual(drilled.call_count, 1)
+        (mismatch,) = result['mismatches']
+        self.assertEqual(mismatch['bucket'], '2025-02')
+        self.assertEqual(mismatch['missing_pks'], [deleted_pk])
+        self.assertEqual(mismatch['extra_pks'], [extra.pk])
+        self.assertEqual(mismatch['changed_pks'], [changed.pk])
+
+    @mock.patch('core.backup.WATERMARK_OVERLAP', timedelta(0))
+    def test_incremental_chain_is_replayed(self):
+        create_backup(self.root, name='backup_1', chunk_size=25)
+        entry = HourEntry.objects.order_by('id')[4]
+        entry.note = 'Edited after the full backup'
+        entry.save()
+        create_backup(self.root, name='backup_2', incremental=True, chunk_size=25)
+
+        self.assertTrue(self.verify()['hour_entries']['ok'])
+        result = self.verify('backup_1')['hour_entries']
+        self.assertEqual(result['mismatches'][0]['changed_pks'], [entry.pk])
+
+    def test_command(self):
+        create_backup(self.root, name='backup_1')
+        out = io.StringIO()
+        call_command('verify_data', '--input-dir', self.root, stdout=out)
+        self.assertIn('All tables match', out.getvalue())
+
+        HourEntry.objects.filter(date__month=3).delete()
+        with self.assertRaises(CommandError):
+            call_command('verify_data', '--input-dir', self.root, '--backup', 'backup_1', stdout=out)
+        self.assertIn('2025-03', out.getvalue())
+
+
+class CreateTestDataTests(TestCase):
+    """Tests for the synthetic data generator"""
+
+    def generate(self, *args):
+        out = io.StringIO()
+        call_command(
+            'create_test_data', '--users', '6', '--projects', '5', '--days', '42', '--seed', '7',
+            '--batch-size', '50', *args, stdout=out
+        )
+        return out.getvalue()
+
+    def entries(self):
+        return list(HourEntry.objects.order_by('user__username', 'project__name', 'date').values_list(
+            'user__username', 'project__name', 'date', 'hours', 'note'
+        ))
+
+    def test_generates_realistic_data_in_batches(self):
+        with CaptureQueriesContext(connection) as queries:
+            output = self.generate()
+        self.assertIn('Test data created successfully', output)
+        self.assertEqual(User.objects.filter(username__startswith='test_user_').count(), 6)
+        self.assertEqual(Project.objects.count(), 5)
+        self.assertTrue(User.objects.get(username='test_user_3').check_password('testpass123'))
+        self.assertTrue(User.objects.get(username='test_admin').is_admin)
+
+        entries = HourEntry.objects.select_related('project')
+        self.assertGreater(len(entries), 50)
+        for entry in entries:
+            self.assertEqual(entry.hours % Decimal('0.25'), 0)
+            self.assertTrue(Decimal('0.25') <= entry.hours <= 12)
+            self.assertTrue(
+                ProjectAssignment.objects.filter(user_id=entry.user_id, project=entry.project).exists()
+            )
+            self.assertTrue(entry.project.start_date <= entry.date <= entry.project.end_date)
+        weekend = sum(1 for entry in entries if entry.date.weekday() >= 5)
+        self.assertLess(weekend, len(entries) / 10)
+
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "core_hourentry"')]
+        self.assertLess(len(inserts), len(entries) / 10)
+
+    def test_entries_fall_within_project_dates(self):
+        self.generate('--projects', '40')
+        self.assertTrue(Project.objects.filter(start_date__isnull=True).exists())
+        self.assertFalse(HourEntry.objects.filter(
+            Q(project__start_date__isnull=True) | Q(project__end_date__isnull=True)
+            | Q(date__lt=F('project__start_date')) | Q(date__gt=F('project__end_date'))
+        ).exists())
+
+    def test_seed_is_reproducible_and_clear_replaces_data(self):
+        self.generate()
+        first = self.entries()
+        with self.assertRaises(CommandError):
+            self.generate()
+        self.generate('--clear')
+        self.assertEqual(self.entries(), first)
+        self.generate('--clear', '--seed', '8')
+        self.assertNotEqual(self.entries(), first)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BenchmarkTests(TestCase):
+    """Tests for the endpoint benchmark suite"""
+
+    def test_every_route_is_benchmarked(self):
+        from .urls import urlpatterns
+        self.assertEqual({endpoint.name for endpoint in ENDPOINTS}, {pattern.name for pattern in urlpatterns})
+
+    def test_run_endpoints_records_metrics(self):
+        call_command(
+            'create_test_data', '--users', '4', '--projects', '3', '--days', '30', '--end-date', '2025-06-30',
+            stdout=io.StringIO()
+        )
+        results = run_endpoints(iterations=1)
+        budgets = query_budgets()
+        self.assertEqual(len(results['endpoints']), len(ENDPOINTS) * 2)
+        self.assertEqual(results['size']['users'], 5)
+        for key, result in results['endpoints'].items():
+            self.assertLess(result['status'], 500, key)
+            # Routes budgeted at zero queries (metrics, health) don't touch the database
+            if budgets[result['route']]:
+                self.assertGreater(result['queries'], 0, key)
+        self.assertEqual(results['endpoints']['user-list:user']['status'], 403)
+        hours = results['endpoints']['hour-entry-list:admin']
+        self.assertGreater(hours['rows'], 0)
+        self.assertGreater(hours['bytes'], 0)
+        self.assertGreater(hours['db_ms'], 0)
+
+    def test_compare_flags_regressions(self):
+        def results(queries, p50_ms, rows=100):
+            return {'datasets': {'small': {'endpoints': {'project-list:admin': {
+                'queries': queries, 'rows': rows, 'bytes': 2000, 'p50_ms': p50_ms,
+            }}}}}
+
+        baseline = results(queries=5, p50_ms=10.0)
+        self.assertEqual(compare_results(results(5, 12.0, rows=105), baseline), [])
+        regressions = compare_results(results(10, 40.0), baseline)
+        self.assertEqual({regression['metric'] for regression in regressions}, {'queries', 'p50_ms'})
+        self.assertEqual(
+            [regression['metric'] for regression in compare_results(results(10, 40.0), baseline, latency=False)],
+            ['queries']
+        )
+
+
+class QueryBudgetTests(TestCase):
+    """Every endpoint stays within its view's query_budget, independent of data size"""
+
+    def test_query_counts_within_budget(self):
+        results = {}
+        for name in BUDGET_DATASETS:
+            seed_benchmark_dataset(name, BUDGET_DATASETS)
+            results[name] = run_endpoints(iterations=1)
+        rows = check_query_budgets(results)
+        self.assertEqual(len(rows), len(ENDPOINTS) * 2)
+        failures = [row for row in rows if row['problem']]
+        self.assertFalse(failures, '\n' + format_budget_table(rows, list(results)))
+
+    def test_growing_counts_are_flagged(self):
+        def results(queries):
+            return {'endpoints': {'project-list:admin': {'queries': queries}}}
+
+        rows = check_query_budgets({'budget_small': results(3), 'budget_large': results(3)})
+        self.assertEqual(rows[0]['problem'], '')
+        rows = check_query_budgets({'budget_small': results(2), 'budget_large': results(3)})
+        self.assertEqual(rows[0]['problem'], 'grows with data')
+        rows = check_query_budgets({'budget_small': results(9), 'budget_large': results(9)})
+        self.assertEqual(rows[0]['problem'], 'over budget')
+        self.assertIn('❌ over budget', format_budget_table(rows, ['budget_small', 'budget_large']))
+
+
+@override_settings(REQUEST_TIMING=True)
+class RequestTimingTests(APITestCase):
+    """Tests for RequestTimingMiddleware's Server-Timing headers and log lines"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        project = make_project('Website', cls.admin)
+        HourEntry.objects.create(user=cls.admin, project=project, date=date(2025, 3, 3), hours=Decimal('2.00'))
+
+    def setUp(self):
+        self.client.force_authenticate(self.admin)
+
+    def server_timing(self, response):
+        metrics = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            metrics[name] = dict(param.split('=', 1) for param in params)
+        return metrics
+
+    def test_header_reports_queries_and_phases(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('daily-summary'), {'date': '2025-03-03'})
+        self.assertEqual(response.status_code, 200)
+        metrics = self.server_timing(response)
+        self.assertEqual(list(metrics), ['db', 'view', 'serialize', 'total'])
+        self.assertEqual(metrics['db']['desc'], f'"{len(queries.captured_queries)} queries"')
+        self.assertGreater(float(metrics['serialize']['dur']), 0)
+        self.assertGreaterEqual(float(metrics['total']['dur']), float(metrics['view']['dur']))
+
+    @override_settings(REQUEST_TIMING_LOG=True)
+    def test_log_line_names_the_view(self):
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            self.client.get(reverse('project-list'))
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['view'], 'project-list')
+        self.assertEqual(line['status'], 200)
+        self.assertGreater(line['queries'], 0)
+        self.assertLessEqual({'db_ms', 'view_ms', 'serialize_ms', 'total_ms'}, set(line))
+
+    @override_settings(REQUEST_TIMING=False)
+    def test_disabled_by_default(self):
+        response = self.client.get(reverse('project-list'))
+        self.assertNotIn('Server-Timing', response)
+
+
+@skipUnless(find_spec('prometheus_client'), 'prometheus_client is not installed')
+@override_settings(METRICS_TOKEN='scrape-secret')
+class MetricsTests(APITestCase):
+    """Tests for MetricsMiddleware and GET /api/metrics/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        make_project('Website', cls.admin)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def scrape(self, **extra):
+        """Samples of the /api/metrics/ response as {(name, labels): value}"""
+        from prometheus_client.parser import text_string_to_metric_families
+        extra.setdefault('HTTP_AUTHORIZATION', 'Bearer scrape-secret')
+        response = self.client.get(reverse('metrics'), **extra)
+        self.assertEqual(response.status_code, 200)
+        return {
+            (sample.name, tuple(sorted(sample.labels.items()))): sample.value
+            for family in text_string_to_metric_families(response.content.decode())
+            for sample in family.samples
+        }
+
+    def sample(self, samples, name, **labels):
+        return samples.get((name, tuple(sorted(labels.items()))), 0)
+
+    def test_requests_are_recorded_by_url_name(self):
+        labels = {'view': 'project-list', 'method': 'GET', 'status': '200'}
+        before = self.scrape()
+        self.client.force_authenticate(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('project-list'))
+        # The query log is reset by the next request
+        query_count = len(queries.captured_queries)
+        after = self.scrape()
+        for name in ('tracker_http_request_duration_seconds_count', 'tracker_http_request_queries_count'):
+            self.assertEqual(self.sample(after, name, **labels) - self.sample(before, name, **labels), 1)
+        self.assertEqual(
+            self.sample(after, 'tracker_http_request_queries_sum', **labels)
+            - self.sample(before, 'tracker_http_request_queries_sum', **labels),
+            query_count
+        )
+
+    def test_report_cache_hits_and_misses(self):
+        before = self.scrape()
+        self.client.force_authenticate(self.admin)
+        for _ in range(2):
+            self.client.get(reverse('report-render'), {'type': 'team', 'format': 'html'})
+        after = self.scrape()
+        for result in ('hit', 'miss'):
+            self.assertEqual(
+                self.sample(after, 'tracker_cache_requests_total', cache='report', result=result)
+                - self.sample(before, 'tracker_cache_requests_total', cache='report', result=result),
+                1
+            )
+
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        self.assertEqual(
+            self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 401
+        )
+        self.scrape()
+
+    @override_settings(METRICS_TOKEN='', DEBUG=False)
+    def test_without_token_metrics_are_closed(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('tracker_http_request', response.content.decode())
+
+    @override_settings(METRICS_TOKEN='', DEBUG=True)
+    def test_without_token_metrics_are_open_in_debug(self):
+        self.scrape(HTTP_AUTHORIZATION='')
+
+    def test_multiprocess_directory_sums_workers(self):
+        from .metrics import render_metrics
+        script = "from core import metrics; metrics.observe_request('project-list', 'GET', 200, 0.05, 3)"
+        with tempfile.TemporaryDirectory() as directory:
+            for _ in range(2):
+                subprocess.run(
+                    [sys.executable, '-c', script], cwd=settings.BASE_DIR, check=True,
+                    env={**os.environ, 'PROMETHEUS_MULTIPROC_DIR': directory}
+                )
+            content = render_metrics(directory).decode()
+        self.assertIn(
+            'tracker_http_request_queries_sum{method="GET",status="200",view="project-list"} 6.0', content
+        )
+
+
+@override_settings(SLOW_QUERY_MS=1)
+class SlowQueryLogTests(APITestCase):
+    """Tests for the slow query log and summarize_slow_queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        cls.members, cls.projects = seed_dataset(cls.admin, users=2, projects=2, days=5)
+
+    def setUp(self):
+        slow_queries._explained.clear()
+
+    def logged_records(self, url):
+        """Records logged while requesting url, with every query counted as slow"""
+        self.client.force_authenticate(self.admin)
+        with self.assertLogs('core.slow_queries', 'WARNING') as logs:
+            with connection.execute_wrapper(slow_queries.SlowQueryLogger(0)):
+                self.assertEqual(self.client.get(url).status_code, 200)
+            slow_queries.drain(timeout=10)
+        return [json.loads(record.getMessage()) for record in logs.records]
+
+    def test_records_have_view_frame_and_plan(self):
+        records = self.logged_records(reverse('assignment-stats'))
+        stats = [record for record in records if 'get_assignment_stats' in (record['frame'] or '')]
+        self.assertTrue(stats)
+        for record in stats:
+            self.assertEqual(record['view'], 'assignment-stats')
+            self.assertTrue(record['frame'].startswith('core/services.py:'))
+            self.assertEqual(record['fingerprint'], slow_queries.fingerprint(record['sql']))
+            self.assertTrue(record['plan'])
+            self.assertFalse(record['plan'][0].startswith('EXPLAIN failed'), record['plan'])
+
+    def test_each_fingerprint_is_explained_once(self):
+        url = reverse('project-list')
+        first = self.logged_records(url)
+        second = self.logged_records(url)
+        self.assertTrue(all(record['plan'] for record in first))
+        self.assertTrue(all(record['plan'] is None for record in second))
+
+    def test_fingerprint_ignores_literals_and_list_lengths(self):
+        self.assertEqual(
+            slow_queries.fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = \'a\' LIMIT 21'),
+            slow_queries.fingerprint('SELECT *  FROM t WHERE id IN (%s) AND name = \'bob\' LIMIT 5'),
+        )
+        self.assertNotEqual(
+            slow_queries.fingerprint('SELECT * FROM t1 WHERE id = %s'),
+            slow_queries.fingerprint('SELECT * FROM t2 WHERE id = %s'),
+        )
+
+    def test_install_goes_before_other_wrappers(self):
+        def other(execute, sql, params, many, context):
+            return execute(sql, params, many, context)
+
+        self.addCleanup(connection.execute_wrappers.clear)
+        with connection.execute_wrapper(other):
+            slow_queries.install(connection=connection)
+            slow_queries.install(connection=connection)
+            self.assertIsInstance(connection.execute_wrappers[0], slow_queries.SlowQueryLogger)
+            self.assertEqual(len(connection.execute_wrappers), 2)
+        self.assertEqual(len(connection.execute_wrappers), 1)
+
+    def test_summarize_command(self):
+        def line(sql, duration_ms, view):
+            record = {'sql': sql, 'duration_ms': duration_ms, 'view': view, 'frame': 'core/services.py:1 in f'}
+            return f"WARNING core.slow_queries {json.dumps(record)}\n"
+
+        with tempfile.NamedTemporaryFile('w', suffix='.log', delete=False) as log:
+            log.write(line('SELECT * FROM a WHERE id = %s', 50, 'user-list'))
+            log.write('unrelated log line\n')
+            log.write(line('SELECT * FROM a WHERE id = %s', 70, 'user-list'))
+            log.write(line('SELECT COUNT(*) FROM b', 100, 'assignment-stats'))
+        self.addCleanup(os.remove, log.name)
+        out = io.StringIO()
+        call_command('summarize_slow_queries', log.name, stdout=out)
+        output = out.getvalue()
+        self.assertIn('3 slow queries, 2 fingerprints', output)
+        self.assertLess(output.index('SELECT * FROM a WHERE id = ?'), output.index('SELECT COUNT(*) FROM b'))
+        self.assertIn('count 2  total 120 ms', output)
+        out = io.StringIO()
+        call_command('summarize_slow_queries', log.name, '--sort', 'max', '--view', 'assignment-stats', stdout=out)
+        self.assertIn('1 slow queries, 1 fingerprints', out.getvalue())
+
+
+class ProbeTests(TestCase):
+    """Tests for GET /api/health/ and /api/ready/"""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    @override_settings(REQUEST_TIMING=True, ALLOWED_HOSTS=['example.com'])
+    def test_health_does_no_work_and_skips_middleware(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/health/', HTTP_HOST='10.0.0.5:8000')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['status'], 'ok')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(response['Cache-Control'], 'max-age=1')
+
+    def test_ready_reports_checks_and_is_cached(self):
+        response = self.client.get('/api/ready/')
+        self.assertEqual(response.status_code, 200)
+        checks = response.json()['data']['checks']
+        self.assertEqual(set(checks), {'database', 'cache', 'migrations'})
+        self.assertTrue(all(check['ok'] for check in checks.values()))
+        self.assertGreaterEqual(checks['database']['latency_ms'], 0)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/ready/').json(), response.json())
+
+    def test_pending_migrations_are_not_ready(self):
+        from django.db.migrations import Migration
+        plan = [(Migration('0099_pending', 'core'), False)]
+        with mock.patch('core.health.MigrationExecutor.migration_plan', return_value=plan):
+            response = self.client.get('/api/ready/')
+        self.assertEqual(response.status_code, 503)
+        data = response.json()['data']
+        self.assertEqual(data['status'], 'unavailable')
+        self.assertEqual(data['checks']['migrations']['pending'], ['core.0099_pending'])
+
+    def test_database_failure_is_not_ready(self):
+        with mock.patch('core.health.connections') as connections_mock:
+            connections_mock.__getitem__.return_value.cursor.side_effect = Exception('connection refused')
+            response = self.client.get('/api/ready/')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(
+            response.json()['data']['checks']['database'], {'ok': False, 'error': 'connection refused'}
+        )
+
+
+
+@override_settings(REQUEST_PROFILING=True)
+class ProfileTests(APITestCase):
+    """Tests for ProfileMiddleware and GET /api/profiles/<name>/"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', is_admin=True)
+        cls.user = make_user('user')
+        make_project('Website', cls.admin)
+        cls.admin_token = Token.objects.create(user=cls.admin).key
+        cls.user_token = Token.objects.create(user=cls.user).key
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings_override = override_settings(PROFILE_DIR=self.directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def get(self, url, token, **extra):
+        return self.client.get(url, HTTP_AUTHORIZATION=f'Token {token}', **extra)
+
+    def test_admin_request_is_profiled_and_linked(self):
+        response = self.get(reverse('project-list'), self.admin_token, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        url = response['X-Profile-Url']
+        name = url.rstrip('/').rsplit('/', 1)[-1]
+        self.assertRegex(name, r'^\d{8}-\d{6}-project-list-\w{8}\.prof$')
+        self.assertEqual(os.listdir(self.directory), [name])
+
+        download = self.get(url, self.admin_token)
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(download['Content-Disposition'], f'attachment; filename="{name}"')
+        text = self.get(url, self.admin_token, QUERY_STRING='as=txt')
+        self.assertIn('cumulative', text.content.decode())
+        self.assertIn('views.py', text.content.decode())
+
+    def test_only_admins_who_ask_are_profiled(self):
+        for token, extra in [(self.user_token, {'HTTP_X_PROFILE': '1'}), (self.admin_token, {}),
+                             (self.admin_token, {'HTTP_X_PROFILE': '0'}), ('invalid', {'HTTP_X_PROFILE': '1'})]:
+            response = self.get(reverse('project-list'), token, **extra)
+            self.assertNotIn('X-Profile-Url', response)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    @override_settings(REQUEST_PROFILING=False)
+    def test_disabled_by_default(self):
+        response = self.get(reverse('project-list'), self.admin_token, HTTP_X_PROFILE='1')
+        self.assertNotIn('X-Profile-Url', response)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_concurrent_profile_is_refused(self):
+        from . import profiling
+        with profiling._lock:
+            response = self.get(reverse('project-list'), self.admin_token, HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Profile-Error'], 'busy')
+        self.assertNotIn('X-Profile-Url', response)
+
+    @override_settings(PROFILE_KEEP=2)
+    def test_old_profiles_are_pruned(self):
+        for age, name in enumerate(['c.prof', 'b.prof', 'a.prof']):
+            path = os.path.join(self.directory, name)
+            open(path, 'wb').close()
+            os.utime(path, (1000 - age, 1000 - age))
+        response = self.get(reverse('project-list'), self.admin_token, HTTP_X_PROFILE='1')
+        name = response['X-Profile-Url'].rstrip('/').rsplit('/', 1)[-1]
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted([name, 'c.prof']))
+
+    def test_download_is_admin_only(self):
+        open(os.path.join(self.directory, 'saved.prof'), 'wb').close()
+        url = reverse('profile-download', kwargs={'name': 'saved.prof'})
+        self.assertEqual(self.get(url, self.user_token).status_code, 403)
+        self.assertEqual(self.get(url, self.admin_token).status_code, 200)
+        for name in ['missing.prof', '..', 'saved.txt']:
+            response = self.get(reverse('profile-download', kwargs={'name': name}), self.admin_token)
+            self.assertEqual(response.status_code, 404)
@@ -0,0 +1,122 @@
+"""
+Login throttling for the Time Tracker API
+
+Failed logins are counted per account and per source IP using a sliding
+window counter (current bucket plus a weighted share of the previous one), in
+the cache named by LOGIN_THROTTLE['CACHE']. That cache must be shared by all
+worker processes (settings use a database cache), or every worker allows the
+full limit. Attempts over either limit are rejected by the throttle before the
+view runs, so they cost a single cache read and no user lookup or password
+hashing.
+
+The source IP is DRF's get_ident(), which trusts X-Forwarded-For only as far
+as REST_FRAMEWORK['NUM_PROXIES'] allows.
+"""
+
+import hashlib
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+DEFAULT_LOGIN_THROTTLE = {
+    'ACCOUNT_FAILURES': 5,   # failed attempts allowed per account per window
+    'IP_FAILURES': 20,       # failed attempts allowed per source IP per window
+    'WINDOW': 15 * 60,       # window length in seconds
+    'CACHE': 'default',      # cache alias holding the counters
+}
+
+CACHE_KEY = 'login-fail:{scope}:{ident}:{bucket}'
+
+
+def get_login_throttle_config() -> Dict[str, Any]:
+    """Return the LOGIN_THROTTLE setting merged over the defaults"""
+    return {**DEFAULT_LOGIN_THROTTLE, **getattr(settings, 'LOGIN_THROTTLE', {})}
+
+
+def throttle_cache(config: Dict[str, Any]):
+    return caches[config['CACHE']]
+
+
+class LoginFailureThrottle(BaseThrottle):
+    """
+    Reject login attempts once an account or IP has too many recent failures
+
+    Only failures are counted: the view calls record_failure() when
+    authentication fails and reset() when it succeeds.
+    """
+
+    def allow_request(self, request, view):
+        config = get_login_throttle_config()
+        window = config['WINDOW']
+        now = time.time()
+        scopes = self._scopes(request, config)
+
+        keys = self._bucket_keys(scopes, window, now)
+        counts = throttle_cache(config).get_many([key for pair in keys for key in pair])
+
+        # Weight of the previous bucket that still falls inside the window
+        elapsed = (now % window) / window
+        self._wait = None
+        for (current_key, previous_key), (_, _, limit) in zip(keys, scopes):
+            estimate = counts.get(current_key, 0) + counts.get(previous_key, 0) * (1 - elapsed)
+            if estimate >= limit:
+                self._wait = window - (now % window)
+                return False
+        return True
+
+    def wait(self):
+        return self._wait
+
+    @classmethod
+    def record_failure(cls, request):
+        """Count a failed login against the account and the source IP"""
+        config = get_login_throttle_config()
+        window = config['WINDOW']
+        now = time.time()
+        cache = throttle_cache(config)
+        for current_key, _ in cls._bucket_keys(cls()._scopes(request, config), window, now):
+            # Keep each bucket alive for two windows so it can serve as "previous"
+            if not cache.add(current_key, 1, timeout=window * 2):
+                try:
+                    cache.incr(current_key)
+                except ValueError:
+                    cache.set(current_key, 1, timeout=window * 2)
+
+    @classmethod
+    def reset(cls, request):
+        """Clear the account's failure counters after a successful login"""
+        config = get_login_throttle_config()
+        window = config['WINDOW']
+        scopes = [scope for scope in cls()._scopes(request, config) if scope[0] == 'account']
+        keys = cls._bucket_keys(scopes, window, time.time())
+        throttle_cache(config).delete_many([key for pair in keys for key in pair])
+
+    def _scopes(self, request, config) -> List[Tuple[str, str, int]]:
+        """(scope, identifier, limit) triples this request is counted against"""
+        scopes = [('ip', self.get_ident(request), config['IP_FAILURES'])]
+        account = self._account(request)
+        if account:
+            scopes.append(('account', account, config['ACCOUNT_FAILURES']))
+        return scopes
+
+    @staticmethod
+    def _account(request) -> Optional[str]:
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not email or not isinstance(email, str):
+            return None
+        # Hash so arbitrary user input never ends up in a cache key verbatim
+        return hashlib.sha256(email.strip().lower().encode()).hexdigest()
+
+    @staticmethod
+    def _bucket_keys(scopes, window, now) -> List[Tuple[str, str]]:
+        bucket = int(now // window)
+        return [
+            (
+                CACHE_KEY.format(scope=scope, ident=ident, bucket=bucket),
+                CACHE_KEY.format(scope=scope, ident=ident, bucket=bucket - 1),
+            )
+            for scope, ident, _ in scopes
+        ]
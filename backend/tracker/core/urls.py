@@ -5,6 +5,7 @@ from .views import (
     ProjectListView, 
     ProjectDetailView,
     HourEntryListView,
+    HourEntryExportView,
     HourEntryDetailView,
     UserProfileView,
     UserListView,
@@ -14,13 +15,20 @@ from .views import (
     ProjectAssignUsersView,
     ProjectUnassignUsersView,
     ProjectAssignmentsView,
+    BulkAssignmentView,
     UserProjectsView,
     AssignmentStatsView,
     # Cycle 3: Advanced Time Tracking & Reporting views
     DailySummaryView,
     WeeklySummaryView,
     MonthlySummaryView,
-    ProjectTimeReportView
+    ProjectTimeReportView,
+    ReportRenderView,
+    AnalyticsExportView,
+    MetricsView,
+    ProfileDownloadView,
+    HealthView,
+    ReadyView
 )
 
 urlpatterns = [
@@ -40,6 +48,7 @@ urlpatterns = [
     
     # Time tracking endpoints
     path('hours/', HourEntryListView.as_view(), name='hour-entry-list'),
+    path('hours/export/', HourEntryExportView.as_view(), name='hour-entry-export'),
     path('hours/<int:pk>/', HourEntryDetailView.as_view(), name='hour-entry-detail'),
     
     # Project assignment endpoints (admin only)
@@ -50,6 +59,9 @@ urlpatterns = [
     # User project endpoints
     path('users/<int:user_id>/projects/', UserProjectsView.as_view(), name='user-projects'),
     
+    # Bulk users x projects assignment (admin only)
+    path('assignments/bulk/', BulkAssignmentView.as_view(), name='bulk-assignment'),
+    
     # Assignment statistics (admin only)
     path('assignments/stats/', AssignmentStatsView.as_view(), name='assignment-stats'),
     
@@ -58,4 +70,20 @@ urlpatterns = [
     path('time/weekly/', WeeklySummaryView.as_view(), name='weekly-summary'),
     path('time/monthly/', MonthlySummaryView.as_view(), name='monthly-summary'),
     path('projects/<int:project_id>/time-report/', ProjectTimeReportView.as_view(), name='project-time-report'),
+    
+    # Server-side report rendering (PDF/HTML)
+    path('reports/render/', ReportRenderView.as_view(), name='report-render'),
+    
+    # Parquet analytics export (admin only)
+    path('analytics/export/', AnalyticsExportView.as_view(), name='analytics-export'),
+    
+    # Prometheus metrics (METRICS_TOKEN bearer token; open only with DEBUG when unset)
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    
+    # Profiles of requests sent with X-Profile: 1 (admin only, REQUEST_PROFILING)
+    path('profiles/<str:name>/', ProfileDownloadView.as_view(), name='profile-download'),
+    
+    # Liveness and readiness probes (unauthenticated, see core.health)
+    path('health/', HealthView.as_view(), name='health'),
+    path('ready/', ReadyView.as_view(), name='ready'),
 ] 
\ No newline at end of file
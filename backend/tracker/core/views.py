@@ -1,6 +1,6 @@
 from django.shortcuts import render
 from rest_framework import generics, permissions, status
-from .models import Project, HourEntry, User
+from .models import Project, HourEntry, User, PROJECT_STATUSES
 from .serializers import ProjectSerializer, HourEntrySerializer, UserSerializer
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
@@ -8,19 +8,30 @@ from rest_framework.views import APIView
 from rest_framework.decorators import api_view, permission_classes
 from django.db.models import Q
 from datetime import datetime, timedelta
-from .services import ProjectAssignmentService
-from .serializers import ProjectAssignmentSerializer, ProjectAssignmentRequestSerializer
+from .services import ProjectAssignmentService, UserService
+from .throttling import LoginFailureThrottle
+from .archive import archived_totals, combined_total, combined_daily_totals, combined_breakdown
+from .reports import ReportRequest, ReportError, get_report_artifact, CONTENT_TYPES
+from .serializers import ProjectAssignmentSerializer, ProjectAssignmentRequestSerializer, BulkAssignmentRequestSerializer
 from django.core.exceptions import ValidationError, PermissionDenied
+from django.http import JsonResponse
+from django.views import View
 
-# Create your views here.
+# Every view declares ``query_budget``: the most SQL queries one request may
+# run, whatever the amount of data. core.tests.QueryBudgetTests enforces it.
 
 class SignupView(generics.CreateAPIView):
+    query_budget = 5
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.AllowAny]
 
 class ObtainTokenView(APIView):
+    # Includes reading and resetting the throttle counters in the shared cache table
+    query_budget = 5
     permission_classes = [permissions.AllowAny]
+    # Rejects accounts/IPs with too many recent failures before any user lookup or hash work
+    throttle_classes = [LoginFailureThrottle]
 
     def post(self, request):
         from django.contrib.auth import authenticate
@@ -32,22 +43,35 @@ class ObtainTokenView(APIView):
         
         user = authenticate(request, username=email, password=password)  # username param is used for email
         if not user:
+            LoginFailureThrottle.record_failure(request)
             return Response({'error': 'Invalid email or password'}, status=400)
         
+        LoginFailureThrottle.reset(request)
         token, _ = Token.objects.get_or_create(user=user)
         return Response({'token': token.key})
 
 class ProjectListView(generics.ListCreateAPIView):
+    query_budget = 3
     serializer_class = ProjectSerializer
 
     def get_queryset(self):
         user = self.request.user
+        queryset = Project.objects.with_status().with_assigned_users()
+        
+        # Status filtering in SQL: ?status=active|inactive|not_started|no_dates
+        status_param = self.request.query_params.get('status', None)
+        if status_param:
+            if status_param not in PROJECT_STATUSES:
+                from rest_framework.exceptions import ValidationError
+                raise ValidationError(f"Invalid status. Expected one of: {', '.join(PROJECT_STATUSES)}")
+            queryset = queryset.filter_status(status_param)
+        
         if user.is_admin:
-            return Project.objects.all()
+            return queryset
         
         # For regular users, show projects they own OR are assigned to
         from django.db.models import Q
-        return Project.objects.filter(
+        return queryset.filter(
             Q(owner=user) | Q(assignments__user=user, assignments__is_active=True)
         ).distinct()
 
@@ -68,6 +92,7 @@ class ProjectListView(generics.ListCreateAPIView):
         serializer.save(owner=self.request.user)
 
 class HourEntryListView(generics.ListCreateAPIView):
+    query_budget = 2
     serializer_class = HourEntrySerializer
 
     def get_queryset(self):
@@ -142,8 +167,47 @@ class HourEntryListView(generics.ListCreateAPIView):
         # Make sure DRF serializer knows about the instance
         serializer.instance = entry
 
+
+class HourEntryExportView(HourEntryListView):
+    """Stream hour entries as an Excel workbook, with the same filters as the hour list"""
+    query_budget = 2
+    http_method_names = ['get', 'head', 'options']
+    
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= selects the export format, not a DRF renderer; errors are always JSON
+        from rest_framework.renderers import JSONRenderer
+        return (JSONRenderer(), JSONRenderer.media_type)
+    
+    def get(self, request):
+        """Export entries; ?sheets=project writes one sheet per project"""
+        from django.http import StreamingHttpResponse
+        from .exports import EXPORT_FORMATS, EXPORT_SHEETS, stream_hour_entries_xlsx
+        from .xlsx import CONTENT_TYPE
+        
+        export_format = request.query_params.get('format', 'xlsx')
+        sheets = request.query_params.get('sheets', 'single')
+        if export_format not in EXPORT_FORMATS:
+            return Response({
+                'success': False,
+                'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if sheets not in EXPORT_SHEETS:
+            return Response({
+                'success': False,
+                'error': f"sheets must be one of: {', '.join(EXPORT_SHEETS)}"
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        response = StreamingHttpResponse(
+            stream_hour_entries_xlsx(self.get_queryset(), sheets), content_type=CONTENT_TYPE
+        )
+        filename = 'hours-by-project.xlsx' if sheets == 'project' else 'hours.xlsx'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Cache-Control'] = 'private, no-store'
+        return response
+
 class UserProfileView(APIView):
     """Get current user profile information"""
+    query_budget = 1
     
     def get(self, request):
         serializer = UserSerializer(request.user)
@@ -163,13 +227,15 @@ class UserProfileView(APIView):
 
 class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete a specific project"""
+    query_budget = 3
     serializer_class = ProjectSerializer
 
     def get_queryset(self):
         user = self.request.user
+        queryset = Project.objects.with_assigned_users()
         if user.is_admin:
-            return Project.objects.all()
-        return Project.objects.filter(owner=user)
+            return queryset
+        return queryset.filter(owner=user)
     
     def perform_update(self, serializer):
         start_date = serializer.validated_data.get('start_date', serializer.instance.start_date)
@@ -189,6 +255,7 @@ class ProjectDetailView(generics.RetrieveUpdateDestroyAPIView):
 
 class HourEntryDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete a specific hour entry"""
+    query_budget = 2
     serializer_class = HourEntrySerializer
 
     def get_queryset(self):
@@ -234,6 +301,7 @@ class IsAdminPermission(permissions.BasePermission):
 
 class UserListView(generics.ListCreateAPIView):
     """List all users (admin only) or create new user (admin only)"""
+    query_budget = 2
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdminPermission]
@@ -259,6 +327,7 @@ class UserListView(generics.ListCreateAPIView):
 
 class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
     """Get, update, or delete a specific user (admin only)"""
+    query_budget = 2
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [IsAdminPermission]
@@ -266,13 +335,16 @@ class UserDetailView(generics.RetrieveUpdateDestroyAPIView):
     def destroy(self, request, *args, **kwargs):
         """Soft delete user by setting is_active=False"""
         user = self.get_object()
-        user.is_active = False
-        user.save()
-        return Response({'message': 'User deactivated successfully'}, status=status.HTTP_200_OK)
+        result = UserService.deactivate_user(user, deactivated_by=request.user)
+        return Response({
+            'message': 'User deactivated successfully',
+            'data': result
+        }, status=status.HTTP_200_OK)
 
 
 class UpdateUserProfileView(APIView):
     """Allow users to update their own profile"""
+    query_budget = 2
     
     def put(self, request):
         serializer = UserSerializer(request.user, data=request.data, partial=True)
@@ -286,6 +358,7 @@ class UpdateUserProfileView(APIView):
 
 class ProjectAssignUsersView(APIView):
     """Assign multiple users to a project (admin only)"""
+    query_budget = 7
     permission_classes = [IsAdminPermission]
     
     def post(self, request, project_id):
@@ -325,6 +398,7 @@ class ProjectAssignUsersView(APIView):
 
 class ProjectUnassignUsersView(APIView):
     """Remove users from a project (admin only)"""
+    query_budget = 7
     permission_classes = [IsAdminPermission]
     
     def post(self, request, project_id):
@@ -360,8 +434,47 @@ class ProjectUnassignUsersView(APIView):
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class BulkAssignmentView(APIView):
+    """Assign, unassign or replace users across multiple projects (admin only)"""
+    query_budget = 6
+    permission_classes = [IsAdminPermission]
+    
+    def post(self, request):
+        """Apply a users x projects assignment matrix"""
+        serializer = BulkAssignmentRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            result = ProjectAssignmentService.bulk_assign(
+                user_ids=serializer.validated_data['user_ids'],
+                project_ids=serializer.validated_data['project_ids'],
+                assigned_by_user=request.user,
+                mode=serializer.validated_data['mode'],
+                notes=serializer.validated_data.get('notes', '')
+            )
+            
+            return Response({
+                'success': True,
+                'message': f'Bulk {result["mode"]} operation completed for {len(result["projects"])} project(s)',
+                'data': result
+            }, status=status.HTTP_200_OK)
+            
+        except (ValidationError, PermissionDenied) as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except Exception:
+            return Response({
+                'success': False,
+                'error': 'An unexpected error occurred'
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 class ProjectAssignmentsView(APIView):
     """Get all assignments for a project"""
+    query_budget = 2
     
     def get(self, request, project_id):
         """Get project assignments"""
@@ -386,6 +499,7 @@ class ProjectAssignmentsView(APIView):
 
 class UserProjectsView(APIView):
     """Get all projects assigned to a user"""
+    query_budget = 2
     
     def get(self, request, user_id):
         """Get user's assigned projects"""
@@ -417,6 +531,7 @@ class UserProjectsView(APIView):
 
 class AssignmentStatsView(APIView):
     """Get assignment statistics (admin only)"""
+    query_budget = 6
     permission_classes = [IsAdminPermission]
     
     def get(self, request):
@@ -439,11 +554,11 @@ class AssignmentStatsView(APIView):
 
 class DailySummaryView(APIView):
     """Get daily summary of hours worked"""
+    query_budget = 4
     
     def get(self, request):
         """Get daily time summary"""
         try:
-            from django.db.models import Sum
             from datetime import datetime, timedelta
             
             user = request.user
@@ -456,25 +571,23 @@ class DailySummaryView(APIView):
             else:
                 target_date = datetime.now().date()
             
-            # Base queryset
-            queryset = HourEntry.objects.filter(date=target_date)
+            # Base querysets: hot entries plus archived totals if the day is archived
+            querysets = [HourEntry.objects.filter(date=target_date)]
+            archived = archived_totals(target_date, target_date)
+            if archived is not None:
+                querysets.append(archived)
             
             # Apply user filtering
             if user.is_admin and user_param:
-                queryset = queryset.filter(user_id=user_param)
+                querysets = [queryset.filter(user_id=user_param) for queryset in querysets]
             elif not user.is_admin:
-                queryset = queryset.filter(user=user)
+                querysets = [queryset.filter(user=user) for queryset in querysets]
             
             # Get total hours for the day
-            total_hours = queryset.aggregate(total=Sum('hours'))['total'] or 0
+            total_hours = combined_total(querysets)
             
             # Get breakdown by project
-            project_breakdown = list(queryset.values(
-                'project__id', 
-                'project__name'
-            ).annotate(
-                total_hours=Sum('hours')
-            ).order_by('-total_hours'))
+            project_breakdown = combined_breakdown(querysets, ['project__id', 'project__name'])
             
             return Response({
                 'success': True,
@@ -494,11 +607,11 @@ class DailySummaryView(APIView):
 
 class WeeklySummaryView(APIView):
     """Get weekly summary of hours worked"""
+    query_budget = 5
     
     def get(self, request):
         """Get weekly time summary"""
         try:
-            from django.db.models import Sum
             from datetime import datetime, timedelta
             import calendar
             
@@ -515,36 +628,34 @@ class WeeklySummaryView(APIView):
             
             week_end = week_start + timedelta(days=6)  # Sunday
             
-            # Base queryset
-            queryset = HourEntry.objects.filter(date__range=[week_start, week_end])
+            # Base querysets: hot entries plus archived totals if the week is archived
+            querysets = [HourEntry.objects.filter(date__range=[week_start, week_end])]
+            archived = archived_totals(week_start, week_end)
+            if archived is not None:
+                querysets.append(archived)
             
             # Apply user filtering
             if user.is_admin and user_param:
-                queryset = queryset.filter(user_id=user_param)
+                querysets = [queryset.filter(user_id=user_param) for queryset in querysets]
             elif not user.is_admin:
-                queryset = queryset.filter(user=user)
+                querysets = [queryset.filter(user=user) for queryset in querysets]
             
             # Get total hours for the week
-            total_hours = queryset.aggregate(total=Sum('hours'))['total'] or 0
+            total_hours = combined_total(querysets)
             
             # Get daily breakdown
+            hours_by_date = combined_daily_totals(querysets)
             daily_breakdown = []
             for i in range(7):
                 day = week_start + timedelta(days=i)
-                day_hours = queryset.filter(date=day).aggregate(total=Sum('hours'))['total'] or 0
                 daily_breakdown.append({
                     'date': day.isoformat(),
                     'day_name': calendar.day_name[day.weekday()],
-                    'hours': float(day_hours)
+                    'hours': float(hours_by_date.get(day, 0))
                 })
             
             # Get project breakdown
-            project_breakdown = list(queryset.values(
-                'project__id', 
-                'project__name'
-            ).annotate(
-                total_hours=Sum('hours')
-            ).order_by('-total_hours'))
+            project_breakdown = combined_breakdown(querysets, ['project__id', 'project__name'])
             
             return Response({
                 'success': True,
@@ -566,11 +677,11 @@ class WeeklySummaryView(APIView):
 
 class MonthlySummaryView(APIView):
     """Get monthly summary of hours worked"""
+    query_budget = 5
     
     def get(self, request):
         """Get monthly time summary"""
         try:
-            from django.db.models import Sum
             from datetime import datetime
             import calendar
             
@@ -592,37 +703,35 @@ class MonthlySummaryView(APIView):
             else:
                 month_end = datetime(year, month + 1, 1).date() - timedelta(days=1)
             
-            # Base queryset
-            queryset = HourEntry.objects.filter(date__range=[month_start, month_end])
+            # Base querysets: hot entries plus archived totals if the month is archived
+            querysets = [HourEntry.objects.filter(date__range=[month_start, month_end])]
+            archived = archived_totals(month_start, month_end)
+            if archived is not None:
+                querysets.append(archived)
             
             # Apply user filtering
             if user.is_admin and user_param:
-                queryset = queryset.filter(user_id=user_param)
+                querysets = [queryset.filter(user_id=user_param) for queryset in querysets]
             elif not user.is_admin:
-                queryset = queryset.filter(user=user)
+                querysets = [queryset.filter(user=user) for queryset in querysets]
             
             # Get total hours for the month
-            total_hours = queryset.aggregate(total=Sum('hours'))['total'] or 0
+            total_hours = combined_total(querysets)
             
             # Get daily breakdown
+            hours_by_date = combined_daily_totals(querysets)
             daily_breakdown = []
             current_date = month_start
             while current_date <= month_end:
-                day_hours = queryset.filter(date=current_date).aggregate(total=Sum('hours'))['total'] or 0
                 daily_breakdown.append({
                     'date': current_date.isoformat(),
                     'day_name': calendar.day_name[current_date.weekday()],
-                    'hours': float(day_hours)
+                    'hours': float(hours_by_date.get(current_date, 0))
                 })
                 current_date += timedelta(days=1)
             
             # Get project breakdown
-            project_breakdown = list(queryset.values(
-                'project__id', 
-                'project__name'
-            ).annotate(
-                total_hours=Sum('hours')
-            ).order_by('-total_hours'))
+            project_breakdown = combined_breakdown(querysets, ['project__id', 'project__name'])
             
             return Response({
                 'success': True,
@@ -645,11 +754,11 @@ class MonthlySummaryView(APIView):
 
 class ProjectTimeReportView(APIView):
     """Get time reports for specific projects"""
+    query_budget = 7
     
     def get(self, request, project_id):
         """Get project time report"""
         try:
-            from django.db.models import Sum
             from datetime import datetime
             
             user = request.user
@@ -693,18 +802,25 @@ class ProjectTimeReportView(APIView):
             if not user.is_admin:
                 queryset = queryset.filter(user=user)
             
+            # Include archived totals when the range reaches back into the archive
+            querysets = [queryset]
+            archived = archived_totals(start_date, end_date)
+            if archived is not None:
+                archived = archived.filter(project_id=project_id)
+                if not user.is_admin:
+                    archived = archived.filter(user=user)
+                querysets.append(archived)
+            
             # Get total hours
-            total_hours = queryset.aggregate(total=Sum('hours'))['total'] or 0
+            total_hours = combined_total(querysets)
             
             # Get user breakdown (who worked on this project)
-            user_breakdown = list(queryset.values(
+            user_breakdown = combined_breakdown(querysets, [
                 'user__id',
                 'user__first_name',
                 'user__last_name',
                 'user__username'
-            ).annotate(
-                total_hours=Sum('hours')
-            ).order_by('-total_hours'))
+            ])
             
             # Get recent entries
             recent_entries = list(queryset.select_related('user').order_by('-date')[:10].values(
@@ -735,3 +851,174 @@ class ProjectTimeReportView(APIView):
                 'success': False,
                 'error': str(e)
             }, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ReportRenderView(APIView):
+    """Render a time report server-side as PDF or HTML, served from cache when unchanged"""
+    query_budget = 7
+    
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= selects the report output, not a DRF renderer; errors are always JSON
+        from rest_framework.renderers import JSONRenderer
+        return (JSONRenderer(), JSONRenderer.media_type)
+    
+    def get(self, request):
+        """Render a project, user or team report"""
+        from django.http import HttpResponse, HttpResponseNotModified
+        try:
+            report = ReportRequest(request.query_params, request.user)
+            key, content = get_report_artifact(report)
+        except ReportError as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=e.status_code)
+        
+        etag = '"%s"' % key.split(':')[-1]
+        if request.headers.get('If-None-Match') == etag:
+            return HttpResponseNotModified(headers={'ETag': etag})
+        
+        response = HttpResponse(content, content_type=CONTENT_TYPES[report.format])
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        if report.format == 'pdf':
+            response['Content-Disposition'] = f'attachment; filename="{report.type}-report.pdf"'
+        return response
+
+
+class AnalyticsExportView(APIView):
+    """Month-partitioned Parquet export of hour entries for the data team (admin only)"""
+    query_budget = 1
+    permission_classes = [IsAdminPermission]
+    
+    def get(self, request):
+        """Export manifest, or the Parquet file for ?month=YYYY-MM"""
+        from django.conf import settings
+        from django.http import FileResponse
+        from .analytics import exported_month_file, load_manifest
+        
+        month = request.query_params.get('month')
+        if not month:
+            return Response({
+                'success': True,
+                'data': load_manifest(settings.ANALYTICS_EXPORT_DIR)
+            })
+        
+        path = exported_month_file(settings.ANALYTICS_EXPORT_DIR, month)
+        if path is None:
+            return Response({
+                'success': False,
+                'error': f"No export for month {month}"
+            }, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(
+            open(path, 'rb'), as_attachment=True,
+            filename=f"hour_entries_{month}.parquet", content_type='application/vnd.apache.parquet'
+        )
+    
+    def post(self, request):
+        """Run an incremental export ({"full": true} rewrites every month)"""
+        from django.conf import settings
+        from .analytics import AnalyticsExportUnavailable, export_analytics
+        
+        try:
+            result = export_analytics(settings.ANALYTICS_EXPORT_DIR, full=bool(request.data.get('full', False)))
+        except AnalyticsExportUnavailable as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_501_NOT_IMPLEMENTED)
+        
+        return Response({
+            'success': True,
+            'data': result
+        })
+
+
+class MetricsView(APIView):
+    """Prometheus metrics, summed over gunicorn workers (see core.metrics)"""
+    query_budget = 0
+    # Scrapers authenticate with METRICS_TOKEN, not user tokens; without a token the
+    # endpoint is only open with DEBUG on
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+    
+    def get(self, request):
+        """Metrics in the Prometheus text format"""
+        import hmac
+        from django.conf import settings
+        from django.http import HttpResponse
+        from .metrics import CONTENT_TYPE, MetricsUnavailable, render_metrics
+        
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        if not token and not settings.DEBUG:
+            return Response({
+                'success': False,
+                'error': 'Metrics are disabled until METRICS_TOKEN is set'
+            }, status=status.HTTP_403_FORBIDDEN)
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return Response({
+                'success': False,
+                'error': 'Invalid metrics token'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+        
+        try:
+            content = render_metrics()
+        except MetricsUnavailable as e:
+            return Response({
+                'success': False,
+                'error': str(e)
+            }, status=status.HTTP_501_NOT_IMPLEMENTED)
+        return HttpResponse(content, content_type=CONTENT_TYPE)
+
+
+class ProfileDownloadView(APIView):
+    """Request profiles recorded with the X-Profile header (admin only, see core.profiling)"""
+    query_budget = 1
+    permission_classes = [IsAdminPermission]
+    
+    def get(self, request, name):
+        """The .prof file, or the top functions by cumulative time with ?as=txt"""
+        from django.http import FileResponse, HttpResponse
+        from .profiling import profile_path, stats_text
+        
+        path = profile_path(name)
+        if path is None:
+            return Response({
+                'success': False,
+                'error': f"No profile named {name}"
+            }, status=status.HTTP_404_NOT_FOUND)
+        # Not "format": DRF reserves that query parameter for renderer selection
+        if request.query_params.get('as') == 'txt':
+            return HttpResponse(stats_text(path), content_type='text/plain; charset=utf-8')
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=name,
+                            content_type='application/octet-stream')
+
+
+# ===== PROBES =====
+# Plain Django views without DRF authentication or content negotiation; normally
+# served by core.middleware.ProbeMiddleware before any other middleware runs
+
+class HealthView(View):
+    """Liveness: the process is up and serving requests (no database or cache work)"""
+    query_budget = 0
+    
+    def get(self, request):
+        response = JsonResponse({'success': True, 'data': {'status': 'ok'}})
+        response['Cache-Control'] = 'max-age=1'
+        return response
+
+
+class ReadyView(View):
+    """Readiness: database round trip, cache and migrations (see core.health)"""
+    query_budget = 3
+    
+    def get(self, request):
+        from .health import readiness
+        ready, checks = readiness()
+        response = JsonResponse({
+            'success': ready,
+            'data': {'status': 'ready' if ready else 'unavailable', 'checks': checks}
+        }, status=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE)
+        response['Cache-Control'] = 'max-age=1'
+        return response
+
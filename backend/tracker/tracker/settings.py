@@ -14,6 +14,7 @@ from pathlib import Path
 import os
 from decouple import config, Csv
 import dj_database_url
+from corsheaders.defaults import default_headers
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,6 +48,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProbeMiddleware',  # Health/readiness probes skip everything below
+    'core.middleware.ProfileMiddleware',  # Before the rest, so profiles include their cost
+    'core.middleware.RequestTimingMiddleware',  # Early, so its total covers the other middleware
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add whitenoise middleware for static files
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -70,6 +76,10 @@ CORS_ALLOW_ALL_ORIGINS = DEBUG
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Let the frontend request profiles and read the link to them (see REQUEST_PROFILING)
+CORS_ALLOW_HEADERS = (*default_headers, 'x-profile')
+CORS_EXPOSE_HEADERS = ['X-Profile-Url', 'X-Profile-Error']
+
 # CSRF Settings for cross-origin requests
 CSRF_TRUSTED_ORIGINS = config(
     'CSRF_TRUSTED_ORIGINS',
@@ -78,11 +88,45 @@ CSRF_TRUSTED_ORIGINS = config(
 )
 
 # Authentication Backends
+# EmailBackend extends ModelBackend and also accepts usernames, so the default
+# backend is not listed: a second backend would hash the password again on misses
 AUTHENTICATION_BACKENDS = [
-    'core.auth.EmailBackend',  # Custom email authentication
-    'django.contrib.auth.backends.ModelBackend',  # Default backend
+    'core.auth.EmailBackend',  # Custom email/username authentication
 ]
 
+# Caches: 'default' is per process (report artifacts, readiness results). Login
+# throttle counters must be shared by all gunicorn workers, otherwise each worker
+# allows the full limit; they live in a database table (created by migration
+# core.0014) so every worker and container sees the same counts.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'throttle': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'core_throttle_cache',
+        # Culling would let a flood of made-up accounts evict real counters
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+# Login throttling (core.throttling.LoginFailureThrottle)
+# Failed logins are counted per account and per source IP in a sliding window;
+# attempts over either limit get a 429 after one cache read, before any user
+# lookup or password hashing. Counters live in the CACHE alias above.
+LOGIN_THROTTLE = {
+    'ACCOUNT_FAILURES': config('LOGIN_THROTTLE_ACCOUNT_FAILURES', default=5, cast=int),
+    'IP_FAILURES': config('LOGIN_THROTTLE_IP_FAILURES', default=20, cast=int),
+    'WINDOW': config('LOGIN_THROTTLE_WINDOW', default=900, cast=int),
+    'CACHE': 'throttle',
+}
+
+# Reverse proxies in front of the app. The source IP for the per-IP throttle is
+# taken from X-Forwarded-For only as far as this many trusted proxies appended
+# to it; with 0 it is always the connecting address, so clients cannot pick
+# their own IP with a made-up header. Set to 1 behind one proxy (nginx, Coolify).
+NUM_PROXIES = config('NUM_PROXIES', default=0, cast=int)
+
 ROOT_URLCONF = 'tracker.urls'
 
 TEMPLATES = [
@@ -177,6 +221,67 @@ else:
 # Whitenoise configuration for serving static files in production
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
 
+# Cold storage for archived hour entries (manage.py archive_hours)
+HOUR_ARCHIVE_DIR = config('HOUR_ARCHIVE_DIR', default=os.path.join(BASE_DIR, 'archive'))
+
+# Database backups (manage.py backup)
+BACKUP_DIR = config('BACKUP_DIR', default=os.path.join(BASE_DIR, 'backups'))
+
+# Month-partitioned Parquet exports (manage.py export_analytics, /api/analytics/export/)
+ANALYTICS_EXPORT_DIR = config('ANALYTICS_EXPORT_DIR', default=os.path.join(BASE_DIR, 'analytics'))
+
+# Rendered report artifacts (/api/reports/render/) are cached for this many seconds;
+# the cache key includes a data version, so edits never serve stale reports
+REPORT_CACHE_TIMEOUT = config('REPORT_CACHE_TIMEOUT', default=24 * 60 * 60, cast=int)
+
+# Per-request timing (core.middleware.RequestTimingMiddleware): Server-Timing headers
+# with SQL query count and time, view and serialization time. REQUEST_TIMING_LOG also
+# logs one JSON line per request to the core.timing logger. When REQUEST_TIMING is off
+# the middleware removes itself at startup.
+REQUEST_TIMING = config('REQUEST_TIMING', default=False, cast=bool)
+REQUEST_TIMING_LOG = config('REQUEST_TIMING_LOG', default=False, cast=bool)
+
+# Prometheus metrics at /api/metrics/ (core.metrics). Scrapers send METRICS_TOKEN as a
+# bearer token; without a token the endpoint answers 403 unless DEBUG is on. Under gunicorn, set the
+# PROMETHEUS_MULTIPROC_DIR environment variable to an empty shared directory so the
+# endpoint reports the sum over all workers.
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# Slow query log (core.slow_queries): queries taking at least SLOW_QUERY_MS milliseconds
+# (0 = off) are logged as JSON lines with SQL, parameters, view, stack frame and an EXPLAIN
+# plan captured in the background. Lines go to the console and, when set, to
+# SLOW_QUERY_LOG_FILE; summarize them with manage.py summarize_slow_queries.
+SLOW_QUERY_MS = config('SLOW_QUERY_MS', default=0, cast=int)
+SLOW_QUERY_EXPLAIN = config('SLOW_QUERY_EXPLAIN', default=True, cast=bool)
+SLOW_QUERY_LOG_FILE = config('SLOW_QUERY_LOG_FILE', default='')
+
+# On-demand profiling (core.profiling): with REQUEST_PROFILING on, an admin request sent
+# with an "X-Profile: 1" header runs under cProfile. The profile is saved in PROFILE_DIR
+# (the newest PROFILE_KEEP are kept) and linked in the X-Profile-Url response header.
+# When REQUEST_PROFILING is off the middleware removes itself at startup.
+REQUEST_PROFILING = config('REQUEST_PROFILING', default=False, cast=bool)
+PROFILE_DIR = config('PROFILE_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+PROFILE_KEEP = config('PROFILE_KEEP', default=50, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'core.slow_queries': {'handlers': ['console'], 'level': 'WARNING', 'propagate': False},
+    },
+}
+if SLOW_QUERY_LOG_FILE:
+    LOGGING['handlers']['slow_query_file'] = {
+        'class': 'logging.handlers.WatchedFileHandler',
+        'filename': SLOW_QUERY_LOG_FILE,
+    }
+    LOGGING['loggers']['core.slow_queries']['handlers'].append('slow_query_file')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -192,5 +297,6 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
-    ]
+    ],
+    'NUM_PROXIES': NUM_PROXIES,
 }